@@ -0,0 +1,97 @@
+"""
+Adzuna job search with a shared response cache.
+
+Results are cached per normalized (country, keyword, page) for
+ADZUNA_CACHE_TTL seconds (default 300; the search only covers postings from
+the last few days, so results barely move within minutes). Concurrent
+identical misses make one upstream call, and when Adzuna fails an expired
+entry is served if there is one.
+"""
+import os
+import threading
+
+from cache import make_cache
+from http_client import get_client
+
+SEARCH_PATH = "/v1/api/jobs/{country}/search/{page}"
+COUNTRIES = ("us", "ca")
+RESULTS_PER_PAGE = 20
+MAX_DAYS_OLD = 3
+
+
+class UpstreamError(Exception):
+    """Adzuna answered with something other than 200."""
+
+    def __init__(self, status_code):
+        super().__init__(f"Adzuna returned {status_code}")
+        self.status_code = status_code
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = make_cache("adzuna", ttl=300, max_entries=2000)
+    return _cache
+
+
+def normalize_keyword(keyword):
+    return " ".join((keyword or "").casefold().split())
+
+
+def cache_key(country, keyword, page):
+    return f"{country}:{page}:{normalize_keyword(keyword)}"
+
+
+def fetch(country, keyword, page):
+    """Call Adzuna and return the /jobsearchapi response body."""
+    params = {
+        "app_id": os.getenv("ADZUNA_APP_ID", "10b2419a"),
+        "app_key": os.getenv("APP_KEY"),
+        "what": keyword,
+        "max_days_old": MAX_DAYS_OLD,
+        "results_per_page": RESULTS_PER_PAGE,
+        "content-type": "application/json"
+    }
+    response = get_client("adzuna").get(SEARCH_PATH.format(country=country, page=page), params=params)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code)
+
+    jobs_data = response.json()
+    total_results = jobs_data.get("count", 1)
+    total_pages = (total_results // RESULTS_PER_PAGE) + (1 if total_results % RESULTS_PER_PAGE > 0 else 0)
+    return {"jobs_data": jobs_data.get("results", []), "total_pages": total_pages}
+
+
+def format_job(job):
+    """Map an Adzuna result onto the schema of jooble.format_job."""
+    salary_min, salary_max = job.get("salary_min"), job.get("salary_max")
+    if salary_min and salary_max and salary_min != salary_max:
+        salary = f"{salary_min:,.0f} - {salary_max:,.0f}"
+    elif salary_min or salary_max:
+        salary = f"{salary_min or salary_max:,.0f}"
+    else:
+        salary = "Not Specified"
+
+    return {
+        "title": job.get("title", "N/A"),
+        "company": (job.get("company") or {}).get("display_name", "N/A"),
+        "location": (job.get("location") or {}).get("display_name", "N/A"),
+        "date_posted": job.get("created", "N/A"),
+        "job_type": job.get("contract_time") or job.get("contract_type") or "N/A",
+        "salary": salary,
+        "link": job.get("redirect_url", "#")
+    }
+
+
+def search(country, keyword, page):
+    keyword = normalize_keyword(keyword)
+    return get_search_cache().get_or_load(
+        cache_key(country, keyword, page),
+        lambda: fetch(country, keyword, page)
+    )
@@ -1,53 +1,81 @@
-import mysql.connector  # type: ignore
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import JWTManager, create_access_token
+from werkzeug.middleware.proxy_fix import ProxyFix
 import datetime
+import hmac
 import os
-from dotenv import load_dotenv
-import requests
-import http.client
 import json
-from openai import OpenAI
-import time
-import smtplib
 import random
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import re
-
-# Load environment variables from .env file     
-load_dotenv()
-
-app = Flask(__name__)
-CORS(app, origins=["http://localhost:3000"])
-
-otp_store = {}
-
-app_key = os.getenv('APP_KEY')  # API key for job search
-jooble_api_key = os.getenv('JOOBLE_API_KEY')
-jooble_host = os.getenv('JOOBLE_HOST')
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Database connection function
-def get_db_connection():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        database=os.getenv("DB_NAME")
-    )
-
-# Secret key for JWT
-app.config["JWT_SECRET_KEY"] = "supersecretkey"  # Change this for production
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = datetime.timedelta(hours=1)
-jwt = JWTManager(app)
-
-
-
-@app.route('/signup', methods=['POST'])
+from db import get_db_connection, get_pool
+from profile_cache import get_profile, get_profile_cache, invalidate_profile
+from job_queries import (
+    QueryArgsError, build_all_jobs_query, build_search_query, build_user_jobs_query, page_response,
+    parse_list_args, parse_search_args, search_page_response
+)
+import adzuna
+import batch_generation
+import bulk_import
+import export
+import federated_search
+import generation
+import global_analytics
+import http_client
+import jooble
+import rollups
+from collections import Counter
+from identity import forget_email, get_identity_cache, lookup_user_id, resolve_user_id, user_id_from_token
+from job_identity import canonical_job_hash
+from generation_cache import get_generation_cache
+from generation_queue import QueueFullError, UserLimitError, get_generation_queue
+from outbox import OutboxFullError, get_outbox
+from passwords import HasherBusyError, get_password_hasher
+import otp_store
+import warmup
+
+api = Blueprint("api", __name__)
+jwt = JWTManager()
+
+
+def create_app(config=None):
+    """
+    Build the Flask app. Clients for the database, OpenAI, the job search
+    APIs and SMTP are created on first use rather than here, so starting a
+    worker (or importing this module in a test) stays cheap.
+
+    Behind reverse proxies, set TRUSTED_PROXIES to how many there are, so
+    request.remote_addr (used by the OTP rate limits) is the client's
+    address from X-Forwarded-For rather than the proxy's. Leave it at 0 when
+    clients connect directly, or they could pick their own address.
+    """
+    # Load environment variables from .env file
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    app = Flask(__name__)
+    CORS(app, origins=["http://localhost:3000"])
+
+    # Secret key for JWT
+    app.config["JWT_SECRET_KEY"] = "supersecretkey"  # Change this for production
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = datetime.timedelta(hours=1)
+    app.config.update(config or {})
+    jwt.init_app(app)
+
+    trusted_proxies = int(os.getenv("TRUSTED_PROXIES", "0"))
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
+
+    app.register_blueprint(api)
+    return app
+
+
+def password_busy_response(error):
+    return jsonify({"error": str(error)}), 503, {"Retry-After": "1"}
+
+
+@api.route('/signup', methods=['POST'])
 def signup():
+    try:
         data = request.get_json()  # Receive JSON data
         firstname = data.get('firstname')
         lastname = data.get('lastname')
@@ -55,137 +83,82 @@ def signup():
         password = data.get('password')
 
         # Hash the password before storing it
-        hashed_password = generate_password_hash(password, method="pbkdf2:sha256")
+        hashed_password = get_password_hasher().hash(password)
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
 
-        # Check if the user already exists
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        existing_user = cursor.fetchone()
+            # Check if the user already exists
+            cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+            existing_user = cursor.fetchone()
 
-        if existing_user:
-            cursor.close()
-            connection.close()
-            return jsonify({"message": "Email already exists!"}), 400
+            if existing_user:
+                cursor.close()
+                return jsonify({"message": "Email already exists!"}), 400
 
-        # Insert new user into the database with hashed password
-        insert_query = "INSERT INTO users (firstname, email, password, lastname) VALUES (%s, %s, %s, %s)"
-        cursor.execute(insert_query, (firstname, email, hashed_password, lastname))
-        connection.commit()
+            # Insert new user into the database with hashed password
+            insert_query = "INSERT INTO users (firstname, email, password, lastname) VALUES (%s, %s, %s, %s)"
+            cursor.execute(insert_query, (firstname, email, hashed_password, lastname))
+            connection.commit()
 
-        cursor.close()
-        connection.close()
+            cursor.close()
 
         return jsonify({"message": "User created successfully!"}), 201
 
+    except HasherBusyError as e:
+        return password_busy_response(e)
 
-@app.route('/signin', methods=['POST'])
+
+@api.route('/signin', methods=['POST'])
 def signin():
+    try:
         data = request.get_json()
         email = data.get('email')
         password = data.get('password')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        cursor.execute("SELECT id, email, password FROM users WHERE email = %s", (email,))
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT id, email, password FROM users WHERE email = %s", (email,))
+            result = cursor.fetchone()
+            cursor.close()
 
         if result:
             user_id, stored_email, stored_password = result
-            if check_password_hash(stored_password, password):
+            valid, new_hash = get_password_hasher().verify(stored_password, password)
+            if valid:
+                if new_hash:
+                    # Stored with an older work factor; keep the fresh hash instead
+                    with get_db_connection() as connection:
+                        cursor = connection.cursor()
+                        cursor.execute("UPDATE users SET password = %s WHERE id = %s", (new_hash, user_id))
+                        connection.commit()
+                        cursor.close()
+
                 # Generate JWT token
-                access_token = create_access_token(identity={"id": user_id, "email": stored_email})
+                access_token = create_access_token(identity=str(user_id), additional_claims={"email": stored_email})
                 return jsonify({"message": "Sign-in successful!", "token": access_token}), 200
             else:
                 return jsonify({"message": "Invalid password."}), 401
         else:
             return jsonify({"message": "User not found."}), 404
 
+    except HasherBusyError as e:
+        return password_busy_response(e)
+
 
     # GET PROFILE - FIXED DATA RETRIEVAL
-@app.route('/getProfile', methods=['GET'])
+@api.route('/getProfile', methods=['GET'])
 def getProfile():
         try:
             email = request.args.get('email')
             if not email:
                 return jsonify({"error": "Email is required"}), 400
 
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)  # Return results as dict
-
-            # Fixing SQL Query - Ensures all data is properly fetched
-            select_query = """
-                SELECT 
-                    u.id AS user_id, u.email, u.firstname, u.lastname, u.phone, u.linkedin, u.city,
-                    p.skills, p.certifications,
-                    w.company_name, w.position, w.years_of_experience, w.job_description,
-                    e.degree, e.school, e.gpa, e.field_of_study, YEAR(e.graduation_date) AS graduation_year
-                FROM users u
-                LEFT JOIN profile p ON p.id = u.id
-                LEFT JOIN work_experience w ON w.profile_id = u.id
-                LEFT JOIN education e ON e.profile_id = u.id
-                WHERE u.email = %s
-            """
-
-            cursor.execute(select_query, (email,))
-            rows = cursor.fetchall()
-            cursor.close()
-            connection.close()
-
-            if not rows:
+            profile_data = get_profile(email=email, user_id=user_id_from_token())
+            if not profile_data:
                 return jsonify({"message": "No data found for the given email"}), 404
 
-            # Process results to group work experience and education properly
-            profile_data = {}
-
-            for row in rows:
-                user_id = row["user_id"]
-                if user_id not in profile_data:
-                    profile_data[user_id] = {
-                        "user_id": user_id,
-                        "email": row["email"],
-                        "firstname": row["firstname"],
-                        "lastname": row["lastname"],
-                        "phone": row["phone"],
-                        "linkedin": row["linkedin"],
-                        "city": row["city"],
-                        "skills": row["skills"].split(", ") if row["skills"] else [],
-                        "certifications": row["certifications"].split(", ") if row["certifications"] else [],
-                        "workExperience": [],
-                        "education": []
-                    }
-
-                # Append work experience if it exists
-                if row["company_name"]:
-                    work_exp = {
-                        "company": row["company_name"],
-                        "position": row["position"],
-                        "yearsOfExperience": row["years_of_experience"],
-                        "responsibilities": row["job_description"]
-                    }
-                    if work_exp not in profile_data[user_id]["workExperience"]:
-                        profile_data[user_id]["workExperience"].append(work_exp)
-
-                # Append education if it exists
-                if row["degree"]:
-                    education_entry = {
-                        "degree": row["degree"],
-                        "institution": row["school"],
-                        "gpa": row["gpa"],
-                        "field": row["field_of_study"],
-                        "endYear": row["graduation_year"]
-                    }
-                    if education_entry not in profile_data[user_id]["education"]:
-                        profile_data[user_id]["education"].append(education_entry)
-
-            # Debugging: Print the final profile data
-            print("Final Profile Data:", profile_data)
-
-            return jsonify({"message": "Data fetched successfully!", "data": list(profile_data.values())[0]}), 200
+            return jsonify({"message": "Data fetched successfully!", "data": profile_data}), 200
 
         except Exception as e:
             print("Error in getProfile:", str(e))
@@ -193,9 +166,9 @@ def getProfile():
 
 
     # CREATE / EDIT PROFILE - FIXED DATA STORAGE
-@app.route('/createProfile', methods=['POST'])
-@app.route('/editProfile', methods=['POST'])
-@app.route('/editProfile', methods=['POST'])
+@api.route('/createProfile', methods=['POST'])
+@api.route('/editProfile', methods=['POST'])
+@api.route('/editProfile', methods=['POST'])
 def createOrEditProfile():
     try:
         data = request.get_json()
@@ -213,64 +186,65 @@ def createOrEditProfile():
         if not original_email:
             return jsonify({"error": "Original email is required"}), 400
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+
+            # Fetch user by token or original email
+            user_id = resolve_user_id(cursor, original_email)
 
-        # Fetch user by original email
-        cursor.execute("SELECT id FROM users WHERE email = %s", (original_email,))
-        existing_user = cursor.fetchone()
+            if not user_id:
+                return jsonify({"error": "User not found"}), 404
 
-        if not existing_user:
-            return jsonify({"error": "User not found"}), 404
+            # If email is changed, update it
+            if updated_email and original_email != updated_email:
+                cursor.execute("UPDATE users SET email = %s WHERE id = %s", (updated_email, user_id))
 
-        user_id = existing_user[0]
+            firstname = data.get("firstname", "")
+            lastname = data.get("lastname", "")
 
-        # If email is changed, update it
-        if updated_email and original_email != updated_email:
-            cursor.execute("UPDATE users SET email = %s WHERE id = %s", (updated_email, user_id))
-
-        firstname = data.get("firstname", "")
-        lastname = data.get("lastname", "")
-
-        cursor.execute("""
-    UPDATE users 
-    SET firstname = %s, lastname = %s, phone = %s, city = %s, linkedin = %s 
-    WHERE id = %s
-""", (firstname, lastname, phone, city, linkedin, user_id))
-
-        # Convert skills and certifications to string
-        skills_str = ", ".join(skills) if skills else ""
-        certifications_str = ", ".join([c.get("name", "") if isinstance(c, dict) else c for c in certifications])
-
-        # Insert or update profile
-        cursor.execute("""
-            INSERT INTO profile (id, skills, certifications) 
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE skills = VALUES(skills), certifications = VALUES(certifications)
-        """, (user_id, skills_str, certifications_str))
-
-        # Clear old experience/education
-        cursor.execute("DELETE FROM work_experience WHERE profile_id = %s", (user_id,))
-        cursor.execute("DELETE FROM education WHERE profile_id = %s", (user_id,))
-
-        # Insert work experience
-        for i in experience:
             cursor.execute("""
-                INSERT INTO work_experience (profile_id, company_name, position, years_of_experience, job_description) 
-                VALUES (%s, %s, %s, %s, %s)
-            """, (user_id, i.get("company", ""), i.get("position", ""), int(i.get("yearsOfExperience", 0)), i.get("responsibilities", "")))
+        UPDATE users 
+        SET firstname = %s, lastname = %s, phone = %s, city = %s, linkedin = %s 
+        WHERE id = %s
+    """, (firstname, lastname, phone, city, linkedin, user_id))
+
+            # Convert skills and certifications to string
+            skills_str = ", ".join(skills) if skills else ""
+            certifications_str = ", ".join([c.get("name", "") if isinstance(c, dict) else c for c in certifications])
 
-        # Insert education
-        for i in education:
-            graduation_date = f"{i.get('endYear', 2000)}-01-01" if i.get("endYear") else None
+            # Insert or update profile
             cursor.execute("""
-                INSERT INTO education (profile_id, degree, school, gpa, field_of_study, graduation_date) 
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (user_id, i.get("degree", ""), i.get("institution", ""), float(i.get("gpa", 0.0)), i.get("field", ""), graduation_date))
+                INSERT INTO profile (id, skills, certifications) 
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE skills = VALUES(skills), certifications = VALUES(certifications)
+            """, (user_id, skills_str, certifications_str))
+
+            # Clear old experience/education
+            cursor.execute("DELETE FROM work_experience WHERE profile_id = %s", (user_id,))
+            cursor.execute("DELETE FROM education WHERE profile_id = %s", (user_id,))
+
+            # Insert work experience
+            for i in experience:
+                cursor.execute("""
+                    INSERT INTO work_experience (profile_id, company_name, position, years_of_experience, job_description) 
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (user_id, i.get("company", ""), i.get("position", ""), int(i.get("yearsOfExperience", 0)), i.get("responsibilities", "")))
+
+            # Insert education
+            for i in education:
+                graduation_date = f"{i.get('endYear', 2000)}-01-01" if i.get("endYear") else None
+                cursor.execute("""
+                    INSERT INTO education (profile_id, degree, school, gpa, field_of_study, graduation_date) 
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (user_id, i.get("degree", ""), i.get("institution", ""), float(i.get("gpa", 0.0)), i.get("field", ""), graduation_date))
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
+            cursor.close()
+
+        invalidate_profile(user_id)
+        generation.invalidate_user(user_id)
+        if updated_email and original_email != updated_email:
+            forget_email(original_email, updated_email)
 
         return jsonify({"message": "Profile updated successfully!"}), 201
 
@@ -279,12 +253,11 @@ def createOrEditProfile():
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/createJob', methods=['POST'])
+@api.route('/createJob', methods=['POST'])
 def create_job():
         try:
             data = request.get_json()
             original_email = data.get('originalEmail') or data.get('email')
-            print(data, "****")  # Debugging
 
             job_title = data.get('job_title')
             company_name = data.get('company_name')
@@ -298,114 +271,238 @@ def create_job():
             original_email = data.get('originalEmail') or data.get('email')
             job_id = data.get('job_id')
 
-            connection = get_db_connection()
-            cursor = connection.cursor()
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
+
+                # Get user ID from token or email
+                user_id = resolve_user_id(cursor, original_email)
+                if not user_id:
+                    return jsonify({"error": "User not found"}), 404
+
+                if not job_id:  # Create a new job, or reuse the catalog row for the same posting
+                    insert_job_query = """
+                        INSERT INTO jobs (job_title, company_name, job_location, job_type, 
+                                        job_link, job_description, canonical_hash)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE
+                            jobs_id = LAST_INSERT_ID(jobs_id),
+                            job_description = COALESCE(job_description, VALUES(job_description))
+                    """
+                    canonical_hash = canonical_job_hash(job_link, job_title, company_name, job_location)
+                    cursor.execute(insert_job_query, (job_title, company_name, job_location, job_type,
+                                                    job_link, job_description, canonical_hash))
+
+                    cursor.execute("SELECT LAST_INSERT_ID()")
+                    last_inserted_id = cursor.fetchone()[0]
+
+                    job_id = last_inserted_id  # Ensure we have a valid job_id
+
+                before = rollups.snapshot(cursor, user_id, job_id)
+
+                if before:
+                    # The user already tracks this job; update the existing link
+                    # instead of adding a second one
+                    update_user_job = """
+                        UPDATE users_jobs
+                        SET status = %s, date_applied = %s
+                        WHERE job_id = %s AND user_id = %s
+                    """
+                    cursor.execute(update_user_job, (job_status, date_applied, job_id, user_id))
+                else:
+                    # Insert into `users_jobs`, ensuring `status` is not blank
+                    insert_user_job = """
+                        INSERT INTO users_jobs (job_id, user_id, date_applied, status)
+                        VALUES (%s, %s, %s, %s)
+                    """
+                    cursor.execute(insert_user_job, (job_id, user_id, date_applied, job_status))
+
+                # Keep the analytics rollups in the same transaction
+                rollups.apply_changes(cursor, user_id, before, rollups.snapshot(cursor, user_id, job_id))
+
+                connection.commit()
+                cursor.close()
 
-            # Get user ID from email
-            cursor.execute("SELECT id FROM users WHERE email = %s", (original_email,))
-            user = cursor.fetchone()
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+            return jsonify({"message": "Job entry created successfully!"}), 201
 
-            user_id = user[0]
+        except Exception as e:
+            print("Error in createJob:", str(e))
+            return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
-            if not job_id:  # Create a new job
-                insert_job_query = """
-                    INSERT INTO jobs (job_title, company_name, job_location, job_type, 
-                                    job_link, job_description)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(insert_job_query, (job_title, company_name, job_location, job_type,
-                                                job_link, job_description))
 
-                cursor.execute("SELECT LAST_INSERT_ID()")
-                last_inserted_id = cursor.fetchone()[0]
+# Import many jobs at once, as JSON {"email", "jobs": [...]} or a multipart CSV upload
+@api.route('/createJobs', methods=['POST'])
+def create_jobs():
+        try:
+            upload = request.files.get('file')
+            if upload:
+                email = request.form.get('email')
+                rows = bulk_import.parse_csv(upload.stream)
+            else:
+                data = request.get_json(silent=True) or {}
+                email = data.get('originalEmail') or data.get('email')
+                rows = data.get('jobs')
+                if not isinstance(rows, list):
+                    return jsonify({"error": "jobs must be a list"}), 400
 
-                job_id = last_inserted_id  # Ensure we have a valid job_id
+            if not rows:
+                return jsonify({"error": "No jobs to import"}), 400
 
-            # Insert into `users_jobs`, ensuring `status` is not blank
-            insert_user_job = """
-                INSERT INTO users_jobs (job_id, user_id, date_applied, status)
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE status = VALUES(status), date_applied = VALUES(date_applied)
-            """
-            cursor.execute(insert_user_job, (job_id, user_id, date_applied, job_status))
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
+                user_id = resolve_user_id(cursor, email)
+                cursor.close()
+                if not user_id:
+                    return jsonify({"error": "User not found"}), 404
 
-            connection.commit()
-            cursor.close()
-            connection.close()
+                summary = bulk_import.import_jobs(connection, user_id, rows)
 
-            return jsonify({"message": "Job entry created successfully!"}), 201
+            return jsonify(summary), 200
 
+        except bulk_import.BulkImportError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
-            print("Error in createJob:", str(e))
+            print("Error in createJobs:", str(e))
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
     # Get all jobs for a user
-@app.route('/getuserJobs', methods=['GET'])
+@api.route('/getuserJobs', methods=['GET'])
 def get_userjobs():
         try:
             email = request.args.get('email', '').strip()
             if not email:
                 return jsonify({"error": "Email is required"}), 400
 
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
+            opts = parse_list_args(request.args)
 
-            cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-            user = cursor.fetchone()
+            with get_db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+                user_id = resolve_user_id(cursor, email)
 
-            user_id = user['id']
+                if not user_id:
+                    return jsonify({"error": "User not found"}), 404
 
-            cursor.execute("""
-                SELECT j.*, DATE_FORMAT(uj.date_applied, '%Y-%m-%d') AS date_applied, 
-                    COALESCE(uj.status, 'Applied') AS job_status
-                FROM users_jobs uj
-                INNER JOIN jobs j ON uj.job_id = j.jobs_id
-                WHERE uj.user_id = %s
-            """, (user_id,))
+                query, params = build_user_jobs_query(user_id, opts)
+                cursor.execute(query, params)
 
-            jobs = cursor.fetchall()
+                jobs = cursor.fetchall()
 
-            cursor.close()
-            connection.close()
+                cursor.close()
 
-            return jsonify({"jobs": jobs}), 200
+            return jsonify(page_response(jobs, opts)), 200
 
+        except QueryArgsError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             print("Error in getJobs:", str(e))
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
     # Get all jobs
-@app.route('/getAllJobs', methods=['GET'])
+@api.route('/getAllJobs', methods=['GET'])
 def get_jobs():
         try:
+            opts = parse_list_args(request.args)
+            query, params = build_all_jobs_query(opts)
 
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
+            with get_db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
 
-            cursor.execute("""
-                SELECT *FROM jobs
-            """)
+                cursor.execute(query, params)
 
-            jobs = cursor.fetchall()
+                jobs = cursor.fetchall()
 
-            cursor.close()
-            connection.close()
+                cursor.close()
 
-            return jsonify({"jobs": jobs}), 200
+            return jsonify(page_response(jobs, opts)), 200
 
+        except QueryArgsError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             print("Error in getJobs:", str(e))
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/editJob', methods=['POST'])
+# Ranked keyword search over the saved jobs catalog
+@api.route('/searchJobs', methods=['GET'])
+def search_jobs():
+        try:
+            opts = parse_search_args(request.args)
+            query, params = build_search_query(opts)
+
+            with get_db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params)
+                jobs = cursor.fetchall()
+                cursor.close()
+
+            return jsonify(search_page_response(jobs, opts)), 200
+
+        except QueryArgsError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print("Error in searchJobs:", str(e))
+            return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+def export_response(query, params, columns, filename):
+    export_format = request.args.get('format', 'ndjson').strip().lower()
+    if export_format not in export.FORMATS:
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+
+    body = export.encode(export.stream_rows(query, params), export_format, columns)
+    return Response(
+        stream_with_context(body),
+        mimetype=export.FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"}
+    )
+
+
+    # Stream the whole job catalog
+@api.route('/exportJobs', methods=['GET'])
+def export_jobs():
+        try:
+            opts = parse_list_args(request.args)
+            opts["paginated"] = False
+            query, params = build_all_jobs_query(opts)
+            return export_response(query, params, opts["columns"], "jobs")
+
+        except QueryArgsError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print("Error in exportJobs:", str(e))
+            return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+    # Stream all of a user's applications
+@api.route('/exportUserJobs', methods=['GET'])
+def export_user_jobs():
+        try:
+            email = request.args.get('email', '').strip()
+            opts = parse_list_args(request.args)
+            opts["paginated"] = False
+
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
+                user_id = resolve_user_id(cursor, email)
+                cursor.close()
+
+            if not user_id:
+                return jsonify({"error": "User not found"}), 404
+
+            query, params = build_user_jobs_query(user_id, opts)
+            columns = opts["columns"] + ["date_applied", "job_status"]
+            return export_response(query, params, columns, "applications")
+
+        except QueryArgsError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print("Error in exportUserJobs:", str(e))
+            return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+@api.route('/editJob', methods=['POST'])
 def edit_job():
         try:
             data = request.get_json()
@@ -424,36 +521,68 @@ def edit_job():
             if not job_id:
                 return jsonify({"error": "Job ID is required"}), 400
 
-            connection = get_db_connection()
-            cursor = connection.cursor()
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
 
-            cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-            user_id = cursor.fetchone()[0]
+                user_id = resolve_user_id(cursor, email)
 
-            if not user_id:
-                return jsonify({"error": "User not found"}), 404
+                if not user_id:
+                    return jsonify({"error": "User not found"}), 404
 
-            print("user_id", user_id)
+                before = rollups.snapshot(cursor, user_id, job_id)
+                if not before:
+                    return jsonify({"error": "Job not found"}), 404
 
-            update_job_query = """
-                UPDATE jobs 
-                SET job_title = %s, company_name = %s, job_location = %s, job_type = %s, 
-                    job_link = %s, job_description = %s
-                WHERE jobs_id = %s
-            """
-            cursor.execute(update_job_query, (job_title, company_name, job_location, job_type,
-                                            job_link, job_description, job_id))
+                # A jobs row is shared by everyone tracking the posting, so it isn't
+                # edited in place: the edited details go in as their own catalog row
+                # (or match an existing one) and only this user's link moves onto it
+                upsert_job_query = """
+                    INSERT INTO jobs (job_title, company_name, job_location, job_type,
+                                    job_link, job_description, canonical_hash)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE jobs_id = LAST_INSERT_ID(jobs_id)
+                """
+                canonical_hash = canonical_job_hash(job_link, job_title, company_name, job_location)
+                cursor.execute(upsert_job_query, (job_title, company_name, job_location, job_type,
+                                                  job_link, job_description, canonical_hash))
+                cursor.execute("SELECT LAST_INSERT_ID()")
+                target_id = cursor.fetchone()[0]
+
+                if int(target_id) != int(job_id):
+                    already_linked = rollups.snapshot(cursor, user_id, target_id)
+                    before += already_linked
+                    if already_linked:
+                        relink_query = "DELETE FROM users_jobs WHERE job_id = %s AND user_id = %s"
+                        cursor.execute(relink_query, (job_id, user_id))
+                    else:
+                        relink_query = "UPDATE users_jobs SET job_id = %s WHERE job_id = %s AND user_id = %s"
+                        cursor.execute(relink_query, (target_id, job_id, user_id))
+
+                # The row's hash already matches the edit, so details the hash doesn't
+                # cover (type, description, the title of a posting keyed by its link)
+                # can still change in place while no one else tracks the row
+                update_job_query = """
+                    UPDATE jobs 
+                    SET job_title = %s, company_name = %s, job_location = %s, job_type = %s, 
+                        job_link = %s, job_description = %s
+                    WHERE jobs_id = %s
+                        AND NOT EXISTS (SELECT 1 FROM users_jobs WHERE job_id = %s AND user_id <> %s)
+                """
+                cursor.execute(update_job_query, (job_title, company_name, job_location, job_type,
+                                                job_link, job_description, target_id, target_id, user_id))
 
-            update_user_job_query = """
-                UPDATE users_jobs 
-                SET status = %s, date_applied = %s
-                WHERE job_id = %s AND user_id = %s
-            """
-            cursor.execute(update_user_job_query, (job_status, date_applied, job_id, user_id))
+                update_user_job_query = """
+                    UPDATE users_jobs 
+                    SET status = %s, date_applied = %s
+                    WHERE job_id = %s AND user_id = %s
+                """
+                cursor.execute(update_user_job_query, (job_status, date_applied, target_id, user_id))
 
-            connection.commit()
-            cursor.close()
-            connection.close()
+                # Only this user's link changed, so only their rollups move
+                rollups.apply_changes(cursor, user_id, before, rollups.snapshot(cursor, user_id, target_id))
+
+                connection.commit()
+                cursor.close()
 
             return jsonify({"message": "Job updated successfully!"}), 200
 
@@ -462,7 +591,7 @@ def edit_job():
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/deleteJob', methods=['POST'])
+@api.route('/deleteJob', methods=['POST'])
 def delete_job():
         try:
             data = request.get_json()
@@ -472,23 +601,22 @@ def delete_job():
             if not job_id:
                 return jsonify({"error": "Job ID is required"}), 400
 
-            connection = get_db_connection()
-            cursor = connection.cursor()
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
 
-            cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-            user = cursor.fetchone()
+                user_id = resolve_user_id(cursor, email)
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+                if not user_id:
+                    return jsonify({"error": "User not found"}), 404
 
-            user_id = user[0]
+                before = rollups.snapshot(cursor, user_id, job_id)
 
-            delete_query = "DELETE FROM users_jobs WHERE job_id = %s AND user_id = %s"
-            cursor.execute(delete_query, (job_id, user_id))
-            connection.commit()
+                delete_query = "DELETE FROM users_jobs WHERE job_id = %s AND user_id = %s"
+                cursor.execute(delete_query, (job_id, user_id))
+                rollups.apply_changes(cursor, user_id, before, Counter())
+                connection.commit()
 
-            cursor.close()
-            connection.close()
+                cursor.close()
 
             return jsonify({"message": "Job deleted successfully!"}), 200
 
@@ -497,168 +625,63 @@ def delete_job():
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/analytics', methods=['GET'])
+@api.route('/analytics', methods=['GET'])
 def analytics():
         try:
             email = request.args.get('email', '').strip()
             if not email:
                 return jsonify({"error": "Email is required"}), 400
 
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
+            with get_db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
 
-            # Get user ID
-            cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-            user = cursor.fetchone()
+                # Get user ID
+                user_id = resolve_user_id(cursor, email)
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+                if not user_id:
+                    return jsonify({"error": "User not found"}), 404
 
-            user_id = user['id']
+                # Status, title, month and type breakdowns from the rollup table
+                result = rollups.read_analytics(cursor, user_id)
 
-            # Fetch job status analytics
-            cursor.execute("""
-                SELECT status, COUNT(*) AS count
-                FROM users_jobs
-                WHERE user_id = %s
-                GROUP BY status;
-            """, (user_id,))
-            job_statuses = cursor.fetchall()
-
-            # Fetch job title analytics
-            cursor.execute("""
-                SELECT j.job_title, COUNT(*) AS count
-                FROM users_jobs uj
-                JOIN jobs j ON uj.job_id = j.jobs_id
-                WHERE uj.user_id = %s
-                GROUP BY j.job_title;
-            """, (user_id,))
-            job_titles = cursor.fetchall()
-
-            # Fetch total applications per month
-            cursor.execute("""
-                SELECT DATE_FORMAT(date_applied, '%Y-%m') AS month, COUNT(*) AS total_applications
-                FROM users_jobs
-                WHERE user_id = %s
-                GROUP BY month
-                ORDER BY month;
-            """, (user_id,))
-            applications_per_month = cursor.fetchall()
-
-            # Fetch job type distribution
-            cursor.execute("""
-                SELECT j.job_type, COUNT(*) AS total_jobs
-                FROM users_jobs uj
-                JOIN jobs j ON uj.job_id = j.jobs_id
-                WHERE uj.user_id = %s
-                GROUP BY j.job_type
-                ORDER BY total_jobs DESC;
-            """, (user_id,))
-            job_type_distribution = cursor.fetchall()
+                cursor.close()
 
-            cursor.close()
-            connection.close()
-
-            return jsonify({
-                "jobs": job_statuses,
-                "job_titles": job_titles,
-                "applications_per_month": applications_per_month,
-                "job_type_distribution": job_type_distribution
-            }), 200
+            return jsonify(result), 200
 
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
-@app.route('/generalanalytics', methods=['GET'])
+@api.route('/generalanalytics', methods=['GET'])
 def general_analytics():
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT j.company_name, COUNT(*) AS count
-            FROM users_jobs uj
-            JOIN jobs j ON uj.job_id = j.jobs_id
-            GROUP BY j.company_name
-            ORDER BY count DESC;
-        """)
-        company_data = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT j.job_title, COUNT(*) AS count
-            FROM users_jobs uj
-            JOIN jobs j ON uj.job_id = j.jobs_id
-            GROUP BY j.job_title
-            ORDER BY count DESC;
-        """)
-        job_title_data = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT j.job_location, COUNT(*) AS count
-            FROM users_jobs uj
-            JOIN jobs j ON uj.job_id = j.jobs_id
-            GROUP BY j.job_location
-            ORDER BY count DESC;
-        """)
-        job_location_data = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT status, COUNT(*) AS count
-            FROM users_jobs
-            WHERE status IN ('Offer', 'Rejected')
-            GROUP BY status;
-        """)
-        offers_rejections_data = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
-
-        return jsonify({
-            "company_data": company_data,
-            "job_title_data": job_title_data,
-            "job_location_data": job_location_data,
-            "offers_rejections_data": offers_rejections_data
-        }), 200
+        limits = global_analytics.parse_limits(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Served from the materialized snapshot, refreshed in the background
+        data, generated_at = global_analytics.get_snapshot().get()
+        return jsonify(global_analytics.build_response(data, generated_at, limits)), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/jobsearchapi', methods=['GET'])
+@api.route('/jobsearchapi', methods=['GET'])
 def jobsearchapi():
         try:
             keyword = request.args.get('keyword', '').strip()
             page = request.args.get('page', 1, type=int)
             country = request.args.get('country', 'us').strip().lower()
 
-            if country not in ["us", "ca"]:
+            if country not in adzuna.COUNTRIES:
                 return jsonify({"error": "Invalid country. Choose 'us' or 'ca'."}), 400
 
-            app_id = "10b2419a"
-            url = f"http://api.adzuna.com/v1/api/jobs/{country}/search/{page}"
-
-            params = {
-                "app_id": app_id,
-                "app_key": app_key,
-                "what": keyword,
-                "max_days_old": 3,
-                "results_per_page": 20,
-                "content-type": "application/json"
-            }
-
-            response = requests.get(url, params=params)
-
-            if response.status_code == 200:
-                jobs_data = response.json()
-                total_results = jobs_data.get("count", 1)
-                results_per_page = 20
-                total_pages = (total_results // results_per_page) + (1 if total_results % results_per_page > 0 else 0)
-
-                return jsonify({"jobs_data": jobs_data.get("results", []), "total_pages": total_pages}), 200
-            else:
-                return jsonify({"error": "Failed to fetch jobs"}), response.status_code
+            return jsonify(adzuna.search(country, keyword, page)), 200
 
+        except adzuna.UpstreamError as e:
+            return jsonify({"error": "Failed to fetch jobs"}), e.status_code
         except Exception as e:
             print("Error in jobsearchapi:", str(e))
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
@@ -666,29 +689,7 @@ def jobsearchapi():
 
 def fetch_jobs_from_jooble(keyword, location=""):
         try:
-            connection = http.client.HTTPSConnection(jooble_host)
-            headers = {"Content-type": "application/json"}
-            body = json.dumps({"keywords": keyword, "location": location})
-
-            connection.request("POST", f"/api/{jooble_api_key}", body, headers)
-            response = connection.getresponse()
-
-            raw_data = response.read().decode("utf-8")
-            jobs_data = json.loads(raw_data)
-
-            # ✅ Format and clean response
-            formatted_jobs = []
-            for job in jobs_data.get("jobs", []):
-                formatted_jobs.append({
-                    "title": job.get("title", "N/A"),
-                    "company": job.get("company", "N/A"),
-                    "location": job.get("location", "N/A"),
-                    "date_posted": job.get("updated", "N/A"),
-                    "job_type": job.get("type", "N/A"),
-                    "salary": job.get("salary", "Not Specified"),
-                    "link": job.get("link", "#")
-                })
-
+            formatted_jobs = jooble.search(keyword, location)
             return {"total_jobs": len(formatted_jobs), "jobs": formatted_jobs}
 
         except Exception as e:
@@ -696,7 +697,7 @@ def fetch_jobs_from_jooble(keyword, location=""):
             return {"error": f"Exception occurred: {str(e)}"}
 
 
-@app.route('/jooblejobsearchapi', methods=['GET'])
+@api.route('/jooblejobsearchapi', methods=['GET'])
 def jooble_job_search_api():
         try:
             keyword = request.args.get("keyword", "").strip()
@@ -713,7 +714,88 @@ def jooble_job_search_api():
             return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/generateCoverLetter', methods=['POST'])
+# Search every provider at once and merge the results
+@api.route('/search', methods=['GET'])
+def federated_search_api():
+        try:
+            keyword = request.args.get("keyword", "").strip()
+            if not keyword:
+                return jsonify({"error": "Keyword is required"}), 400
+
+            query = {
+                "keyword": keyword,
+                "location": request.args.get("location", "").strip(),
+                "country": request.args.get("country", "us").strip().lower(),
+                "page": request.args.get("page", 1, type=int),
+            }
+            if query["country"] not in adzuna.COUNTRIES:
+                return jsonify({"error": "Invalid country. Choose 'us' or 'ca'."}), 400
+
+            providers = [p.strip() for p in request.args.get("providers", "").split(",") if p.strip()]
+            unknown = [p for p in providers if p not in federated_search.PROVIDERS]
+            if unknown:
+                return jsonify({"error": f"Unknown provider(s): {', '.join(unknown)}"}), 400
+
+            body, any_succeeded = federated_search.search(query, providers)
+            return jsonify(body), 200 if any_succeeded else 502
+
+        except Exception as e:
+            print("Error in search:", str(e))
+            return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+def generation_wait_seconds():
+    """How long /generateResume and /generateCoverLetter hold the request before answering 202."""
+    return float(os.getenv("GENERATION_WAIT_SECONDS", "5"))
+
+
+def generation_busy_response(error):
+    status = 429 if isinstance(error, UserLimitError) else 503
+    return jsonify({"error": str(error)}), status, {"Retry-After": "5"}
+
+
+# Queue a resume or cover letter and return a job id to poll
+@api.route('/generationJobs', methods=['POST'])
+def submit_generation_job():
+    try:
+        data = request.get_json()
+        kind = data.get('kind', '').strip()
+        job_description = (data.get('job_description') or '').strip()
+        email = (data.get('email') or '').strip()
+
+        if kind not in generation.BUILDERS:
+            return jsonify({"error": f"kind must be one of {', '.join(generation.BUILDERS)}"}), 400
+        if not job_description or not email:
+            return jsonify({"error": "Job description and email are required"}), 400
+
+        profile_data = get_profile(email=email, user_id=user_id_from_token())
+        if not profile_data:
+            return jsonify({"error": "No user found with that email"}), 404
+
+        job = get_generation_queue().submit(
+            generation.BUILDERS[kind](profile_data, job_description),
+            profile_data['user_id'],
+            regenerate=bool(data.get('regenerate'))
+        )
+        return jsonify(job.to_dict()), 200 if job.finished else 202
+
+    except (QueueFullError, UserLimitError) as e:
+        return generation_busy_response(e)
+    except Exception as e:
+        print("❌ Error submitting generation:", str(e))
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+@api.route('/generationJobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    job = get_generation_queue().get(job_id)
+    token_user_id = user_id_from_token()
+    if not job or (token_user_id is not None and token_user_id != job.user_id):
+        return jsonify({"error": "Generation job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@api.route('/generateCoverLetter', methods=['POST'])
 def generate_cover_letter():
     try:
         data = request.get_json()
@@ -723,80 +805,83 @@ def generate_cover_letter():
         if not job_description or not email:
             return jsonify({"error": "Job description and email are required"}), 400
 
-        # Fetch user profile from DB
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT 
-                u.id AS user_id, u.firstname, u.lastname, u.email, u.phone, u.city,
-                p.skills
-            FROM users u
-            LEFT JOIN profile p ON p.id = u.id
-            WHERE u.email = %s
-        """, (email,))
-        row = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        # Fetch user profile (cached)
+        row = get_profile(email=email, user_id=user_id_from_token())
 
         if not row:
             return jsonify({"error": "No user found with that email"}), 404
 
-        # Extract user info
-        full_name = f"{row['firstname']} {row['lastname']}"
-        city = row['city']
-        phone = row['phone']
-        user_email = row['email']
-
-        # Try to extract company name from job description
-        company_match = re.search(r'\b(?:at|with|within)\s+([A-Z][A-Za-z0-9&., ]+)', job_description)
-        company_name = company_match.group(1).strip() if company_match else "the company"
-
-        # Prompt for GPT
-        prompt = f"""
-You are a professional cover letter writer.
-
-Write a cover letter using the following formatting and rules:
-
-- At the top, center the following:
-{full_name}
-{city}
-{user_email}
-{phone}
-
-- Then add:
-To,  
-The Hiring Manager,  
-{company_name}
-
-- Do NOT include LinkedIn, URLs, street address, or placeholders like [Your Name]
-- The body of the letter should be tailored to the job description
-- Use a professional tone, align with resume structure, and keep it concise
-
-Job Description:
-{job_description}
-
-Begin the cover letter below:
-"""
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI that writes professional, personalized cover letters."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=600
+        job = get_generation_queue().submit(
+            generation.cover_letter_request(row, job_description),
+            row['user_id'],
+            regenerate=bool(data.get('regenerate'))
         )
+        if not job.wait(generation_wait_seconds()):
+            # Still queued or running; the client can poll /generationJobs/<job_id>
+            return jsonify(job.to_dict()), 202
+        if job.status == "failed":
+            return jsonify({"error": "Internal Server Error", "details": job.error}), 500
+        return jsonify({"cover_letter": job.text, "cached": job.cached}), 200
+
+    except (QueueFullError, UserLimitError) as e:
+        return generation_busy_response(e)
+    except Exception as e:
+        print("❌ Error generating cover letter:", str(e))
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
 
-        cover_letter = response.choices[0].message.content.strip()
-        return jsonify({"cover_letter": cover_letter}), 200
+# Cover letters for several postings, streamed as NDJSON lines as each one finishes
+@api.route('/generateCoverLetters', methods=['POST'])
+def generate_cover_letters():
+    try:
+        data = request.get_json()
+        email = (data.get('email') or '').strip()
+        job_descriptions = data.get('job_descriptions') or []
+        jobs_ids = data.get('jobs_ids') or []
+
+        if not email:
+            return jsonify({"error": "Email is required"}), 400
+        if not isinstance(job_descriptions, list) or not isinstance(jobs_ids, list):
+            return jsonify({"error": "job_descriptions and jobs_ids must be lists"}), 400
+        try:
+            jobs_ids = [int(jobs_id) for jobs_id in jobs_ids]
+        except (TypeError, ValueError):
+            return jsonify({"error": "jobs_ids must be integers"}), 400
+
+        # One profile lookup for the whole batch
+        row = get_profile(email=email, user_id=user_id_from_token())
+        if not row:
+            return jsonify({"error": "No user found with that email"}), 404
 
+        saved_jobs = []
+        if jobs_ids:
+            with get_db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                saved_jobs = batch_generation.load_saved_jobs(cursor, jobs_ids)
+                cursor.close()
+
+        items = batch_generation.build_items(row, job_descriptions, saved_jobs)
+        results = batch_generation.run(items, row['user_id'], regenerate=bool(data.get('regenerate')))
+
+        def body():
+            try:
+                for result in results:
+                    yield json.dumps(result) + "\n"
+            finally:
+                # Client went away: don't start the letters still waiting
+                results.close()
+
+        return Response(stream_with_context(body()), mimetype="application/x-ndjson",
+                        headers={"X-Accel-Buffering": "no"})
+
+    except batch_generation.BatchError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("❌ Error generating cover letter:", str(e))
+        print("❌ Error generating cover letters:", str(e))
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/generateResume', methods=['POST'])
+@api.route('/generateResume', methods=['POST'])
 def generate_resume():
     try:
         print("🔥 /generateResume endpoint hit")
@@ -810,194 +895,184 @@ def generate_resume():
         if not job_description or not email:
             return jsonify({"error": "Job description and email are required"}), 400
 
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        select_query = """
-            SELECT 
-                u.id AS user_id, u.email, u.firstname, u.lastname, u.phone, u.linkedin, u.city,
-                p.skills, p.certifications,
-                w.company_name, w.position, w.years_of_experience, w.job_description,
-                e.degree, e.school, e.gpa, e.field_of_study, YEAR(e.graduation_date) AS graduation_year
-            FROM users u
-            LEFT JOIN profile p ON p.id = u.id
-            LEFT JOIN work_experience w ON w.profile_id = u.id
-            LEFT JOIN education e ON e.profile_id = u.id
-            WHERE u.email = %s
-        """
-
-        cursor.execute(select_query, (email,))
-        rows = cursor.fetchall()
-        cursor.close()
-        connection.close()
-
-        if not rows:
+        profile_data = get_profile(email=email, user_id=user_id_from_token())
+        if not profile_data:
             return jsonify({"message": "No data found for the given email"}), 404
 
-        profile_data = {}
-        for row in rows:
-            user_id = row["user_id"]
-            if user_id not in profile_data:
-                profile_data[user_id] = {
-                    "user_id": user_id,
-                    "email": row["email"],
-                    "firstname": row["firstname"],
-                    "lastname": row["lastname"],
-                    "phone": row["phone"],
-                    "linkedin": row["linkedin"],
-                    "city": row["city"],
-                    "skills": row["skills"].split(", ") if row["skills"] else [],
-                    "certifications": row["certifications"].split(", ") if row["certifications"] else [],
-                    "workExperience": [],
-                    "education": []
-                }
-
-            if row["company_name"]:
-                work_exp = {
-                    "company": row["company_name"],
-                    "position": row["position"],
-                    "yearsOfExperience": row["years_of_experience"],
-                    "responsibilities": row["job_description"]
-                }
-                if work_exp not in profile_data[user_id]["workExperience"]:
-                    profile_data[user_id]["workExperience"].append(work_exp)
-
-            if row["degree"]:
-                education_entry = {
-                    "degree": row["degree"],
-                    "institution": row["school"],
-                    "gpa": row["gpa"],
-                    "field": row["field_of_study"],
-                    "endYear": row["graduation_year"]
-                }
-                if education_entry not in profile_data[user_id]["education"]:
-                    profile_data[user_id]["education"].append(education_entry)
-
         print("✅ Final Profile Data:", profile_data)
 
-        prompt = f"""
-        You are a resume expert. Generate a professional resume based on the user's profile and the job description provided.
-
-        The format must follow these rules:
-        - Do not use asterisks (*) anywhere in the resume
-        - Contact info (City | Phone | Email | LinkedIn) should appear below the name, also center-aligned
-        - Use markdown headers for each section (like ## Summary, ## Work Experience)
-        - Work Experience should be in the format:  
-        [Job Title], [Company]  
-        [City]  
-        [Start Year] - [End Year or Present]  
-        - Education should be in the format:  
-        [Degree], [Institution]  
-        [City]  
-        [Expected Graduation Year], GPA: [GPA if available]
-        - Responsibilities in work experience should be bullet points
-        - Ensure consistent indentation, spacing, and header hierarchy
-        - Leave an empty line between sections
-
-Profile:
-{profile_data}
-
-Job Description:
-{job_description}
-
-Resume:
-"""
+        job = get_generation_queue().submit(
+            generation.resume_request(profile_data, job_description),
+            profile_data['user_id'],
+            regenerate=bool(data.get('regenerate'))
+        )
+        if not job.wait(generation_wait_seconds()):
+            # Still queued or running; the client can poll /generationJobs/<job_id>
+            return jsonify(job.to_dict()), 202
+        if job.status == "failed":
+            return jsonify({"error": "OpenAI API Error", "details": job.error}), 500
+
+        return jsonify({"Resume": job.text, "cached": job.cached}), 200
 
+    except (QueueFullError, UserLimitError) as e:
+        return generation_busy_response(e)
+    except Exception as e:
+        print("🔥 Unexpected Error:", str(e))
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
+
+
+def sse_response(events):
+    """Stream (event, data) pairs as server-sent events."""
+    def body():
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI that creates professional Resume."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500
-            )
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
         except Exception as e:
-            print("❌ OpenAI API Error:", str(e))
-            return jsonify({"error": "OpenAI API Error", "details": str(e)}), 500
+            print("❌ Error streaming generation:", str(e))
+            yield f"event: error\ndata: {json.dumps({'error': 'Generation failed', 'details': str(e)})}\n\n"
+        finally:
+            # Runs on client disconnect too, and stops the OpenAI stream
+            events.close()
+
+    return Response(
+        stream_with_context(body()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Streaming variants: "token" events as text arrives, then a "done" event with the full text
+@api.route('/generateCoverLetterStream', methods=['POST'])
+def generate_cover_letter_stream():
+    try:
+        data = request.get_json()
+        job_description = data.get('job_description', '').strip()
+        email = data.get('email', '').strip()
+
+        if not job_description or not email:
+            return jsonify({"error": "Job description and email are required"}), 400
+
+        row = get_profile(email=email, user_id=user_id_from_token())
+        if not row:
+            return jsonify({"error": "No user found with that email"}), 404
+
+        generation_request = generation.cover_letter_request(row, job_description)
+        regenerate = bool(data.get('regenerate'))
+        # Same per-user and queue limits as queued generations, held until the stream ends
+        release = get_generation_queue().admit_stream(generation_request, row['user_id'], regenerate)
+        response = sse_response(generation.stream_generate(
+            generation_request, user_id=row['user_id'], regenerate=regenerate
+        ))
+        response.call_on_close(release)
+        return response
+
+    except (QueueFullError, UserLimitError) as e:
+        return generation_busy_response(e)
+    except Exception as e:
+        print("❌ Error generating cover letter:", str(e))
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
-        resume = response.choices[0].message.content.strip()
-        return jsonify({"Resume": resume}), 200
 
+@api.route('/generateResumeStream', methods=['POST'])
+def generate_resume_stream():
+    try:
+        data = request.get_json()
+        job_description = data.get('job_description')
+        email = data.get('email')
+
+        if not job_description or not email:
+            return jsonify({"error": "Job description and email are required"}), 400
+
+        profile_data = get_profile(email=email, user_id=user_id_from_token())
+        if not profile_data:
+            return jsonify({"message": "No data found for the given email"}), 404
+
+        generation_request = generation.resume_request(profile_data, job_description)
+        regenerate = bool(data.get('regenerate'))
+        release = get_generation_queue().admit_stream(generation_request, profile_data['user_id'], regenerate)
+        response = sse_response(generation.stream_generate(
+            generation_request, user_id=profile_data['user_id'], regenerate=regenerate
+        ))
+        response.call_on_close(release)
+        return response
+
+    except (QueueFullError, UserLimitError) as e:
+        return generation_busy_response(e)
     except Exception as e:
         print("🔥 Unexpected Error:", str(e))
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
-@app.route('/generateOTP', methods=['POST'])
+@api.route('/generateOTP', methods=['POST'])
 def generate_otp():
     try:
         data = request.get_json()
         email = data.get("email").strip().lower()
 
+        otp_store.check_send(email, request.remote_addr)
+
         # Check if email exists
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+            user = lookup_user_id(cursor, email)
+            cursor.close()
 
         if not user:
             return jsonify({"error": "Email not registered"}), 404
 
         # Generate OTP and store with email as key
         otp = str(random.randint(100000, 999999))
-        otp_store[email] = {'otp': otp, 'timestamp': time.time()}
-
-        # Send the OTP
-        sender_email = "infinity.5stack.seneca@gmail.com"
-        sender_password = "bjnu etpj ejom uxvi"
-        subject = "Your OTP Code"
-        body = f"Your OTP code is: {otp}. It is valid for 10 minutes."
-
-        msg = MIMEMultipart()
-        msg["From"] = sender_email
-        msg["To"] = email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-
-        server = smtplib.SMTP("smtp.gmail.com", 587, timeout=120)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.sendmail(sender_email, email, msg.as_string())
-        server.quit()
-
-        print(f"✅ OTP sent to {email}: {otp}")
+        otp_store.get_otp_store().issue(email, otp, otp_store.ttl())
+
+        # Sent in the background by the outbox
+        get_outbox().send(email, "Your OTP Code", f"Your OTP code is: {otp}. It is valid for 10 minutes.")
+
+        print(f"✅ OTP queued for {email}")
         return jsonify({"message": "OTP Sent Successfully"}), 200
 
+    except otp_store.RateLimitError as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+
+    except (otp_store.OTPStoreFullError, OutboxFullError) as e:
+        return jsonify({"error": str(e)}), 503
+
     except Exception as e:
         print("Error sending OTP:", str(e))
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/verifyOTP', methods=['POST'])
+@api.route('/verifyOTP', methods=['POST'])
 def verify_otp():
     try:
         data = request.get_json()
         email = data.get("email").strip().lower()
         otp = data.get("otp")
 
-        stored_data = otp_store.get(email)
+        otp_store.check_verify(request.remote_addr)
+        result = otp_store.get_otp_store().verify(email, otp, otp_store.verify_attempts())
 
-        if not stored_data:
+        if result == otp_store.MISSING:
             return jsonify({"message": "No OTP found for this email"}), 404
 
-        if time.time() - stored_data['timestamp'] > 600:  # 10-minute expiry
-            del otp_store[email]  # Cleanup
+        if result == otp_store.LOCKED:
+            return jsonify({"message": "Too many incorrect attempts, request a new OTP"}), 429
+
+        if result == otp_store.EXPIRED:
             return jsonify({"message": "OTP expired"}), 400
 
-        if stored_data['otp'] == otp:
-            del otp_store[email]  # Cleanup after successful verification
+        if result == otp_store.VERIFIED:
             return jsonify({"message": "OTP Verified Successfully"}), 200
         else:
             return jsonify({"message": "Invalid OTP"}), 400
 
+    except otp_store.RateLimitError as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+
     except Exception as e:
         print("Error verifying OTP:", str(e))
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
-@app.route('/resetPassword', methods=['POST'])
+@api.route('/resetPassword', methods=['POST'])
 def reset_password():
     try:
         data = request.get_json()
@@ -1008,23 +1083,70 @@ def reset_password():
         if len(new_password) < 6:
             return jsonify({"message": "Password must be at least 6 characters long."}), 400
 
-        hashed_password = generate_password_hash(new_password, method="pbkdf2:sha256")
+        hashed_password = get_password_hasher().hash(new_password)
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
 
-        update_query = "UPDATE users SET password = %s WHERE email = %s"
-        cursor.execute(update_query, (hashed_password, email))
-        connection.commit()
+            update_query = "UPDATE users SET password = %s WHERE email = %s"
+            cursor.execute(update_query, (hashed_password, email))
+            connection.commit()
+
+            cursor.close()
 
-        cursor.close()
-        connection.close()
+        invalidate_profile(email=email)
         return jsonify({"message": "Password Updated Successfully"}), 200
 
+    except HasherBusyError as e:
+        return password_busy_response(e)
+
     except Exception as e:
         print("Error updating password:", str(e))
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
 
+def metrics_allowed():
+    """
+    With METRICS_TOKEN set, /metrics needs `Authorization: Bearer <token>`;
+    without it, only requests from the host itself (e.g. `docker exec`) are served.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token:
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    if not metrics_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({
+        "db_pool": get_pool().stats(),
+        "profile_cache": get_profile_cache().stats(),
+        "identity_cache": get_identity_cache().stats(),
+        "adzuna_cache": adzuna.get_search_cache().stats(),
+        "general_analytics": global_analytics.get_snapshot().stats(),
+        "upstreams": http_client.stats(),
+        "generation_cache": get_generation_cache().stats(),
+        "generation_queue": get_generation_queue().stats(),
+        "outbox": get_outbox().stats(),
+        "otp_store": otp_store.get_otp_store().stats(),
+        "password_hashing": get_password_hasher().stats()
+    }), 200
+
+
+# Liveness: the process is up and serving requests
+@api.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+
+# Readiness: the database answers, so this worker can take traffic
+@api.route('/readyz', methods=['GET'])
+def readyz():
+    ready, body = warmup.readiness()
+    return jsonify(body), 200 if ready else 503
+
+
 if __name__ == '__main__':
-        app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+        create_app().run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Batch cover letter generation for /generateCoverLetters.
+
+The profile is loaded once for the whole batch and the cover letters run on
+the generation queue's workers. Batch items have their own per-user
+allowance, GENERATION_BATCH_LIMIT, separate from GENERATION_USER_LIMIT:
+items are submitted as earlier ones finish, so a batch keeps that many
+letters in flight (as far as GENERATION_WORKERS and the queue size allow)
+without blocking the user's single generations. Submissions are started no faster than GENERATION_RATE_LIMIT per second
+(burst GENERATION_RATE_BURST) across all batches in the process, to stay
+inside the OpenAI rate limits. Results are yielded in the order they finish.
+
+    GENERATION_BATCH_MAX      items per batch (20)
+"""
+import os
+import queue
+import threading
+import time
+
+import generation
+from generation_queue import QueueFullError, UserLimitError, get_generation_queue
+
+# How often to retry when the user's slots are held by generations outside this batch
+SLOT_POLL_SECONDS = 0.5
+
+JOBS_QUERY = "SELECT jobs_id, company_name, job_description FROM jobs WHERE jobs_id IN ({placeholders})"
+
+
+class BatchError(ValueError):
+    """Raised for batch requests that can't be run."""
+
+
+class RateLimiter:
+    """Token bucket: `rate` acquisitions per second on average, up to `burst` at once."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiter = None
+_lock = threading.Lock()
+
+
+def _shared_limiter():
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    rate=float(os.getenv("GENERATION_RATE_LIMIT", "5")),
+                    burst=float(os.getenv("GENERATION_RATE_BURST", "10"))
+                )
+    return _limiter
+
+
+def max_items():
+    return int(os.getenv("GENERATION_BATCH_MAX", "20"))
+
+
+def load_saved_jobs(cursor, jobs_ids):
+    """Return [{"jobs_id", "company_name", "job_description"}] in the order asked for."""
+    placeholders = ", ".join(["%s"] * len(jobs_ids))
+    cursor.execute(JOBS_QUERY.format(placeholders=placeholders), list(jobs_ids))
+    found = {row["jobs_id"]: row for row in cursor.fetchall()}
+    missing = [jobs_id for jobs_id in jobs_ids if jobs_id not in found]
+    if missing:
+        raise BatchError(f"Unknown jobs_id(s): {', '.join(str(i) for i in missing)}")
+    return [found[jobs_id] for jobs_id in jobs_ids]
+
+
+def build_items(profile, job_descriptions=None, saved_jobs=None):
+    """Pair each posting with its cover letter request."""
+    items = []
+    for description in job_descriptions or []:
+        description = (description or "").strip()
+        if not description:
+            raise BatchError("Job descriptions can't be empty")
+        items.append({"job_description": description})
+    for job in saved_jobs or []:
+        if not (job["job_description"] or "").strip():
+            raise BatchError(f"Job {job['jobs_id']} has no description")
+        items.append({"jobs_id": job["jobs_id"], "job_description": job["job_description"],
+                      "company_name": job["company_name"]})
+
+    if not items:
+        raise BatchError("Provide job_descriptions or jobs_ids")
+    if len(items) > max_items():
+        raise BatchError(f"At most {max_items()} cover letters can be generated at once")
+
+    for item in items:
+        item["request"] = generation.cover_letter_request(
+            profile, item["job_description"], company_name=item.get("company_name")
+        )
+    return items
+
+
+def _result(index, item, job=None, error=None):
+    result = {"index": index}
+    if "jobs_id" in item:
+        result["jobs_id"] = item["jobs_id"]
+    if job is not None and job.status == "done":
+        result["status"] = "done"
+        result["cover_letter"], result["cached"] = job.text, job.cached
+    else:
+        error = error if job is None else job.error
+        print(f"❌ Error generating cover letter {index}:", error)
+        result["status"] = "failed"
+        result["error"] = error
+    return result
+
+
+def run(items, user_id, regenerate=False):
+    """
+    Yield one result dict per item as it finishes, tagged with its position
+    in the request (`index`) and `jobs_id` for saved jobs. Closing the
+    generator stops submitting the items that haven't been queued yet.
+    """
+    generation_queue = get_generation_queue()
+    limiter = _shared_limiter()
+    finished = queue.Queue()
+    waiting = list(enumerate(items))
+    in_flight = 0
+    token_held = False
+
+    while waiting or in_flight:
+        # Don't knock on the queue for a slot this batch is already using
+        while waiting and in_flight < generation_queue.per_batch:
+            index, item = waiting[0]
+            if not token_held:
+                limiter.acquire()
+                token_held = True
+            try:
+                generation_queue.submit(
+                    item["request"], user_id, regenerate,
+                    on_done=lambda job, index=index: finished.put((index, job)), batch=True
+                )
+            except UserLimitError:
+                if in_flight:
+                    break
+                # The user's batch slots are taken by another batch
+                time.sleep(SLOT_POLL_SECONDS)
+                continue
+            except QueueFullError as e:
+                waiting.pop(0)
+                token_held = False
+                yield _result(index, item, error=str(e))
+                continue
+            waiting.pop(0)
+            token_held = False
+            in_flight += 1
+
+        if in_flight:
+            index, job = finished.get()
+            in_flight -= 1
+            yield _result(index, items[index], job)
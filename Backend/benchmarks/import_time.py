@@ -0,0 +1,81 @@
+"""
+Check how long `import app` takes, and that it doesn't load the clients
+create_app() leaves for first use.
+
+Imports the app in a fresh interpreter with `python -X importtime`, --runs
+times, and compares the fastest cumulative time against --max-ms. Also fails
+if any of LAZY_MODULES was imported along the way. Prints the slowest
+modules to show where a regression came from.
+
+    python benchmarks/import_time.py [--runs 5] [--max-ms 400] [--top 15]
+
+Exits 1 on failure, so it can run as a CI step.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Created on first use; importing any of these with the app is a regression
+LAZY_MODULES = ["openai", "requests", "urllib3", "mysql.connector", "smtplib", "email.mime.text", "tiktoken"]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+SCRIPT = (
+    "import sys, json, app; "
+    f"print(json.dumps(sorted(m for m in {LAZY_MODULES!r} if m in sys.modules)))"
+)
+
+
+def measure():
+    """Return (app cumulative seconds, [(module, self seconds)], eagerly loaded lazy modules)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    total = None
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append((name, int(self_us) / 1e6))
+        if name == "app" and not indent:
+            total = int(cumulative_us) / 1e6
+    return total, modules, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if importing the app is too slow.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=400)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(args.runs)]
+    best_total, best_modules, eager = min(runs, key=lambda run: run[0])
+
+    print(f"{'module':<50} {'self ms':>10}")
+    for name, seconds in sorted(best_modules, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"{name:<50} {seconds * 1000:>10.1f}")
+    print()
+    print(f"import app: {best_total * 1000:.1f} ms (best of {args.runs}, "
+          f"all: {', '.join(f'{run[0] * 1000:.0f}' for run in runs)}), limit {args.max_ms:.0f} ms")
+
+    failed = False
+    if best_total * 1000 > args.max_ms:
+        print(f"FAIL: import time is over {args.max_ms:.0f} ms")
+        failed = True
+    if eager:
+        print(f"FAIL: imported at start-up instead of on first use: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
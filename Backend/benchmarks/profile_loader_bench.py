@@ -0,0 +1,99 @@
+"""
+Benchmark the old users/profile/work_experience/education JOIN against
+profile_loader.load_profile for growing profile sizes.
+
+Runs against the database configured in .env. Each profile is seeded inside
+a transaction that is rolled back at the end, so nothing is left behind.
+
+    python benchmarks/profile_loader_bench.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from db import get_db_connection  # noqa: E402
+from profile_loader import load_profile  # noqa: E402
+
+JOIN_QUERY = """
+    SELECT
+        u.id AS user_id, u.email, u.firstname, u.lastname, u.phone, u.linkedin, u.city,
+        p.skills, p.certifications,
+        w.company_name, w.position, w.years_of_experience, w.job_description,
+        e.degree, e.school, e.gpa, e.field_of_study, YEAR(e.graduation_date) AS graduation_year
+    FROM users u
+    LEFT JOIN profile p ON p.id = u.id
+    LEFT JOIN work_experience w ON w.profile_id = u.id
+    LEFT JOIN education e ON e.profile_id = u.id
+    WHERE u.email = %s
+"""
+
+SIZES = [(1, 1), (5, 2), (15, 5), (30, 10), (60, 20)]
+
+
+def seed_profile(cursor, email, jobs, degrees):
+    cursor.execute(
+        "INSERT INTO users (firstname, lastname, email, password) VALUES (%s, %s, %s, %s)",
+        ("Bench", "User", email, "x")
+    )
+    user_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO profile (id, skills, certifications) VALUES (%s, %s, %s)",
+        (user_id, "Python, SQL, Flask", "AWS")
+    )
+    cursor.executemany(
+        "INSERT INTO work_experience (profile_id, company_name, position, years_of_experience, job_description) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        [(user_id, f"Company {i}", "Engineer", i % 5, "Built things. " * 20) for i in range(jobs)]
+    )
+    cursor.executemany(
+        "INSERT INTO education (profile_id, degree, school, gpa, field_of_study, graduation_date) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [(user_id, f"Degree {i}", "Seneca", 3.5, "CS", "2020-01-01") for i in range(degrees)]
+    )
+
+
+def time_it(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'jobs':>5} {'degrees':>8} | {'join rows':>9} {'join ms':>8} | {'loader rows':>11} {'loader ms':>9}")
+    with get_db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        try:
+            for jobs, degrees in SIZES:
+                email = f"profile-bench-{jobs}-{degrees}@example.invalid"
+                seed_profile(cursor, email, jobs, degrees)
+
+                def run_join():
+                    cursor.execute(JOIN_QUERY, (email,))
+                    return len(cursor.fetchall())
+
+                def run_loader():
+                    profile = load_profile(cursor, email=email)
+                    return 1 + len(profile["workExperience"]) + len(profile["education"])
+
+                join_ms, join_rows = time_it(run_join, args.repeat)
+                loader_ms, loader_rows = time_it(run_loader, args.repeat)
+                print(f"{jobs:>5} {degrees:>8} | {join_rows:>9} {join_ms:>8.2f} | {loader_rows:>11} {loader_ms:>9.2f}")
+        finally:
+            connection.rollback()
+            cursor.close()
+
+
+if __name__ == "__main__":
+    main()
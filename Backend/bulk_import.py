@@ -0,0 +1,221 @@
+"""
+Bulk job import for /createJobs.
+
+Takes a list of job dicts (the same fields /createJob accepts) or a CSV
+file with those fields as column headers. Rows are validated up front, then
+written in chunks of BULK_IMPORT_CHUNK_SIZE, each chunk in its own
+transaction:
+
+    1. one multi-row upsert into `jobs` on the canonical hash
+    2. one SELECT to map the hashes back to jobs_id
+    3. one SELECT for the jobs the user already tracks
+    4. one multi-row insert into `users_jobs` (and updates for existing links)
+    5. one rollup update for the whole chunk
+
+A failed chunk is rolled back and its rows reported as errors; the chunks
+before and after it are still imported.
+"""
+import csv
+import datetime
+import io
+import os
+
+import rollups
+from job_identity import canonical_job_hash
+
+STATUSES = ("Applied", "Interview", "Offer", "Rejected")
+
+FIELDS = ["job_title", "company_name", "job_location", "job_type", "job_status",
+          "date_applied", "job_link", "job_description"]
+
+# Column widths from the `jobs` table
+MAX_LENGTHS = {"job_title": 100, "company_name": 100, "job_location": 50, "job_type": 50, "job_link": 2083}
+
+# Spreadsheet headers that mean the same as a field name
+HEADER_ALIASES = {
+    "title": "job_title",
+    "company": "company_name",
+    "location": "job_location",
+    "type": "job_type",
+    "status": "job_status",
+    "date": "date_applied",
+    "link": "job_link",
+    "url": "job_link",
+    "description": "job_description",
+}
+
+INSERT_JOBS_QUERY = """
+    INSERT INTO jobs (job_title, company_name, job_location, job_type,
+                    job_link, job_description, canonical_hash)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE job_description = COALESCE(job_description, VALUES(job_description))
+"""
+
+INSERT_LINKS_QUERY = """
+    INSERT INTO users_jobs (job_id, user_id, date_applied, status)
+    VALUES (%s, %s, %s, %s)
+"""
+
+UPDATE_LINK_QUERY = """
+    UPDATE users_jobs
+    SET status = %s, date_applied = %s
+    WHERE job_id = %s AND user_id = %s
+"""
+
+
+class BulkImportError(ValueError):
+    """Raised when the payload as a whole can't be imported."""
+
+
+def max_rows():
+    return int(os.getenv("BULK_IMPORT_MAX_ROWS", "5000"))
+
+
+def chunk_size():
+    return int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+
+
+def _header(name):
+    name = "_".join((name or "").strip().lower().split())
+    return HEADER_ALIASES.get(name, name)
+
+
+def parse_csv(stream):
+    """Read an uploaded CSV file into a list of row dicts keyed by field name."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    try:
+        headers = [_header(h) for h in next(reader)]
+    except StopIteration:
+        raise BulkImportError("CSV file is empty")
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise BulkImportError(f"Could not read CSV file: {e}")
+
+    if "job_title" not in headers or "company_name" not in headers:
+        raise BulkImportError("CSV file needs job_title and company_name columns")
+
+    try:
+        return [dict(zip(headers, values)) for values in reader if any(v.strip() for v in values)]
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise BulkImportError(f"Could not read CSV file: {e}")
+
+
+def validate_row(row):
+    """Return (job, None) with cleaned values, or (None, error message)."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+
+    job = {}
+    for field in FIELDS:
+        value = row.get(field)
+        value = str(value).strip() if value is not None else ""
+        job[field] = value or None
+
+    for field in ("job_title", "company_name"):
+        if not job[field]:
+            return None, f"{field} is required"
+    for field, length in MAX_LENGTHS.items():
+        if job[field] and len(job[field]) > length:
+            return None, f"{field} is longer than {length} characters"
+
+    # Columns that are NOT NULL in `jobs`
+    job["job_location"] = job["job_location"] or ""
+    job["job_type"] = job["job_type"] or ""
+
+    job["job_status"] = job["job_status"] or "Applied"
+    if job["job_status"] not in STATUSES:
+        return None, f"job_status must be one of {', '.join(STATUSES)}"
+
+    if job["date_applied"]:
+        try:
+            job["date_applied"] = datetime.date.fromisoformat(job["date_applied"])
+        except ValueError:
+            return None, "date_applied must be a date in YYYY-MM-DD format"
+
+    job["canonical_hash"] = canonical_job_hash(
+        job["job_link"], job["job_title"], job["company_name"], job["job_location"]
+    )
+    return job, None
+
+
+def _import_chunk(cursor, user_id, chunk):
+    """Write one chunk of (row number, job) pairs. Returns {row number: result}."""
+    cursor.executemany(INSERT_JOBS_QUERY, [
+        (job["job_title"], job["company_name"], job["job_location"], job["job_type"],
+         job["job_link"], job["job_description"], job["canonical_hash"])
+        for _, job in chunk
+    ])
+
+    hashes = list({job["canonical_hash"] for _, job in chunk})
+    placeholders = ", ".join(["%s"] * len(hashes))
+    cursor.execute(f"SELECT canonical_hash, jobs_id FROM jobs WHERE canonical_hash IN ({placeholders})", hashes)
+    job_ids = dict(cursor.fetchall())
+
+    ids = list(set(job_ids.values()))
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(
+        f"SELECT DISTINCT job_id FROM users_jobs WHERE user_id = %s AND job_id IN ({placeholders})",
+        [user_id] + ids
+    )
+    linked = {row[0] for row in cursor.fetchall()}
+
+    before = rollups.snapshot_many(cursor, user_id, linked)
+
+    results = {}
+    inserts = []
+    updates = []
+    for number, job in chunk:
+        job_id = job_ids[job["canonical_hash"]]
+        link = (job["job_status"], job["date_applied"], job_id, user_id)
+        if job_id in linked:
+            updates.append(link)
+            results[number] = {"row": number, "status": "updated", "job_id": job_id}
+        else:
+            # Later rows for the same job in this chunk update the new link
+            linked.add(job_id)
+            inserts.append((job_id, user_id, job["date_applied"], job["job_status"]))
+            results[number] = {"row": number, "status": "created", "job_id": job_id}
+
+    if inserts:
+        cursor.executemany(INSERT_LINKS_QUERY, inserts)
+    if updates:
+        cursor.executemany(UPDATE_LINK_QUERY, updates)
+
+    rollups.apply_changes(cursor, user_id, before, rollups.snapshot_many(cursor, user_id, linked))
+    return results
+
+
+def import_jobs(connection, user_id, rows, size=None):
+    """
+    Validate and import rows for one user. Returns a summary with one result
+    per input row, numbered from 1 in input order.
+    """
+    if len(rows) > max_rows():
+        raise BulkImportError(f"At most {max_rows()} rows can be imported at once")
+
+    results = {}
+    valid = []
+    for number, row in enumerate(rows, start=1):
+        job, error = validate_row(row)
+        if error:
+            results[number] = {"row": number, "status": "error", "error": error}
+        else:
+            valid.append((number, job))
+
+    size = size or chunk_size()
+    cursor = connection.cursor()
+    for start in range(0, len(valid), size):
+        chunk = valid[start:start + size]
+        try:
+            results.update(_import_chunk(cursor, user_id, chunk))
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            print("Error importing jobs chunk:", str(e))
+            for number, _ in chunk:
+                results[number] = {"row": number, "status": "error", "error": "Could not save row"}
+    cursor.close()
+
+    ordered = [results[number] for number in sorted(results)]
+    summary = {status: sum(1 for r in ordered if r["status"] == status) for status in ("created", "updated", "error")}
+    return {**summary, "results": ordered}
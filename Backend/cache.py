@@ -0,0 +1,273 @@
+"""
+Small LRU + TTL cache with pluggable storage.
+
+`MemoryBackend` keeps entries in the current process. `SQLiteBackend` keeps
+them in a local SQLite file so every worker on the host shares one cache,
+standing in for a networked store like Redis. Both evict least recently used
+entries once they hold `max_entries`, and both hand out copies, so callers
+can't change a cached value by mutating what they got back.
+
+A memory cache is only invalidated in the process that wrote the change, so
+caches that other workers must see invalidations for use the SQLite backend
+under gunicorn (see gunicorn.conf.py).
+"""
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return copy.deepcopy(entry)
+
+    def set(self, key, value, expires_at):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Values are stored as JSON, so they must be JSON-serializable (Decimal becomes str)."""
+
+    def __init__(self, path, table="cache", max_entries=1000):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute(
+            f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        connection = self._connection()
+        connection.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, default=str), expires_at, time.time())
+        )
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            cursor = connection.execute(f"""
+                DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY last_access LIMIT ?
+                )
+            """, (overflow,))
+            self.evictions += cursor.rowcount
+
+    def delete(self, key):
+        cursor = self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        self._connection().execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    LRU + TTL cache in front of a backend.
+
+    Expired entries count as misses for `get()` but are kept until evicted or
+    overwritten, so callers can still fall back to them with `get_stale()`.
+    """
+
+    def __init__(self, name, ttl, backend):
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._invalidations = 0
+        self._coalesced = 0
+        self._stale_served = 0
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self._misses += 1
+                self._expired += 1
+                return None
+            self._hits += 1
+            return value
+
+    def get_stale(self, key):
+        entry = self.backend.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, time.time() + (self.ttl if ttl is None else ttl))
+
+    def get_or_load(self, key, load, serve_stale=True):
+        """
+        Return the cached value, or call `load()` and cache its result.
+
+        Concurrent misses for the same key in this process share a single
+        `load()` call. If `load()` raises and `serve_stale` is set, an expired
+        entry is returned instead (and not re-cached), when there is one.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            try:
+                value = load()
+            except Exception:
+                value = self.get_stale(key) if serve_stale else None
+                if value is None:
+                    raise
+                with self._lock:
+                    self._stale_served += 1
+            else:
+                self.set(key, value)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def delete(self, key):
+        if self.backend.delete(key):
+            with self._lock:
+                self._invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": type(self.backend).__name__,
+                "entries": len(self.backend),
+                "max_entries": self.backend.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "expired": self._expired,
+                "evictions": self.backend.evictions,
+                "invalidations": self._invalidations,
+                "coalesced": self._coalesced,
+                "stale_served": self._stale_served,
+            }
+
+
+def make_cache(name, ttl, max_entries):
+    """
+    Build a cache configured from the environment.
+
+    `<NAME>_CACHE_BACKEND` selects "memory" (default) or "sqlite", and
+    `<NAME>_CACHE_PATH` sets the SQLite file shared by all workers. With
+    more than one worker process, a memory cache goes stale in every worker
+    but the one that invalidated it; gunicorn.conf.py defaults the caches
+    that matter to "sqlite".
+    """
+    prefix = name.upper()
+    ttl = float(os.getenv(f"{prefix}_CACHE_TTL", ttl))
+    max_entries = int(os.getenv(f"{prefix}_CACHE_SIZE", max_entries))
+    backend_name = os.getenv(f"{prefix}_CACHE_BACKEND", "memory").lower()
+
+    if backend_name == "sqlite":
+        path = os.getenv(f"{prefix}_CACHE_PATH", os.path.join("instance", "cache.sqlite3"))
+        backend = SQLiteBackend(path, table=f"{name}_cache", max_entries=max_entries)
+    else:
+        backend = MemoryBackend(max_entries=max_entries)
+
+    return TTLCache(name, ttl, backend)
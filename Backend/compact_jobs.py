@@ -0,0 +1,129 @@
+"""
+One-off compaction of duplicate catalog rows.
+
+Computes the canonical hash (see job_identity.py) of every `jobs` row,
+merges each group of duplicates into its oldest row, repoints
+`users_jobs` at the survivor, drops the duplicate links that leaves behind
+(keeping each user's most recent one), fills in `canonical_hash` and
+rebuilds the analytics rollups, all in one transaction.
+
+Run it once after migration 0003, and again at any time; it is a no-op
+when the catalog is already compact:
+
+    python compact_jobs.py [--dry-run]
+"""
+import argparse
+import sys
+from collections import defaultdict
+
+from job_identity import canonical_job_hash
+
+JOBS_QUERY = """
+    SELECT jobs_id, job_title, company_name, job_location, job_link, job_description, canonical_hash
+    FROM jobs
+    ORDER BY jobs_id
+"""
+
+# Keep the newest link when merging left a user tracking the same job twice
+DUPLICATE_LINKS_QUERY = """
+    DELETE older FROM users_jobs older
+    JOIN users_jobs newer
+        ON newer.user_id = older.user_id AND newer.job_id = older.job_id AND newer.id > older.id
+"""
+
+
+def plan(rows):
+    """
+    Group rows by canonical hash. Returns ({survivor_id: [duplicate ids]},
+    {survivor_id: hash}) for the groups and hashes that need writing.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        jobs_id, job_title, company_name, job_location, job_link, _, current_hash = row
+        key = canonical_job_hash(job_link, job_title, company_name, job_location)
+        groups[key].append((jobs_id, current_hash))
+
+    merges = {}
+    hashes = {}
+    for key, members in groups.items():
+        survivor_id, current_hash = members[0]
+        if len(members) > 1:
+            merges[survivor_id] = [jobs_id for jobs_id, _ in members[1:]]
+        if current_hash != key:
+            hashes[survivor_id] = key
+    return merges, hashes
+
+
+def compact(cursor, dry_run=False, out=print):
+    """Merge duplicate jobs rows. Caller commits."""
+    cursor.execute(JOBS_QUERY)
+    rows = cursor.fetchall()
+    merges, hashes = plan(rows)
+    descriptions = {row[0]: row[5] for row in rows}
+
+    duplicates = sum(len(ids) for ids in merges.values())
+    out(f"{len(rows)} jobs, {duplicates} duplicates in {len(merges)} groups, {len(hashes)} hashes to set")
+    if dry_run:
+        return {"jobs": len(rows), "merged": duplicates, "links_removed": 0}
+
+    links_moved = 0
+    for survivor_id, duplicate_ids in merges.items():
+        placeholders = ", ".join(["%s"] * len(duplicate_ids))
+        cursor.execute(
+            f"UPDATE users_jobs SET job_id = %s WHERE job_id IN ({placeholders})",
+            [survivor_id] + duplicate_ids
+        )
+        links_moved += cursor.rowcount
+
+        # Keep a description if the survivor never had one
+        if not descriptions.get(survivor_id):
+            description = next((descriptions[i] for i in duplicate_ids if descriptions.get(i)), None)
+            if description:
+                cursor.execute(
+                    "UPDATE jobs SET job_description = %s WHERE jobs_id = %s",
+                    (description, survivor_id)
+                )
+
+        cursor.execute(f"DELETE FROM jobs WHERE jobs_id IN ({placeholders})", duplicate_ids)
+
+    cursor.execute(DUPLICATE_LINKS_QUERY)
+    links_removed = cursor.rowcount
+
+    # Duplicates are gone, so setting the hashes can't collide on the unique index
+    if hashes:
+        cursor.executemany(
+            "UPDATE jobs SET canonical_hash = %s WHERE jobs_id = %s",
+            [(key, jobs_id) for jobs_id, key in hashes.items()]
+        )
+
+    if merges:
+        import rollups
+        rollups.rebuild(cursor)
+
+    out(f"Merged {duplicates} jobs, moved {links_moved} links, removed {links_removed} duplicate links")
+    return {"jobs": len(rows), "merged": duplicates, "links_removed": links_removed}
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from db import get_db_connection
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Merge duplicate job catalog rows.")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args(argv)
+
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        compact(cursor, dry_run=args.dry_run)
+        if args.dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+        cursor.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
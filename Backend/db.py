@@ -0,0 +1,225 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection could be checked out before the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of MySQL connections.
+
+    Connections are opened lazily up to `size`, handed out through the
+    `connection()` context manager and returned to the pool when the block
+    exits, so error paths can no longer leak them. Idle connections are
+    pinged before reuse and reopened if the server has dropped them.
+
+    A borrower that can't leave a connection clean (say, an unbuffered read
+    abandoned halfway) sets `connection.reusable = False`; it is then closed
+    on return instead of draining the rest of the result into the pool.
+    """
+
+    def __init__(self, size=5, timeout=10.0, ping_interval=30.0, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect_args = connect_args
+
+        # Imported with the pool rather than with the app
+        import mysql.connector  # type: ignore
+        self._mysql = mysql.connector
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+        # Stats
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._peak_in_use = 0
+
+    def _connect(self):
+        connection = self._mysql.connect(**self.connect_args)
+        connection.last_used = time.monotonic()
+        connection.reusable = True
+        return connection
+
+    def _is_healthy(self, connection):
+        # Only ping connections that have been sitting idle for a while
+        if time.monotonic() - connection.last_used < self.ping_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except self._mysql.Error:
+            return False
+
+    def _discard(self, connection):
+        try:
+            if connection.reusable:
+                connection.close()
+            else:
+                # Drop the socket without reading whatever the server is still sending
+                connection.shutdown()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        start = time.monotonic()
+        waited = False
+
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = None
+
+            if connection is None:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        connection = self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                else:
+                    # Pool is saturated, wait for a connection to come back
+                    waited = True
+                    remaining = self.timeout - (time.monotonic() - start)
+                    try:
+                        connection = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        with self._lock:
+                            self._timeouts += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available after {self.timeout}s "
+                            f"(pool size {self.size})"
+                        )
+
+            if not self._is_healthy(connection):
+                # Stale connection, replace it with a fresh one
+                self._discard(connection)
+                with self._lock:
+                    self._reconnects += 1
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            wait_time = time.monotonic() - start
+            with self._lock:
+                self._checkouts += 1
+                self._in_use += 1
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+                if waited:
+                    self._waits += 1
+                    self._total_wait += wait_time
+                    self._max_wait = max(self._max_wait, wait_time)
+            return connection
+
+    def _checkin(self, connection):
+        with self._lock:
+            self._in_use -= 1
+
+        if not connection.reusable:
+            self._discard(connection)
+            with self._lock:
+                self._created -= 1
+            return
+
+        try:
+            # Drop unread rows and end any open transaction so the next
+            # borrower neither trips over leftovers nor reads an old snapshot
+            connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+            healthy = connection.is_connected()
+        except self._mysql.Error:
+            healthy = False
+
+        if not healthy:
+            self._discard(connection)
+            with self._lock:
+                self._created -= 1
+            return
+
+        connection.last_used = time.monotonic()
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._checkout()
+        try:
+            yield connection
+        finally:
+            self._checkin(connection)
+
+    def warm_up(self, count=None):
+        """Open up to `count` connections ahead of the first request."""
+        count = self.size if count is None else min(count, self.size)
+        opened = []
+        try:
+            for _ in range(count):
+                opened.append(self._checkout())
+        finally:
+            for connection in opened:
+                self._checkin(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": self._created - self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "saturation": round(self._in_use / self.size, 3) if self.size else 0,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "reconnects": self._reconnects,
+                "avg_wait_ms": round(self._total_wait / self._waits * 1000, 3) if self._waits else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=int(os.getenv("DB_POOL_SIZE", "5")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                    ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL", "30")),
+                    host=os.getenv("DB_HOST"),
+                    user=os.getenv("DB_USER"),
+                    password=os.getenv("DB_PASSWORD"),
+                    database=os.getenv("DB_NAME"),
+                )
+    return _pool
+
+
+def get_db_connection():
+    """Check out a pooled connection: `with get_db_connection() as connection: ...`"""
+    return get_pool().connection()
@@ -0,0 +1,211 @@
+"""
+EXPLAIN regression checks for the API's SQL.
+
+Collects every SQL statement written as a string literal in the backend
+modules, plus representative output of the dynamic query builders, runs
+EXPLAIN on each and fails if MySQL plans a full table scan (type ALL) on a
+table of at least --min-rows rows, unless the statement is listed in
+ALLOWED_FULL_SCANS.
+
+Run it against a database with realistic data, or let it seed a scratch
+database first (never point --seed at production):
+
+    python migrate.py explain [--seed 5000] [--min-rows 500]
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SOURCE_FILES = [
+    "app.py",
+    "profile_loader.py",
+    "identity.py",
+    "rollups.py",
+    "global_analytics.py",
+    "compact_jobs.py",
+    "bulk_import.py",
+    "batch_generation.py",
+]
+
+SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+# Statements that are expected to scan a whole table, matched against their
+# whitespace-normalized text, with the reason
+ALLOWED_FULL_SCANS = [
+    (re.compile(r"GROUP BY j\.(company_name|job_title|job_location)\b"),
+     "platform-wide aggregate, materialized by global_analytics"),
+    (re.compile(r"WHERE status IN \('Offer', 'Rejected'\)"),
+     "platform-wide aggregate, materialized by global_analytics"),
+    (re.compile(r"IS NOT NULL GROUP BY"), "rollup rebuild over every user, run offline"),
+    (re.compile(r"^DELETE FROM user_job_rollups$"), "rollup rebuild over every user, run offline"),
+    (re.compile(r"FROM user_job_rollups WHERE count <> 0$"), "rollup verification over every user, run offline"),
+    (re.compile(r"FROM jobs j ORDER BY"), "unfiltered catalog listing reads every row by design"),
+]
+
+
+def collect_literal_statements():
+    """Yield (label, sql) for SQL string literals in the source files."""
+    for filename in SOURCE_FILES:
+        path = os.path.join(BACKEND_DIR, filename)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_START.match(node.value):
+                # Templates are covered by collect_builder_statements()
+                if "{" in node.value:
+                    continue
+                yield f"{filename}:{node.lineno}", node.value
+
+
+def collect_builder_statements():
+    """Yield (label, sql) for representative queries from the dynamic builders."""
+    import batch_generation
+    import job_queries
+    import profile_loader
+    import rollups
+
+    yield "profile_loader.USER_QUERY[id]", profile_loader.USER_QUERY.format(where="u.id = %s")
+    yield "profile_loader.USER_QUERY[email]", profile_loader.USER_QUERY.format(where="u.email = %s")
+
+    for label, args in [
+        ("first page", {"limit": "50"}),
+        ("next page", {"limit": "50", "cursor": "100"}),
+        ("status filter", {"limit": "50", "status": "Applied,Interview"}),
+        ("date range", {"limit": "50", "date_from": "2024-01-01", "date_to": "2024-12-31"}),
+    ]:
+        opts = job_queries.parse_list_args(args)
+        yield f"job_queries.build_user_jobs_query[{label}]", job_queries.build_user_jobs_query(1, opts)[0]
+
+    for label, args in [
+        ("first page", {"limit": "50"}),
+        ("company filter", {"limit": "50", "company": "Acme"}),
+        ("type filter", {"limit": "50", "job_type": "Full-time"}),
+    ]:
+        opts = job_queries.parse_list_args(args)
+        yield f"job_queries.build_all_jobs_query[{label}]", job_queries.build_all_jobs_query(opts)[0]
+
+    for label, args in [
+        ("keywords", {"q": "python developer"}),
+        ("keywords and filters", {"q": "python", "company": "Acme", "location": "Toronto", "job_type": "Full-time"}),
+        ("location only", {"location": "Toronto"}),
+    ]:
+        opts = job_queries.parse_search_args(args)
+        yield f"job_queries.build_search_query[{label}]", job_queries.build_search_query(opts)[0]
+
+    yield "batch_generation.JOBS_QUERY", batch_generation.JOBS_QUERY.format(placeholders="%s, %s, %s")
+
+    yield "rollups.SNAPSHOT_MANY_QUERY", rollups.SNAPSHOT_MANY_QUERY.format(placeholders="%s, %s, %s")
+
+    for dimension, (column, query) in rollups.LIVE_QUERIES.items():
+        yield f"rollups.LIVE_QUERIES[{dimension}, one user]", query.format(where=f"WHERE {column} = %s")
+        yield f"rollups.LIVE_QUERIES[{dimension}, all users]", query.format(where=f"WHERE {column} IS NOT NULL")
+
+
+def bind_placeholders(sql):
+    """Replace driver placeholders with literals so MySQL can EXPLAIN the statement."""
+    # LIMIT and OFFSET only accept unquoted integers
+    sql = re.sub(r"\b(LIMIT|OFFSET)\s+%s", r"\1 1", sql)
+    return sql.replace("%s", "'1'")
+
+
+def allowed_reason(sql):
+    flat = " ".join(sql.split()).rstrip(";")
+    for pattern, reason in ALLOWED_FULL_SCANS:
+        if pattern.search(flat):
+            return reason
+    return None
+
+
+def explain(cursor, sql):
+    cursor.execute("EXPLAIN " + bind_placeholders(sql))
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def seed(connection, rows):
+    """Fill a scratch database with synthetic rows and refresh index statistics."""
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO users (firstname, lastname, email, password) VALUES (%s, %s, %s, %s)",
+        [("Seed", str(i), f"seed-{i}@example.invalid", "x") for i in range(rows // 10 or 1)]
+    )
+    cursor.execute("SELECT MIN(id), MAX(id) FROM users WHERE email LIKE 'seed-%'")
+    first_user, last_user = cursor.fetchone()
+    cursor.executemany(
+        "INSERT INTO jobs (job_title, company_name, job_location, job_type, job_link, job_description) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [(f"Title {i % 97}", f"Company {i % 89}", f"City {i % 31}", f"Type {i % 5}",
+          f"https://example.invalid/jobs/{i}", "Description") for i in range(rows)]
+    )
+    cursor.execute("SELECT MIN(jobs_id), MAX(jobs_id) FROM jobs WHERE job_link LIKE 'https://example.invalid/%'")
+    first_job, last_job = cursor.fetchone()
+    users = last_user - first_user + 1
+    cursor.executemany(
+        "INSERT INTO users_jobs (job_id, user_id, date_applied, status) VALUES (%s, %s, %s, %s)",
+        [(first_job + i, first_user + i % users, f"2024-{i % 12 + 1:02d}-01",
+          ("Applied", "Interview", "Offer", "Rejected")[i % 4]) for i in range(last_job - first_job + 1)]
+    )
+    connection.commit()
+    for table in ("users", "jobs", "users_jobs", "user_job_rollups"):
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    cursor.close()
+
+
+def check(connection, min_rows, out=print):
+    """Return a list of (label, table, rows) full scans that are not allowed."""
+    cursor = connection.cursor()
+    failures = []
+    statements = list(collect_literal_statements()) + list(collect_builder_statements())
+
+    for label, sql in statements:
+        try:
+            plan = explain(cursor, sql)
+        except Exception as e:
+            out(f"ERROR {label}: {e}")
+            failures.append((label, None, str(e)))
+            continue
+        finally:
+            # EXPLAIN of INSERT/UPDATE/DELETE never executes, but be certain
+            connection.rollback()
+
+        for step in plan:
+            if step.get("type") != "ALL" or int(step.get("rows") or 0) < min_rows:
+                continue
+            reason = allowed_reason(sql)
+            if reason:
+                out(f"ok    {label}: full scan of {step['table']} allowed ({reason})")
+            else:
+                out(f"FAIL  {label}: full scan of {step['table']} (~{step['rows']} rows)")
+                failures.append((label, step["table"], step["rows"]))
+
+    cursor.close()
+    out(f"Checked {len(statements)} statements, {len(failures)} problem(s)")
+    return failures
+
+
+def main(argv=None):
+    sys.path.insert(0, BACKEND_DIR)
+    from dotenv import load_dotenv
+    from db import get_db_connection
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Fail on unexpected full table scans.")
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic jobs first (scratch DBs only)")
+    parser.add_argument("--min-rows", type=int, default=500, help="ignore full scans of smaller tables")
+    args = parser.parse_args(argv)
+
+    with get_db_connection() as connection:
+        if args.seed:
+            seed(connection, args.seed)
+        failures = check(connection, args.min_rows)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Streaming exports of the job catalog and a user's applications.
+
+Rows are read through an unbuffered cursor in `fetchmany` batches and
+written out as they arrive, so memory use stays flat however large the
+result set is.
+"""
+import csv
+import io
+import json
+import os
+
+from db import get_db_connection
+
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def stream_rows(query, params=(), batch_size=None):
+    """
+    Yield rows one at a time while holding a single pooled connection.
+
+    If the generator is closed early (the client disconnected) the rest of
+    the result is still on the wire, so the connection is dropped rather
+    than drained back into the pool.
+    """
+    batch_size = batch_size or int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+    with get_db_connection() as connection:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        finished = False
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+            else:
+                connection.reusable = False
+
+
+def to_ndjson(rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(json.dumps(row, default=str) + "\n")
+        # Send ~64KB chunks instead of one tiny write per row
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def to_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode(rows, export_format, columns):
+    if export_format == "csv":
+        return to_csv(rows, columns)
+    return to_ndjson(rows)
@@ -0,0 +1,152 @@
+"""
+Local stand-in for the OpenAI chat completions API, for development and
+manual testing of the generation endpoints without an API key or cost.
+
+    python fake_openai.py [--port 8089] [--delay 0.05] [--words 80] [--latency 0]
+                          [--fail-every 0] [--fail-status 503]
+
+then start the backend with
+
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python app.py
+
+It answers POST /v1/chat/completions, both plain and with "stream": true
+(sent as server-sent events, one word per chunk every --delay seconds), with
+deterministic text built from the prompt, so repeated requests are
+comparable. --latency holds every request before answering, like the time
+to the first token. --fail-every N answers every Nth request with
+--fail-status (503, or 429 for rate limiting), to exercise retries.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def reply_words(messages, count):
+    prompt = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    words = prompt.split() or ["lorem", "ipsum"]
+    return [words[i % len(words)] for i in range(count)]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None
+    requests = 0
+    requests_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        print("fake-openai:", format % args)
+
+    def _json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            return self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.requests_lock:
+            FakeOpenAIHandler.requests += 1
+            number = FakeOpenAIHandler.requests
+        time.sleep(self.options.latency)
+        fail_every = self.options.fail_every
+        if fail_every and number % fail_every == 0:
+            if self.options.fail_status == 429:
+                return self._json(429, {"error": {"message": "Fake rate limit", "type": "requests",
+                                                  "code": "rate_limit_exceeded"}})
+            return self._json(self.options.fail_status, {"error": {"message": "Fake overload", "type": "server_error"}})
+
+        model = request.get("model", "gpt-4o")
+        words = reply_words(request.get("messages", []), min(self.options.words, request.get("max_tokens") or 10 ** 6))
+        completion_id = f"chatcmpl-fake-{number}"
+        created = int(time.time())
+
+        if not request.get("stream"):
+            return self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            send({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                time.sleep(self.options.delay)
+                send({"content": word if i == 0 else " " + word})
+            send({}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            print(f"fake-openai: {completion_id} cancelled by the client")
+        self.close_connection = True
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    # Room for a burst of parallel requests without the kernel dropping connects
+    request_queue_size = 64
+    daemon_threads = True
+
+
+def serve(port=8089, delay=0.05, words=80, fail_every=0, fail_status=503, latency=0.0):
+    """A server that hasn't started serving yet; port 0 picks a free one (see server.server_port)."""
+    FakeOpenAIHandler.options = argparse.Namespace(
+        delay=delay, words=words, fail_every=fail_every, fail_status=fail_status, latency=latency
+    )
+    FakeOpenAIHandler.requests = 0
+    return FakeOpenAIServer(("127.0.0.1", port), FakeOpenAIHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI chat completions API.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between streamed words")
+    parser.add_argument("--words", type=int, default=80, help="words per completion")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to hold each request before answering")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=503, help="status for failed requests, e.g. 429 or 503")
+    args = parser.parse_args(argv)
+
+    server = serve(args.port, args.delay, args.words, args.fail_every, args.fail_status, args.latency)
+    print(f"Fake OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
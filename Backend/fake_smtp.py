@@ -0,0 +1,112 @@
+"""
+Local stand-in for an SMTP server, for development and manual testing of
+the outbox (OTP emails) without a real mailbox.
+
+    python fake_smtp.py [--port 8025] [--delay 0] [--fail-every 0] [--drop-every 0]
+
+then start the backend with
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 SMTP_USERNAME= python app.py
+
+Every accepted message is printed and kept in `messages`. --delay adds a
+pause before each reply to DATA, to look like a slow server. --fail-every N
+answers every Nth message with a 451 (retried by the outbox) and
+--drop-every N closes the connection instead, to exercise reconnects.
+It speaks plain SMTP only: no STARTTLS and no AUTH.
+"""
+import argparse
+import itertools
+import socketserver
+import sys
+import threading
+import time
+
+messages = []
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    options = None
+    counter = itertools.count(1)
+    counter_lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("utf-8"))
+
+    def handle(self):
+        print(f"fake-smtp: connection from {self.client_address[0]}:{self.client_address[1]}")
+        self.reply("220 fake-smtp ready")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = command[:4].upper()
+
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 fake-smtp" if verb == "HELO" else "250-fake-smtp\r\n250 8BITMIME")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    line = line.decode("utf-8", "replace").rstrip("\r\n")
+                    if line == ".":
+                        break
+                    lines.append(line[1:] if line.startswith("..") else line)
+
+                with self.counter_lock:
+                    number = next(self.counter)
+                time.sleep(self.options.delay)
+                if self.options.drop_every and number % self.options.drop_every == 0:
+                    print(f"fake-smtp: dropping connection on message {number}")
+                    return
+                if self.options.fail_every and number % self.options.fail_every == 0:
+                    self.reply("451 Fake temporary failure")
+                else:
+                    messages.append({"from": sender, "to": recipients, "data": "\n".join(lines)})
+                    print(f"fake-smtp: message {number} from {sender} to {', '.join(recipients)}")
+                    self.reply("250 OK")
+                sender, recipients = None, []
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def serve(port=8025, delay=0.0, fail_every=0, drop_every=0):
+    """A server that hasn't started serving yet; port 0 picks a free one (see server.server_address)."""
+    FakeSMTPHandler.options = argparse.Namespace(delay=delay, fail_every=fail_every, drop_every=drop_every)
+    FakeSMTPHandler.counter = itertools.count(1)
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), FakeSMTPHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake SMTP server.")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds before answering each message")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth message with a 451")
+    parser.add_argument("--drop-every", type=int, default=0, help="drop the connection on every Nth message")
+    args = parser.parse_args(argv)
+
+    server = serve(args.port, args.delay, args.fail_every, args.drop_every)
+    print(f"Fake SMTP server on 127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
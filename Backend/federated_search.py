@@ -0,0 +1,148 @@
+"""
+Federated search across the job providers for /search.
+
+Every provider is queried at once, each on its own pool of SEARCH_WORKERS
+threads (default 4), and the response is built from whatever has finished
+when SEARCH_BUDGET_SECONDS (default 5) runs out. A provider that is slow or
+failing is reported in `providers` instead of holding up the others; its
+call keeps running in the background, so a slow Adzuna page still lands in
+the Adzuna cache for the next search. Because the pools are separate, a
+provider that hangs can only use up its own threads, and calls still
+queued for a thread when the budget runs out are cancelled. Each provider
+takes at most SEARCH_MAX_PENDING calls (default four per thread) running
+or queued at once; past that, searches report it as "busy" straight away
+and the other providers keep answering.
+
+Results use the jooble.format_job schema plus a `source` field, and
+postings listed by more than one provider are returned once, matched by
+link or by title and company. Title and company only match across
+providers: one provider listing the same role twice (say, in two cities)
+keeps both.
+"""
+import concurrent.futures
+import os
+import threading
+import time
+
+import adzuna
+import jooble
+from job_identity import normalize_link, normalize_text
+
+PROVIDERS = {
+    "adzuna": lambda q: [adzuna.format_job(job) for job in adzuna.search(q["country"], q["keyword"], q["page"])["jobs_data"]],
+    "jooble": lambda q: jooble.search(q["keyword"], q["location"]),
+}
+
+class ProviderBusyError(Exception):
+    """Every thread for the provider is still working on earlier searches."""
+
+
+class ProviderPool:
+    """A bounded thread pool for one provider that refuses work once `max_pending` calls are waiting."""
+
+    def __init__(self, name, workers, max_pending):
+        self.name = name
+        self.workers = workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"search-{name}"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise ProviderBusyError(f"{self.name} is busy with earlier searches")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # Runs when the call finishes or is cancelled before it started
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                workers = int(os.getenv("SEARCH_WORKERS", "4"))
+                max_pending = int(os.getenv("SEARCH_MAX_PENDING", str(workers * 4)))
+                pool = _pools[name] = ProviderPool(name, workers, max(workers, max_pending))
+    return pool
+
+
+def budget_seconds():
+    return float(os.getenv("SEARCH_BUDGET_SECONDS", "5"))
+
+
+def _timed(provider, query):
+    start = time.monotonic()
+    jobs = PROVIDERS[provider](query)
+    return jobs, time.monotonic() - start
+
+
+def dedupe(jobs):
+    """
+    Drop jobs whose link was already seen, or whose title and company were
+    already seen from another provider.
+    """
+    links = set()
+    title_sources = {}
+    unique = []
+    for job in jobs:
+        link = normalize_link(job.get("link"))
+        title = (normalize_text(job.get("title")), normalize_text(job.get("company")))
+        sources = title_sources.setdefault(title, set())
+        if (link and link in links) or sources - {job.get("source")}:
+            continue
+        if link:
+            links.add(link)
+        sources.add(job.get("source"))
+        unique.append(job)
+    return unique
+
+
+def search(query, providers=None, budget=None):
+    """
+    Query providers concurrently. Returns (body, any_succeeded), where body
+    has the merged `jobs` and a status per provider: ok, error, timeout or busy.
+    """
+    providers = providers or list(PROVIDERS)
+    budget = budget_seconds() if budget is None else budget
+
+    results = {}
+    statuses = {}
+    futures = {}
+    for name in providers:
+        try:
+            futures[get_pool(name).submit(_timed, name, query)] = name
+        except ProviderBusyError as e:
+            statuses[name] = {"status": "busy", "error": str(e)}
+    done, not_done = concurrent.futures.wait(futures, timeout=budget)
+    for future in not_done:
+        # Calls that haven't started yet aren't worth starting now
+        future.cancel()
+
+    for future, name in futures.items():
+        if future not in done:
+            statuses[name] = {"status": "timeout", "budget_ms": round(budget * 1000)}
+            continue
+        try:
+            jobs, elapsed = future.result()
+        except Exception as e:
+            print(f"Error searching {name}:", str(e))
+            statuses[name] = {"status": "error", "error": str(e)}
+            continue
+        results[name] = [dict(job, source=name) for job in jobs]
+        statuses[name] = {"status": "ok", "count": len(jobs), "elapsed_ms": round(elapsed * 1000, 3)}
+
+    # Keep provider order so the same search always dedupes the same way
+    merged = dedupe(job for name in providers for job in results.get(name, []))
+    body = {"total_jobs": len(merged), "jobs": merged, "providers": statuses}
+    return body, bool(results)
@@ -0,0 +1,231 @@
+"""
+Resume and cover letter generation.
+
+Each generator builds a request (model, prompt template version, messages
+and token limit) from the user's profile and the job description. Results
+are cached under a hash of the whole request, see generation_cache.py, so
+asking again for the same profile and job returns the stored text instead
+of calling OpenAI. Prompts are assembled with prompts.py, which keeps the
+profile compact and the job description inside a token budget.
+
+Bump a TEMPLATE_VERSIONS entry whenever its prompt changes, so completions
+cached for the old prompt aren't served for the new one.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+import prompts
+from generation_cache import get_generation_cache
+
+MODEL = "gpt-4o"
+
+TEMPLATE_VERSIONS = {
+    "resume": 2,
+    "cover_letter": 2,
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Imported here: the SDK takes longer to import than the rest of the app
+                from openai import OpenAI
+
+                # Retries are handled by generation_queue, with backoff shared across workers
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
+
+
+def resume_request(profile_data, job_description):
+    fitted = prompts.fit_job_description(job_description, model=MODEL)
+    prompt = f"""
+        You are a resume expert. Generate a professional resume based on the user's profile and the job description provided.
+
+        The format must follow these rules:
+        - Do not use asterisks (*) anywhere in the resume
+        - Contact info (City | Phone | Email | LinkedIn) should appear below the name, also center-aligned
+        - Use markdown headers for each section (like ## Summary, ## Work Experience)
+        - Work Experience should be in the format:  
+        [Job Title], [Company]  
+        [City]  
+        [Start Year] - [End Year or Present]  
+        - Education should be in the format:  
+        [Degree], [Institution]  
+        [City]  
+        [Expected Graduation Year], GPA: [GPA if available]
+        - Responsibilities in work experience should be bullet points
+        - Ensure consistent indentation, spacing, and header hierarchy
+        - Leave an empty line between sections
+
+Profile:
+{prompts.profile_text(profile_data)}
+
+Job Description:
+{fitted}
+
+Resume:
+"""
+
+    messages = [
+        {"role": "system", "content": "You are a helpful AI that creates professional Resume."},
+        {"role": "user", "content": prompt}
+    ]
+    prompts.log_usage("resume", messages, job_description, fitted, MODEL)
+    return {
+        "kind": "resume",
+        "model": MODEL,
+        "template_version": TEMPLATE_VERSIONS["resume"],
+        "messages": messages,
+        "max_tokens": 500,
+    }
+
+
+def company_from_description(job_description):
+    """Best-effort company name from phrases like "at Acme" in a job description."""
+    company_match = re.search(r'\b(?:at|with|within)\s+([A-Z][A-Za-z0-9&., ]+)', job_description)
+    return company_match.group(1).strip() if company_match else "the company"
+
+
+def cover_letter_request(row, job_description, company_name=None):
+    # Extract user info
+    full_name = f"{row['firstname']} {row['lastname']}"
+    city = row['city']
+    phone = row['phone']
+    user_email = row['email']
+
+    # Saved jobs know their company; otherwise try the job description
+    company_name = company_name or company_from_description(job_description)
+    fitted = prompts.fit_job_description(job_description, model=MODEL)
+
+    prompt = f"""
+You are a professional cover letter writer.
+
+Write a cover letter using the following formatting and rules:
+
+- At the top, center the following:
+{full_name}
+{city}
+{user_email}
+{phone}
+
+- Then add:
+To,  
+The Hiring Manager,  
+{company_name}
+
+- Do NOT include LinkedIn, URLs, street address, or placeholders like [Your Name]
+- The body of the letter should be tailored to the job description
+- Use a professional tone, align with resume structure, and keep it concise
+
+Job Description:
+{fitted}
+
+Begin the cover letter below:
+"""
+
+    messages = [
+        {"role": "system", "content": "You are a helpful AI that writes professional, personalized cover letters."},
+        {"role": "user", "content": prompt}
+    ]
+    prompts.log_usage("cover_letter", messages, job_description, fitted, MODEL)
+    return {
+        "kind": "cover_letter",
+        "model": MODEL,
+        "template_version": TEMPLATE_VERSIONS["cover_letter"],
+        "messages": messages,
+        "max_tokens": 600,
+    }
+
+
+BUILDERS = {
+    "resume": resume_request,
+    "cover_letter": cover_letter_request,
+}
+
+
+def cache_key(generation_request):
+    payload = json.dumps(generation_request, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def complete(generation_request):
+    response = get_openai_client().chat.completions.create(
+        model=generation_request["model"],
+        messages=generation_request["messages"],
+        max_tokens=generation_request["max_tokens"]
+    )
+    return response.choices[0].message.content.strip()
+
+
+def generate(generation_request, user_id=None, regenerate=False):
+    """
+    Return (text, cached). With `regenerate` the cache is skipped, and the
+    fresh completion replaces the stored one.
+    """
+    cache = get_generation_cache()
+    key = cache_key(generation_request)
+    if not regenerate:
+        text = cache.get(key)
+        if text is not None:
+            return text, True
+
+    text = complete(generation_request)
+    cache.set(key, user_id, generation_request["kind"], text)
+    return text, False
+
+
+def stream_completion(generation_request):
+    """
+    Yield the completion's text deltas as OpenAI produces them. Closing the
+    generator (e.g. when the client goes away) closes the upstream stream,
+    which stops the generation.
+    """
+    stream = get_openai_client().chat.completions.create(
+        model=generation_request["model"],
+        messages=generation_request["messages"],
+        max_tokens=generation_request["max_tokens"],
+        stream=True
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()
+
+
+def stream_generate(generation_request, user_id=None, regenerate=False):
+    """
+    Yield ("token", text) events, then ("done", {"text", "cached"}). A cache
+    hit yields only the done event. The full text is cached only when the
+    stream finishes, so a cancelled generation stores nothing.
+    """
+    cache = get_generation_cache()
+    key = cache_key(generation_request)
+    if not regenerate:
+        text = cache.get(key)
+        if text is not None:
+            yield "done", {"text": text, "cached": True}
+            return
+
+    parts = []
+    for delta in stream_completion(generation_request):
+        parts.append(delta)
+        yield "token", {"text": delta}
+
+    text = "".join(parts).strip()
+    cache.set(key, user_id, generation_request["kind"], text)
+    yield "done", {"text": text, "cached": False}
+
+
+def invalidate_user(user_id):
+    """Drop a user's cached generations after their profile changes."""
+    return get_generation_cache().invalidate_user(user_id)
@@ -0,0 +1,134 @@
+"""
+Content-addressed cache of generated resumes and cover letters.
+
+Entries are keyed by a hash of everything that determines the completion
+(see generation.cache_key), so a changed profile or job description simply
+misses. Entries also record the user they were generated for, so
+createOrEditProfile can drop a user's stale generations right away instead
+of waiting for them to be evicted.
+
+The cache lives in a local SQLite file shared by all workers on the host
+(GENERATION_CACHE_PATH, default instance/generation_cache.sqlite3) and
+evicts least recently used entries once the stored text passes
+GENERATION_CACHE_MAX_BYTES (default 50 MB).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class GenerationCache:
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                user_id INTEGER,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS generations_user_id ON generations (user_id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS generations_last_access ON generations (last_access)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM generations WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        connection.execute("UPDATE generations SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def set(self, key, user_id, kind, value):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO generations (key, user_id, kind, value, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, user_id, kind, value, len(value.encode("utf-8")), now, now)
+        )
+        self._evict(connection)
+
+    def _evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in connection.execute("SELECT key, size FROM generations ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM generations WHERE key = ?", victims)
+        with self._lock:
+            self._evictions += len(victims)
+
+    def invalidate_user(self, user_id):
+        cursor = self._connection().execute("DELETE FROM generations WHERE user_id = ?", (user_id,))
+        with self._lock:
+            self._invalidations += cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        self._connection().execute("DELETE FROM generations")
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+        ).fetchone()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache(
+                    os.getenv("GENERATION_CACHE_PATH", os.path.join("instance", "generation_cache.sqlite3")),
+                    max_bytes=int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+                )
+    return _cache
@@ -0,0 +1,438 @@
+"""
+Background queue for resume and cover letter generation.
+
+OpenAI calls run on a fixed pool of GENERATION_WORKERS threads instead of
+on the request-serving threads. Clients submit a job, get an id back and
+poll for the result (see /generationJobs in app.py), so a burst of
+generations waits in the queue rather than tying up the threads that serve
+sign-in, job CRUD and analytics.
+
+    GENERATION_WORKERS        concurrent OpenAI calls per process (4)
+    GENERATION_QUEUE_SIZE     queued + running jobs before new ones get 503 (100)
+    GENERATION_USER_LIMIT     queued + running jobs per user before 429 (2)
+    GENERATION_BATCH_LIMIT    queued + running batch items per user, on top of the above (4)
+    GENERATION_RETRIES        retries on 429, 5xx and connection errors (3)
+    GENERATION_BACKOFF        first retry delay in seconds, doubled each time (1)
+    GENERATION_RESULT_TTL     seconds finished jobs stay available to poll (600)
+
+The worker, queue-size, per-user and batch limits are counted per process.
+Under gunicorn each worker process has its own queue, so the effective caps
+are these limits times the number of worker processes; size them (and the
+OpenAI rate limit) with that in mind.
+
+Job state is also written to a SQLite file shared by all workers on the
+host (GENERATION_JOBS_PATH, default instance/generation_jobs.sqlite3), so a
+poll answered by a different worker than the one running the job still
+finds it.
+
+Streamed generations (/generate*Stream) run on the request thread, since
+their tokens go straight back to the client, but they are admitted through
+admit_stream() first, so they count against the same per-user and queue
+limits as queued jobs.
+"""
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import generation
+
+MAX_BACKOFF = 30
+
+
+class QueueFullError(Exception):
+    """The queue is at GENERATION_QUEUE_SIZE."""
+
+
+class UserLimitError(Exception):
+    """The user already has GENERATION_USER_LIMIT jobs (or GENERATION_BATCH_LIMIT batch items) queued or running."""
+
+
+def is_retryable(error):
+    # The OpenAI SDK is imported with the client; if it isn't loaded, this isn't one of its errors
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return False
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait, if it said."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def generate_with_retries(generation_request, user_id, regenerate=False, retries=3, backoff=1.0, on_retry=None):
+    """
+    generation.generate() with jittered exponential backoff on 429, 5xx and
+    connection errors. `on_retry(attempt, error)` is called before each wait.
+    """
+    attempt = 1
+    while True:
+        try:
+            return generation.generate(generation_request, user_id, regenerate)
+        except Exception as e:
+            if not is_retryable(e) or attempt > retries:
+                raise
+            if on_retry:
+                on_retry(attempt, e)
+            # A Retry-After longer than MAX_BACKOFF would hold the worker for too long
+            delay = min(MAX_BACKOFF, retry_after(e) or backoff * 2 ** (attempt - 1))
+            # Jitter so a burst of 429s doesn't retry in lockstep
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            attempt += 1
+
+
+class GenerationJob:
+    def __init__(self, generation_request, user_id, regenerate=False, batch=False):
+        self.id = uuid.uuid4().hex
+        self.request = generation_request
+        self.kind = generation_request["kind"]
+        self.user_id = user_id
+        self.regenerate = regenerate
+        self.batch = batch
+        self.status = "queued"
+        self.text = None
+        self.cached = False
+        self.error = None
+        self.attempts = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_done = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @classmethod
+    def restore(cls, row):
+        """A read-only copy of a job published by another worker, from a JobBoard row."""
+        job = cls.__new__(cls)
+        job.id, job.kind, job.user_id, job.status, job.text, job.cached, job.error, job.attempts = row
+        job.cached = bool(job.cached)
+        return job
+
+    def to_dict(self):
+        body = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+        }
+        if self.status == "done":
+            body["text"] = self.text
+            body["cached"] = self.cached
+        elif self.status == "failed":
+            body["error"] = self.error
+        return body
+
+
+class JobBoard:
+    """Job state in a SQLite file, readable by every worker on the host."""
+
+    def __init__(self, path, result_ttl=600):
+        self.path = path
+        self.result_ttl = result_ttl
+        self._local = threading.local()
+        self._last_prune = 0.0
+
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user_id INTEGER,
+                status TEXT NOT NULL,
+                text TEXT,
+                cached INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS generation_jobs_updated_at ON generation_jobs (updated_at)"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def publish(self, job):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO generation_jobs "
+            "(id, kind, user_id, status, text, cached, error, attempts, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.id, job.kind, job.user_id, job.status, job.text, int(job.cached), job.error, job.attempts, now)
+        )
+        if now - self._last_prune > 60:
+            self._last_prune = now
+            connection.execute("DELETE FROM generation_jobs WHERE updated_at < ?", (now - self.result_ttl,))
+
+    def load(self, job_id):
+        row = self._connection().execute(
+            "SELECT id, kind, user_id, status, text, cached, error, attempts FROM generation_jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        return GenerationJob.restore(row) if row else None
+
+
+class GenerationQueue:
+    def __init__(self, workers=4, max_size=100, per_user=2, per_batch=4, retries=3, backoff=1.0, result_ttl=600,
+                 board=None):
+        self.workers = workers
+        self.max_size = max_size
+        self.per_user = per_user
+        self.per_batch = per_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.result_ttl = result_ttl
+        self.board = board
+
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._active = Counter()
+        self._batch_active = Counter()
+        self._lock = threading.Lock()
+        self._threads = []
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._rejected = Counter()
+        self._running = 0
+        self._streams = 0
+        self._runs = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def start(self):
+        """Start the worker threads once per process."""
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._work, name=f"generation-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _publish(self, job):
+        if self.board is None:
+            return
+        try:
+            self.board.publish(job)
+        except Exception as e:
+            # Polls served by this worker still work; only other workers miss the update
+            print("Error publishing generation job:", str(e))
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, generation_request, user_id, regenerate=False, on_done=None, batch=False):
+        """
+        Queue a generation. Cache hits come back already done. `on_done(job)`
+        is called once the job has finished, from the worker thread that ran it.
+        Batch items (`batch=True`) count against `per_batch` instead of
+        `per_user`, so a batch doesn't use up the user's single generations.
+        """
+        job = GenerationJob(generation_request, user_id, regenerate, batch)
+        job.on_done = on_done
+
+        if not regenerate:
+            text = generation.get_generation_cache().get(generation.cache_key(generation_request))
+            if text is not None:
+                job.status, job.text, job.cached = "done", text, True
+                job.finished_at = time.time()
+                job._done.set()
+                with self._lock:
+                    self._prune()
+                    self._jobs[job.id] = job
+                    self._submitted += 1
+                    self._completed += 1
+                self._publish(job)
+                if on_done:
+                    on_done(job)
+                return job
+
+        self.start()
+        with self._lock:
+            self._prune()
+            self._admit(user_id, batch)
+            self._jobs[job.id] = job
+            self._submitted += 1
+        self._publish(job)
+        self._queue.put(job)
+        return job
+
+    def _admit(self, user_id, batch=False):
+        """Take a slot for `user_id` or raise. Call with the lock held."""
+        if sum(self._active.values()) + sum(self._batch_active.values()) >= self.max_size:
+            self._rejected["queue_full"] += 1
+            raise QueueFullError("Too many generations in progress, try again shortly")
+        active, limit = (self._batch_active, self.per_batch) if batch else (self._active, self.per_user)
+        if active[user_id] >= limit:
+            self._rejected["user_limit"] += 1
+            raise UserLimitError(f"At most {limit} generations can run at once per user")
+        active[user_id] += 1
+
+    def _release(self, user_id, batch=False):
+        """Give back a slot taken by _admit(). Call with the lock held."""
+        active = self._batch_active if batch else self._active
+        active[user_id] -= 1
+        if active[user_id] <= 0:
+            del active[user_id]
+
+    def admit_stream(self, generation_request, user_id, regenerate=False):
+        """
+        Admit a generation that streams on the request thread. Raises
+        QueueFullError or UserLimitError like submit(); otherwise returns a
+        function to call once the stream ends. Cache hits aren't counted.
+        """
+        if not regenerate and generation.get_generation_cache().get(generation.cache_key(generation_request)) is not None:
+            return lambda: None
+
+        with self._lock:
+            self._admit(user_id)
+            self._streams += 1
+        released = threading.Event()
+
+        def release():
+            if released.is_set():
+                return
+            released.set()
+            with self._lock:
+                self._streams -= 1
+                self._release(user_id)
+        return release
+
+    def get(self, job_id):
+        """A job queued on this worker, or else one published by another worker."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.board is not None:
+            job = self.board.load(job_id)
+        return job
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                print("Error in generation worker:", str(e))
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        job.started_at = time.time()
+        job.status = "running"
+        with self._lock:
+            self._running += 1
+            self._wait_total += job.started_at - job.created_at
+        self._publish(job)
+
+        def on_retry(attempt, error):
+            job.attempts = attempt + 1
+            with self._lock:
+                self._retried += 1
+
+        try:
+            job.attempts = 1
+            job.text, job.cached = generate_with_retries(
+                job.request, job.user_id, job.regenerate, self.retries, self.backoff, on_retry
+            )
+            job.status = "done"
+        except Exception as e:
+            print(f"❌ Generation {job.id} failed:", str(e))
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                self._runs += 1
+                self._run_total += job.finished_at - job.started_at
+                self._release(job.user_id, job.batch)
+                if job.status == "done":
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            self._publish(job)
+            job._done.set()
+            if job.on_done:
+                job.on_done(job)
+
+    def stats(self):
+        with self._lock:
+            runs = self._runs
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "running": self._running,
+                "streaming": self._streams,
+                "max_size": self.max_size,
+                "per_user_limit": self.per_user,
+                "per_batch_limit": self.per_batch,
+                "active_users": len(self._active.keys() | self._batch_active.keys()),
+                "tracked_jobs": len(self._jobs),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retried,
+                "rejected": dict(self._rejected),
+                "avg_wait_ms": round(self._wait_total / runs * 1000, 3) if runs else None,
+                "avg_run_ms": round(self._run_total / runs * 1000, 3) if runs else None,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_generation_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                result_ttl = float(os.getenv("GENERATION_RESULT_TTL", "600"))
+                _queue = GenerationQueue(
+                    workers=int(os.getenv("GENERATION_WORKERS", "4")),
+                    max_size=int(os.getenv("GENERATION_QUEUE_SIZE", "100")),
+                    per_user=int(os.getenv("GENERATION_USER_LIMIT", "2")),
+                    per_batch=int(os.getenv("GENERATION_BATCH_LIMIT", "4")),
+                    retries=int(os.getenv("GENERATION_RETRIES", "3")),
+                    backoff=float(os.getenv("GENERATION_BACKOFF", "1")),
+                    result_ttl=result_ttl,
+                    board=JobBoard(
+                        os.getenv("GENERATION_JOBS_PATH", os.path.join("instance", "generation_jobs.sqlite3")),
+                        result_ttl=result_ttl
+                    ),
+                )
+    return _queue
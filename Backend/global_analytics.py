@@ -0,0 +1,178 @@
+"""
+Materialized platform-wide analytics for /generalanalytics.
+
+The four full-table aggregates run on a background thread every
+GENERAL_ANALYTICS_REFRESH_SECONDS instead of on every request. Requests are
+served from the last snapshot; if it is older than the refresh interval
+they still get it immediately and a refresh is kicked off
+(stale-while-revalidate). Only the very first request waits for a query.
+"""
+import datetime
+import os
+import threading
+import time
+
+from db import get_db_connection
+
+QUERIES = {
+    "company_data": """
+        SELECT j.company_name, COUNT(*) AS count
+        FROM users_jobs uj
+        JOIN jobs j ON uj.job_id = j.jobs_id
+        GROUP BY j.company_name
+        ORDER BY count DESC;
+    """,
+    "job_title_data": """
+        SELECT j.job_title, COUNT(*) AS count
+        FROM users_jobs uj
+        JOIN jobs j ON uj.job_id = j.jobs_id
+        GROUP BY j.job_title
+        ORDER BY count DESC;
+    """,
+    "job_location_data": """
+        SELECT j.job_location, COUNT(*) AS count
+        FROM users_jobs uj
+        JOIN jobs j ON uj.job_id = j.jobs_id
+        GROUP BY j.job_location
+        ORDER BY count DESC;
+    """,
+    "offers_rejections_data": """
+        SELECT status, COUNT(*) AS count
+        FROM users_jobs
+        WHERE status IN ('Offer', 'Rejected')
+        GROUP BY status;
+    """,
+}
+
+# Lists that can be cut down with ?limit= or ?<name>_limit=
+TRUNCATABLE = {
+    "company_data": "company_limit",
+    "job_title_data": "job_title_limit",
+    "job_location_data": "job_location_limit",
+}
+
+
+class AnalyticsSnapshot:
+    def __init__(self, refresh_interval=300):
+        self.refresh_interval = refresh_interval
+        self._data = None
+        self._generated_at = None
+        self._lock = threading.Lock()
+        self._first_refresh = threading.Lock()
+        self._stale = threading.Event()
+        self._scheduler = None
+
+        self._refreshes = 0
+        self._failures = 0
+        self._last_duration = None
+        self._last_error = None
+
+    def compute(self):
+        data = {}
+        with get_db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            for key, query in QUERIES.items():
+                cursor.execute(query)
+                data[key] = cursor.fetchall()
+            cursor.close()
+        return data
+
+    def refresh(self):
+        start = time.monotonic()
+        try:
+            data = self.compute()
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                self._last_error = str(e)
+            raise
+        with self._lock:
+            self._data = data
+            self._generated_at = time.time()
+            self._refreshes += 1
+            self._last_duration = time.monotonic() - start
+            self._last_error = None
+
+    def _run(self):
+        while True:
+            # Wake up on schedule, or early when a request finds the snapshot stale
+            self._stale.wait(self.refresh_interval)
+            self._stale.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print("Error refreshing general analytics:", str(e))
+
+    def start(self):
+        """Start the background refresher once per process."""
+        with self._lock:
+            if self._scheduler is None or not self._scheduler.is_alive():
+                self._scheduler = threading.Thread(target=self._run, name="general-analytics-refresh", daemon=True)
+                self._scheduler.start()
+
+    def age(self):
+        return None if self._generated_at is None else time.time() - self._generated_at
+
+    def get(self):
+        """Return (data, generated_at), computing the first snapshot if needed."""
+        self.start()
+        if self._data is None:
+            with self._first_refresh:
+                if self._data is None:
+                    self.refresh()
+        elif self.age() > self.refresh_interval:
+            self._stale.set()
+        with self._lock:
+            return self._data, self._generated_at
+
+    def stats(self):
+        with self._lock:
+            age = self.age()
+            return {
+                "refresh_interval_seconds": self.refresh_interval,
+                "age_seconds": round(age, 3) if age is not None else None,
+                "refreshes": self._refreshes,
+                "failures": self._failures,
+                "last_refresh_ms": round(self._last_duration * 1000, 3) if self._last_duration is not None else None,
+                "last_error": self._last_error,
+            }
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = AnalyticsSnapshot(
+                    refresh_interval=float(os.getenv("GENERAL_ANALYTICS_REFRESH_SECONDS", "300"))
+                )
+    return _snapshot
+
+
+def parse_limits(args):
+    """Read top-N limits from the query string; None means no truncation."""
+    def read(name, default):
+        value = args.get(name)
+        if value is None or value == "":
+            return default
+        limit = int(value)
+        if limit < 0:
+            raise ValueError(f"{name} must be zero or a positive integer")
+        return limit
+
+    default = read("limit", None)
+    return {key: read(param, default) for key, param in TRUNCATABLE.items()}
+
+
+def build_response(data, generated_at, limits):
+    body = {
+        key: rows[:limits[key]] if limits.get(key) is not None else rows
+        for key, rows in data.items()
+    }
+    body["generated_at"] = datetime.datetime.fromtimestamp(generated_at, datetime.timezone.utc).isoformat()
+    body["snapshot_age_seconds"] = round(time.time() - generated_at, 3)
+    return body
@@ -0,0 +1,69 @@
+"""
+Gunicorn settings for serving the backend in production:
+
+    gunicorn -c gunicorn.conf.py wsgi:app     (or: python run.py)
+
+Requests are spread over GUNICORN_WORKERS processes, one per core by
+default, each serving GUNICORN_THREADS requests at a time. The app is
+imported once in the master and forked (preload), so workers start fast
+and share the imported code's memory. Pools, caches and background threads
+are created per worker after the fork, and warmed up before the worker
+takes traffic (see warmup.py). Per-process settings such as DB_POOL_SIZE
+and PASSWORD_HASH_WORKERS apply to each worker.
+
+With more than one worker, caches that are invalidated on writes default to
+the SQLite backend shared by every worker on the host (SHARED_CACHES, see
+cache.py), since an in-memory copy would go stale in the workers that
+didn't see the write. Set e.g. PROFILE_CACHE_BACKEND=memory to override.
+
+SIGTERM shuts down gracefully: workers finish in-flight requests for up to
+GUNICORN_GRACEFUL_TIMEOUT seconds and flush queued emails. SIGHUP replaces
+the workers without dropping connections, picking up new settings; with
+preload on, code changes need a restart (or GUNICORN_PRELOAD=0).
+
+    GUNICORN_BIND              address to listen on (0.0.0.0:$PORT, PORT defaults to 5000)
+    GUNICORN_WORKERS           worker processes (CPU count)
+    GUNICORN_THREADS           threads per worker (8)
+    GUNICORN_PRELOAD           "0" to import the app in each worker instead (1)
+    GUNICORN_TIMEOUT           seconds before a silent worker is restarted (120)
+    GUNICORN_GRACEFUL_TIMEOUT  seconds to finish requests on shutdown (30)
+    GUNICORN_MAX_REQUESTS      recycle workers after this many requests, 0 for never (0)
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count())))
+# Threads keep slow upstream calls (OpenAI, job search APIs, SSE streams) from blocking a whole worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+SHARED_CACHES = ["profile", "identity"]
+if workers > 1:
+    for name in SHARED_CACHES:
+        os.environ.setdefault(f"{name.upper()}_CACHE_BACKEND", "sqlite")
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    import warmup
+
+    results = warmup.warm_up()
+    failed = [name for name, result in results.items() if not result["ok"]]
+    worker.log.info("Worker %s warmed up%s", worker.pid, f", failed: {', '.join(failed)}" if failed else "")
+
+
+def worker_exit(server, worker):
+    from outbox import get_outbox
+
+    # Give queued OTP emails a chance to go out before the process ends
+    if not get_outbox().flush(timeout=graceful_timeout / 2):
+        worker.log.warning("Worker %s exited with emails still queued", worker.pid)
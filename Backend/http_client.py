@@ -0,0 +1,173 @@
+"""
+Shared outbound HTTP clients for the job search providers.
+
+Each upstream gets one `requests.Session` per process, so connections (and
+their TLS sessions) are kept alive and reused instead of being set up on
+every search. Every request has connect and read timeouts, transient
+failures are retried with exponential backoff, and latency is tracked per
+upstream for /metrics.
+
+Settings are read from the environment, per upstream first and then
+globally, e.g. JOOBLE_HTTP_READ_TIMEOUT, then HTTP_READ_TIMEOUT:
+
+    HTTP_CONNECT_TIMEOUT   seconds to establish a connection (3.05)
+    HTTP_READ_TIMEOUT      seconds to wait for response data (2)
+    HTTP_RETRIES           retries on connection errors, 429 and 5xx (1)
+    HTTP_BACKOFF           backoff factor between retries, seconds (0.3)
+    HTTP_MAX_RETRY_AFTER   longest Retry-After wait honoured, seconds (0.5)
+    HTTP_POOL_SIZE         kept-alive connections per host (10)
+
+A search has to answer within SEARCH_BUDGET_SECONDS (see federated_search),
+so the defaults keep a call's worst case, (retries + 1) x read timeout plus
+the retry waits, inside the default 5 second budget. Raise them together.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Number of recent requests the latency percentiles are computed over
+LATENCY_WINDOW = 512
+
+
+def _capped_retry(max_retry_after):
+    """A urllib3 Retry class that waits at most `max_retry_after` seconds when asked to Retry-After."""
+    from urllib3.util.retry import Retry
+
+    class CappedRetry(Retry):
+        def get_retry_after(self, response):
+            retry_after = super().get_retry_after(response)
+            return None if retry_after is None else min(retry_after, max_retry_after)
+
+    return CappedRetry
+
+
+def _setting(name, key, default, cast=float):
+    value = os.getenv(f"{name.upper()}_HTTP_{key}", os.getenv(f"HTTP_{key}"))
+    return cast(value) if value not in (None, "") else default
+
+
+class UpstreamClient:
+    def __init__(self, name, base_url, connect_timeout=3.05, read_timeout=2, retries=1,
+                 backoff=0.3, max_retry_after=0.5, pool_size=10, retry_methods=("GET",)):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Imported with the first client rather than with the app
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._request_error = requests.RequestException
+        retry = _capped_retry(max_retry_after)(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(retry_methods),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._requests = 0
+        self._errors = 0
+        self._retries = 0
+        self._statuses = {}
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+        except self._request_error:
+            with self._lock:
+                self._requests += 1
+                self._errors += 1
+                self._latencies.append(time.monotonic() - start)
+            raise
+
+        retries = getattr(response.raw, "retries", None)
+        with self._lock:
+            self._requests += 1
+            self._latencies.append(time.monotonic() - start)
+            self._retries += len(retries.history) if retries is not None else 0
+            status = f"{response.status_code // 100}xx"
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests_made, errors, retries, statuses = self._requests, self._errors, self._retries, dict(self._statuses)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+        return {
+            "base_url": self.base_url,
+            "requests": requests_made,
+            "errors": errors,
+            "retries": retries,
+            "responses": statuses,
+            "latency_ms": {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+        }
+
+
+# Upstreams and how to reach them. Jooble searches are POSTs but read-only,
+# so they are safe to retry.
+UPSTREAMS = {
+    "adzuna": lambda: {"base_url": "https://api.adzuna.com"},
+    "jooble": lambda: {"base_url": f"https://{os.getenv('JOOBLE_HOST')}", "retry_methods": ("POST",)},
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = UpstreamClient(
+                    name,
+                    connect_timeout=_setting(name, "CONNECT_TIMEOUT", 3.05),
+                    read_timeout=_setting(name, "READ_TIMEOUT", 2.0),
+                    retries=_setting(name, "RETRIES", 1, int),
+                    backoff=_setting(name, "BACKOFF", 0.3),
+                    max_retry_after=_setting(name, "MAX_RETRY_AFTER", 0.5),
+                    pool_size=_setting(name, "POOL_SIZE", 10, int),
+                    **UPSTREAMS[name]()
+                )
+    return client
+
+
+def stats():
+    """Stats for every upstream that has been used in this process."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.stats() for client in clients}
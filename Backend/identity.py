@@ -0,0 +1,89 @@
+"""
+Resolving the current user's id.
+
+Authenticated requests carry the user id in their JWT, so no lookup is
+needed. Requests that only send an email fall back to a bounded
+email -> user id cache before querying MySQL. Anything that changes a
+user's email must call `forget_email` for the old and new address; under
+gunicorn the cache is shared by all workers (IDENTITY_CACHE_BACKEND=sqlite,
+see gunicorn.conf.py) so that reaches every worker.
+"""
+import threading
+
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from cache import make_cache
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_identity_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = make_cache("identity", ttl=3600, max_entries=10000)
+    return _cache
+
+
+def _email_key(email):
+    return email.strip().lower()
+
+
+def user_id_from_token():
+    """Return the user id from a valid bearer token, or None if there isn't one."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity is None:
+            return None
+        if isinstance(identity, dict):
+            identity = identity.get("id")
+        return int(identity)
+    except Exception:
+        # Expired, malformed or old-format tokens fall back to the email lookup
+        return None
+
+
+def cached_user_id(email):
+    if not email:
+        return None
+    return get_identity_cache().get(_email_key(email))
+
+
+def remember_user_id(email, user_id):
+    if email and user_id is not None:
+        get_identity_cache().set(_email_key(email), user_id)
+
+
+def forget_email(*emails):
+    cache = get_identity_cache()
+    for email in emails:
+        if email:
+            cache.delete(_email_key(email))
+
+
+def lookup_user_id(cursor, email):
+    """Map an email to a user id, hitting MySQL only on a cache miss."""
+    if not email:
+        return None
+    user_id = cached_user_id(email)
+    if user_id is not None:
+        return user_id
+
+    cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    user_id = row["id"] if isinstance(row, dict) else row[0]
+    remember_user_id(email, user_id)
+    return user_id
+
+
+def resolve_user_id(cursor, email):
+    """Prefer the verified token's user id, then fall back to the email."""
+    user_id = user_id_from_token()
+    if user_id is not None:
+        return user_id
+    return lookup_user_id(cursor, email)
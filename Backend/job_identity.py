@@ -0,0 +1,51 @@
+"""
+Canonical identity for job postings.
+
+Two postings are the same job when their links match after normalization,
+or, when there is no usable link, when their title, company and location
+match ignoring case, punctuation and spacing.
+"""
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "ref", "refid", "source", "src", "trk", "trackingid"}
+
+
+def normalize_link(link):
+    """Return a comparable form of a posting URL, or None if it isn't one."""
+    link = (link or "").strip()
+    if not link or link == "#":
+        return None
+
+    parts = urlsplit(link if "://" in link else "https://" + link)
+    if not parts.netloc:
+        return None
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = re.sub(r"/+$", "", parts.path) or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def normalize_text(value):
+    value = re.sub(r"[^\w\s]", " ", (value or "").casefold())
+    return " ".join(value.split())
+
+
+def canonical_job_key(job_link=None, job_title=None, company_name=None, job_location=None):
+    link = normalize_link(job_link)
+    if link:
+        return "link:" + link
+    return "job:" + "|".join(normalize_text(v) for v in (job_title, company_name, job_location))
+
+
+def canonical_job_hash(job_link=None, job_title=None, company_name=None, job_location=None):
+    key = canonical_job_key(job_link, job_title, company_name, job_location)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
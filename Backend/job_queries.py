@@ -0,0 +1,259 @@
+"""
+Query building for the job listing endpoints.
+
+Both /getuserJobs and /getAllJobs accept the same query string:
+
+    limit      page size (1-200, default 50); follow `next_cursor` for the rest
+    cursor     the `next_cursor` value from the previous page
+    order      "asc" (default) or "desc" on jobs_id
+    fields     "summary" leaves out job_description
+    job_type   exact match, comma-separated for several
+    company    exact company_name match
+    status     comma-separated statuses          (/getuserJobs only)
+    date_from  YYYY-MM-DD, inclusive             (/getuserJobs only)
+    date_to    YYYY-MM-DD, inclusive             (/getuserJobs only)
+
+Results are always ordered by jobs_id, so pages are stable while rows are
+added, and every page is a single index range scan no matter the offset.
+
+/searchJobs searches the catalog through the FULLTEXT index on title,
+company and description:
+
+    q          keywords, ranked by relevance (natural language mode)
+    company    exact company_name match
+    location   job_location prefix, e.g. "Toronto" matches "Toronto, ON"
+    job_type   exact match, comma-separated for several
+    limit      page size (1-200, default 50)
+    cursor     the `next_cursor` value from the previous page
+    fields     "summary" leaves out job_description
+
+Without `q` the filtered catalog is returned newest first.
+"""
+import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+JOB_COLUMNS = ["jobs_id", "job_title", "company_name", "job_location", "job_type", "job_link", "job_description"]
+SUMMARY_COLUMNS = [c for c in JOB_COLUMNS if c != "job_description"]
+
+
+class QueryArgsError(ValueError):
+    """Raised for query string values that can't be turned into a query."""
+
+
+def _csv(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+def _date(args, name):
+    value = args.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise QueryArgsError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def parse_list_args(args):
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise QueryArgsError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise QueryArgsError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    cursor = args.get("cursor", "").strip()
+    if cursor:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            raise QueryArgsError("cursor must be a value returned as next_cursor")
+    else:
+        cursor = None
+
+    order = args.get("order", "asc").strip().lower()
+    if order not in ("asc", "desc"):
+        raise QueryArgsError("order must be 'asc' or 'desc'")
+
+    fields = args.get("fields", "").strip().lower()
+    if fields not in ("", "all", "summary"):
+        raise QueryArgsError("fields must be 'all' or 'summary'")
+
+    return {
+        # Exports stream every row and turn this off
+        "paginated": True,
+        "limit": limit,
+        "cursor": cursor,
+        "order": order,
+        "columns": SUMMARY_COLUMNS if fields == "summary" else JOB_COLUMNS,
+        "job_types": _csv(args.get("job_type")),
+        "company": args.get("company", "").strip() or None,
+        "statuses": _csv(args.get("status")),
+        "date_from": _date(args, "date_from"),
+        "date_to": _date(args, "date_to"),
+    }
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _job_filters(opts, where, params, id_column):
+    if opts["cursor"] is not None:
+        where.append(f"{id_column} {'>' if opts['order'] == 'asc' else '<'} %s")
+        params.append(opts["cursor"])
+    if opts["job_types"]:
+        where.append(f"j.job_type IN ({_placeholders(opts['job_types'])})")
+        params.extend(opts["job_types"])
+    if opts["company"]:
+        where.append("j.company_name = %s")
+        params.append(opts["company"])
+
+
+def _order_and_limit(opts, id_column, params):
+    sql = f" ORDER BY {id_column} {opts['order'].upper()}"
+    if opts["paginated"]:
+        # Fetch one extra row to know whether another page exists
+        sql += " LIMIT %s"
+        params.append(opts["limit"] + 1)
+    return sql
+
+
+def build_all_jobs_query(opts):
+    if opts["statuses"] or opts["date_from"] or opts["date_to"]:
+        raise QueryArgsError("status and date filters are only supported on /getuserJobs")
+
+    where, params = [], []
+    _job_filters(opts, where, params, "j.jobs_id")
+
+    sql = f"SELECT {', '.join('j.' + c for c in opts['columns'])} FROM jobs j"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += _order_and_limit(opts, "j.jobs_id", params)
+    return sql, params
+
+
+def build_user_jobs_query(user_id, opts):
+    where, params = ["uj.user_id = %s"], [user_id]
+    _job_filters(opts, where, params, "uj.job_id")
+    if opts["statuses"]:
+        # Match NULL explicitly rather than wrapping the column, so the
+        # (user_id, status) index stays usable
+        condition = f"uj.status IN ({_placeholders(opts['statuses'])})"
+        if "Applied" in opts["statuses"]:
+            condition = f"({condition} OR uj.status IS NULL)"
+        where.append(condition)
+        params.extend(opts["statuses"])
+    if opts["date_from"]:
+        where.append("uj.date_applied >= %s")
+        params.append(opts["date_from"])
+    if opts["date_to"]:
+        where.append("uj.date_applied <= %s")
+        params.append(opts["date_to"])
+
+    sql = f"""
+        SELECT {', '.join('j.' + c for c in opts['columns'])},
+            DATE_FORMAT(uj.date_applied, '%Y-%m-%d') AS date_applied,
+            COALESCE(uj.status, 'Applied') AS job_status
+        FROM users_jobs uj
+        INNER JOIN jobs j ON uj.job_id = j.jobs_id
+        WHERE {' AND '.join(where)}
+    """
+    sql += _order_and_limit(opts, "uj.job_id", params)
+    return sql, params
+
+
+def page_response(rows, opts):
+    """Trim the look-ahead row and build the response body."""
+    if not opts["paginated"]:
+        return {"jobs": rows}
+    has_more = len(rows) > opts["limit"]
+    rows = rows[:opts["limit"]]
+    return {
+        "jobs": rows,
+        "next_cursor": rows[-1]["jobs_id"] if has_more else None
+    }
+
+
+def parse_search_args(args):
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise QueryArgsError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise QueryArgsError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    # Relevance scores aren't unique or stable enough to key on, so the
+    # cursor is an offset into the ranked results
+    try:
+        offset = int(args.get("cursor", "").strip() or 0)
+    except ValueError:
+        raise QueryArgsError("cursor must be a value returned as next_cursor")
+    if offset < 0:
+        raise QueryArgsError("cursor must be a value returned as next_cursor")
+
+    fields = args.get("fields", "").strip().lower()
+    if fields not in ("", "all", "summary"):
+        raise QueryArgsError("fields must be 'all' or 'summary'")
+
+    return {
+        "keywords": " ".join(args.get("q", "").split()) or None,
+        "limit": limit,
+        "offset": offset,
+        "columns": SUMMARY_COLUMNS if fields == "summary" else JOB_COLUMNS,
+        "job_types": _csv(args.get("job_type")),
+        "company": args.get("company", "").strip() or None,
+        "location": args.get("location", "").strip() or None,
+    }
+
+
+def _like_prefix(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def build_search_query(opts):
+    where, params = [], []
+    columns = ", ".join("j." + c for c in opts["columns"])
+    match = "MATCH(j.job_title, j.company_name, j.job_description) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+
+    if opts["keywords"]:
+        select = f"SELECT {columns}, {match} AS score FROM jobs j"
+        params.append(opts["keywords"])
+        where.append(match)
+        params.append(opts["keywords"])
+        order = " ORDER BY score DESC, j.jobs_id DESC"
+    else:
+        select = f"SELECT {columns} FROM jobs j"
+        order = " ORDER BY j.jobs_id DESC"
+
+    if opts["company"]:
+        where.append("j.company_name = %s")
+        params.append(opts["company"])
+    if opts["location"]:
+        where.append("j.job_location LIKE %s")
+        params.append(_like_prefix(opts["location"]))
+    if opts["job_types"]:
+        where.append(f"j.job_type IN ({_placeholders(opts['job_types'])})")
+        params.extend(opts["job_types"])
+
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # Fetch one extra row to know whether another page exists
+    sql += order + " LIMIT %s OFFSET %s"
+    params.extend([opts["limit"] + 1, opts["offset"]])
+    return sql, params
+
+
+def search_page_response(rows, opts):
+    has_more = len(rows) > opts["limit"]
+    rows = rows[:opts["limit"]]
+    for row in rows:
+        if "score" in row:
+            row["score"] = round(float(row["score"]), 4)
+    return {
+        "jobs": rows,
+        "next_cursor": opts["offset"] + opts["limit"] if has_more else None
+    }
@@ -0,0 +1,31 @@
+"""
+Jooble job search.
+
+`format_job` is the response schema /jooblejobsearchapi has always
+returned, and the one /search normalizes every provider into.
+"""
+import os
+
+from http_client import get_client
+
+
+def format_job(job):
+    return {
+        "title": job.get("title", "N/A"),
+        "company": job.get("company", "N/A"),
+        "location": job.get("location", "N/A"),
+        "date_posted": job.get("updated", "N/A"),
+        "job_type": job.get("type", "N/A"),
+        "salary": job.get("salary", "Not Specified"),
+        "link": job.get("link", "#")
+    }
+
+
+def search(keyword, location=""):
+    """Return formatted jobs for a keyword; raises on transport or HTTP errors."""
+    response = get_client("jooble").post(
+        f"/api/{os.getenv('JOOBLE_API_KEY')}",
+        json={"keywords": keyword, "location": location}
+    )
+    response.raise_for_status()
+    return [format_job(job) for job in response.json().get("jobs", [])]
@@ -0,0 +1,134 @@
+"""
+Versioned schema migrations.
+
+Migrations are the SQL files in migrations/, named NNNN_description.sql and
+applied in order. Applied versions are recorded in `schema_migrations`, so
+each file runs exactly once per database.
+
+    python migrate.py status     list applied and pending migrations
+    python migrate.py up         apply everything that is pending
+    python migrate.py explain    run EXPLAIN checks (see explain_check.py)
+
+MySQL commits DDL implicitly, so a migration that fails part way has to be
+fixed by hand before re-running; keep each file small and focused.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+FILENAME_PATTERN = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+
+CREATE_TRACKING_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(16) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    @property
+    def sql(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    @property
+    def checksum(self):
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    def statements(self):
+        return split_statements(self.sql)
+
+
+def split_statements(sql):
+    """Split a migration file into statements on semicolons that end a line."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*(?:\n|$)", "\n".join(lines))
+    return [s.strip() for s in statements if s.strip()]
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME_PATTERN.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute(CREATE_TRACKING_TABLE)
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def pending_migrations(cursor):
+    applied = applied_versions(cursor)
+    return [m for m in load_migrations() if m.version not in applied]
+
+
+def migrate(connection, out=print):
+    """Apply all pending migrations. Returns the migrations that were applied."""
+    cursor = connection.cursor()
+    applied = applied_versions(cursor)
+
+    for migration in load_migrations():
+        if migration.version in applied and applied[migration.version] != migration.checksum:
+            out(f"warning: {migration.version}_{migration.name} changed after it was applied")
+
+    pending = pending_migrations(cursor)
+    for migration in pending:
+        out(f"Applying {migration.version}_{migration.name}")
+        for statement in migration.statements():
+            cursor.execute(statement)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+            (migration.version, migration.name, migration.checksum)
+        )
+        connection.commit()
+
+    cursor.close()
+    return pending
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from db import get_db_connection
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    parser.add_argument("command", choices=["status", "up", "explain"])
+    args, rest = parser.parse_known_args(argv)
+
+    if args.command == "explain":
+        import explain_check
+        return explain_check.main(rest)
+
+    with get_db_connection() as connection:
+        if args.command == "up":
+            applied = migrate(connection)
+            print(f"Applied {len(applied)} migration(s)" if applied else "Database is up to date")
+            return 0
+
+        cursor = connection.cursor()
+        applied = applied_versions(cursor)
+        cursor.close()
+        for migration in load_migrations():
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version}_{migration.name}: {state}")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,26 @@
-USE jobapplicationtracker;
+-- Baseline schema. Uses IF NOT EXISTS so it is safe to apply to databases
+-- that were created from the old tables.sql files.
 
--- Create users table
 CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY,
     email VARCHAR(255) UNIQUE NOT NULL,
     password VARCHAR(512) NOT NULL,
     firstname VARCHAR(50) NOT NULL,
     lastname VARCHAR(50) NOT NULL,
-    phone VARCHAR(50) NULL,       -- Optional
-    city VARCHAR(100) NULL,       -- Optional
-    linkedin VARCHAR(255) NULL    -- Optional
+    phone VARCHAR(50) NULL,
+    city VARCHAR(100) NULL,
+    linkedin VARCHAR(255) NULL
 );
 
--- Hash all passwords in the users table (Run this manually after inserting data)
-UPDATE users SET password = SHA2(password, 256);
-
--- Create profile table (1-to-1 relationship with users)
+-- 1-to-1 with users
 CREATE TABLE IF NOT EXISTS profile (
-    id INT PRIMARY KEY,  
-    skills TEXT NOT NULL,  
-    certifications TEXT NOT NULL,  
+    id INT PRIMARY KEY,
+    skills TEXT NOT NULL,
+    certifications TEXT NOT NULL,
     FOREIGN KEY (id) REFERENCES users(id) ON DELETE CASCADE
 );
 
--- Create work_experience table (Many-to-1 relationship with profile)
+-- Many-to-1 with profile
 CREATE TABLE IF NOT EXISTS work_experience (
     experience_id INT AUTO_INCREMENT PRIMARY KEY,
     profile_id INT,
@@ -34,7 +31,7 @@ CREATE TABLE IF NOT EXISTS work_experience (
     FOREIGN KEY (profile_id) REFERENCES profile(id) ON DELETE CASCADE
 );
 
--- Create education table (Many-to-1 relationship with profile)
+-- Many-to-1 with profile
 CREATE TABLE IF NOT EXISTS education (
     education_id INT AUTO_INCREMENT PRIMARY KEY,
     profile_id INT,
@@ -46,18 +43,17 @@ CREATE TABLE IF NOT EXISTS education (
     FOREIGN KEY (profile_id) REFERENCES profile(id) ON DELETE CASCADE
 );
 
--- Create jobs table
 CREATE TABLE IF NOT EXISTS jobs (
     jobs_id INT AUTO_INCREMENT PRIMARY KEY,
     job_title VARCHAR(100) NOT NULL,
     company_name VARCHAR(100) NOT NULL,
     job_location VARCHAR(50) NOT NULL,
     job_type VARCHAR(50) NOT NULL,
-    job_link VARCHAR(2083),  
-    job_description TEXT     
+    job_link VARCHAR(2083),
+    job_description TEXT
 );
 
--- Create users_jobs table (Many-to-Many relationship between users and jobs)
+-- Many-to-many between users and jobs
 CREATE TABLE IF NOT EXISTS users_jobs (
     id INT NOT NULL AUTO_INCREMENT,
     job_id INT DEFAULT NULL,
@@ -70,4 +66,15 @@ CREATE TABLE IF NOT EXISTS users_jobs (
     KEY id_idx1 (user_id),
     CONSTRAINT job_id FOREIGN KEY (job_id) REFERENCES jobs (jobs_id),
     CONSTRAINT user_id FOREIGN KEY (user_id) REFERENCES users (id)
-);
\ No newline at end of file
+);
+
+-- Per-user analytics counters kept in sync by the API.
+-- Fill it for existing data with: python rollups.py rebuild
+CREATE TABLE IF NOT EXISTS user_job_rollups (
+    user_id INT NOT NULL,
+    dimension VARCHAR(16) NOT NULL,
+    bucket VARCHAR(255) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, dimension, bucket),
+    CONSTRAINT rollup_user_id FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+);
@@ -0,0 +1,16 @@
+-- Composite indexes for the query shapes the API runs.
+
+-- /getuserJobs keyset pages and rollups snapshots: WHERE user_id = ? [AND job_id > ?] ORDER BY job_id
+CREATE INDEX idx_users_jobs_user_job ON users_jobs (user_id, job_id);
+
+-- /getuserJobs status filter and rollup rebuilds grouped by status
+CREATE INDEX idx_users_jobs_user_status ON users_jobs (user_id, status);
+
+-- /getuserJobs date range filter and rollup rebuilds grouped by month
+CREATE INDEX idx_users_jobs_user_date ON users_jobs (user_id, date_applied);
+
+-- /getAllJobs filters and the /generalanalytics breakdowns
+CREATE INDEX idx_jobs_company_name ON jobs (company_name);
+CREATE INDEX idx_jobs_job_title ON jobs (job_title);
+CREATE INDEX idx_jobs_job_location ON jobs (job_location);
+CREATE INDEX idx_jobs_job_type ON jobs (job_type);
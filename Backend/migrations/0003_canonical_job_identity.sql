@@ -0,0 +1,8 @@
+-- Canonical identity for catalog rows so saving the same posting twice
+-- reuses one `jobs` row. Existing rows start out NULL (allowed by the
+-- unique index); run `python compact_jobs.py` once to backfill the hashes
+-- and merge the duplicates already in the table.
+
+ALTER TABLE jobs ADD COLUMN canonical_hash CHAR(64) NULL;
+
+CREATE UNIQUE INDEX uq_jobs_canonical_hash ON jobs (canonical_hash);
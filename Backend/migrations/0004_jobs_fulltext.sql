@@ -0,0 +1,3 @@
+-- Full-text index for /searchJobs keyword search over the catalog.
+
+CREATE FULLTEXT INDEX ft_jobs_search ON jobs (job_title, company_name, job_description);
@@ -0,0 +1,340 @@
+"""
+One-time passwords for the password reset flow, and the rate limits on
+requesting and checking them.
+
+Two backends with the same interface:
+
+- "sqlite" (default): a local SQLite file shared by all workers on the host
+  (OTP_STORE_PATH, default instance/otp_store.sqlite3), so an OTP issued by
+  one worker verifies on another. Lookups are by primary key and expired
+  rows are deleted through an index on their expiry time.
+- "memory": a dict plus a heap ordered by expiry, for a single process.
+
+Both hold at most OTP_STORE_MAX_ENTRIES OTPs and as many rate limit
+counters, and sweep expired entries as new ones are written, so memory stays
+flat under OTP spam; issue() raises OTPStoreFullError when the store is full
+of live entries.
+
+    OTP_STORE              "sqlite" or "memory"
+    OTP_TTL                seconds an OTP stays valid (600)
+    OTP_RATE_WINDOW        rate limit window in seconds (900)
+    OTP_EMAIL_LIMIT        OTPs sent per email per window (3)
+    OTP_IP_LIMIT           OTPs requested per IP per window (10)
+    OTP_VERIFY_IP_LIMIT    OTP checks per IP per window (30)
+    OTP_VERIFY_ATTEMPTS    wrong codes per OTP before it is invalidated (5)
+
+The per-IP limits are only as good as the client address: see
+TRUSTED_PROXIES in app.create_app. The per-OTP attempt cap holds whatever
+address the guesses come from.
+"""
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+VERIFIED = "verified"
+MISSING = "missing"
+EXPIRED = "expired"
+INVALID = "invalid"
+LOCKED = "locked"
+
+
+class OTPStoreFullError(Exception):
+    """The store already holds OTP_STORE_MAX_ENTRIES live entries."""
+
+
+class RateLimitError(Exception):
+    """Too many requests for an email or IP; `retry_after` is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MemoryOTPStore:
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._otps = {}
+        self._counters = {}
+        # (expires_at, table, key); entries superseded by a later write are skipped when popped
+        self._expiry = []
+        self._lock = threading.Lock()
+        self._swept = 0
+        self._rejected = 0
+
+    def _tables(self):
+        return {"otp": self._otps, "rate": self._counters}
+
+    def _sweep(self, now):
+        tables = self._tables()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, table, key = heapq.heappop(self._expiry)
+            entry = tables[table].get(key)
+            if entry is not None and entry[-1] == expires_at:
+                del tables[table][key]
+                self._swept += 1
+        # Rewrites leave stale heap entries behind; rebuild before they pile up
+        if len(self._expiry) > 2 * (len(self._otps) + len(self._counters)) + 64:
+            self._expiry = [(entry[-1], table, key) for table, entries in tables.items()
+                            for key, entry in entries.items()]
+            heapq.heapify(self._expiry)
+
+    def _put(self, table, key, entry, now):
+        entries = self._tables()[table]
+        previous = entries.get(key)
+        if previous is None and len(entries) >= self.max_entries:
+            self._sweep(now)
+            if len(entries) >= self.max_entries:
+                self._rejected += 1
+                raise OTPStoreFullError("Too many pending OTPs, try again shortly")
+        entries[key] = entry
+        if previous is None or previous[-1] != entry[-1]:
+            heapq.heappush(self._expiry, (entry[-1], table, key))
+
+    def issue(self, email, otp, ttl):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._put("otp", email, (otp, 0, now + ttl), now)
+
+    def verify(self, email, otp, max_attempts=5):
+        """
+        Check an OTP. It is used up when it verifies, dropped when expired,
+        and invalidated (LOCKED) after `max_attempts` wrong codes.
+        """
+        with self._lock:
+            entry = self._otps.get(email)
+            if entry is None:
+                return MISSING
+            code, attempts, expires_at = entry
+            if expires_at <= time.time():
+                del self._otps[email]
+                return EXPIRED
+            if code == otp:
+                del self._otps[email]
+                return VERIFIED
+            if attempts + 1 >= max_attempts:
+                del self._otps[email]
+                return LOCKED
+            self._otps[email] = (code, attempts + 1, expires_at)
+            return INVALID
+
+    def hit(self, key, limit, window):
+        """Count a request against `key`. Returns None if allowed, else seconds until it will be."""
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            count, window_end = self._counters.get(key, (0, now + window))
+            if count >= limit:
+                return window_end - now
+            self._put("rate", key, (count + 1, window_end), now)
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "otps": len(self._otps),
+                "rate_counters": len(self._counters),
+                "max_entries": self.max_entries,
+                "heap_size": len(self._expiry),
+                "swept": self._swept,
+                "rejected": self._rejected,
+            }
+
+
+class SQLiteOTPStore:
+    def __init__(self, path, max_entries=10000, sweep_interval=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._swept = 0
+        self._rejected = 0
+
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS otps (
+                email TEXT PRIMARY KEY,
+                otp TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                expires_at REAL NOT NULL
+            )
+        """)
+        # Files created before the attempt cap
+        if "attempts" not in [row[1] for row in connection.execute("PRAGMA table_info(otps)")]:
+            connection.execute("ALTER TABLE otps ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        connection.execute("CREATE INDEX IF NOT EXISTS otps_expires_at ON otps (expires_at)")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS rate_limits_expires_at ON rate_limits (expires_at)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _sweep(self, connection, now, force=False):
+        with self._lock:
+            if not force and now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        swept = 0
+        for table in ("otps", "rate_limits"):
+            swept += connection.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (now,)).rowcount
+        with self._lock:
+            self._swept += swept
+
+    def _check_room(self, connection, table, key_column, key, now):
+        """Raise OTPStoreFullError if `key` is new and `table` is full even after a sweep."""
+        for force in (False, True):
+            if connection.execute(f"SELECT 1 FROM {table} WHERE {key_column} = ?", (key,)).fetchone():
+                return
+            if connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] < self.max_entries:
+                return
+            if not force:
+                self._sweep(connection, now, force=True)
+        with self._lock:
+            self._rejected += 1
+        raise OTPStoreFullError("Too many pending OTPs, try again shortly")
+
+    def issue(self, email, otp, ttl):
+        now = time.time()
+        connection = self._connection()
+        self._sweep(connection, now)
+        self._check_room(connection, "otps", "email", email, now)
+        connection.execute(
+            "INSERT OR REPLACE INTO otps (email, otp, attempts, expires_at) VALUES (?, ?, 0, ?)",
+            (email, otp, now + ttl)
+        )
+
+    def verify(self, email, otp, max_attempts=5):
+        """
+        Check an OTP. It is used up when it verifies, dropped when expired,
+        and invalidated (LOCKED) after `max_attempts` wrong codes.
+        """
+        now = time.time()
+        connection = self._connection()
+        # Deleting and checking in one statement means only one worker can use the OTP
+        used = connection.execute(
+            "DELETE FROM otps WHERE email = ? AND otp = ? AND expires_at > ?", (email, otp, now)
+        ).rowcount
+        if used:
+            return VERIFIED
+        row = connection.execute("SELECT expires_at FROM otps WHERE email = ?", (email,)).fetchone()
+        if row is None:
+            return MISSING
+        if row[0] <= now:
+            connection.execute("DELETE FROM otps WHERE email = ? AND expires_at <= ?", (email, now))
+            return EXPIRED
+        connection.execute("UPDATE otps SET attempts = attempts + 1 WHERE email = ?", (email,))
+        locked = connection.execute(
+            "DELETE FROM otps WHERE email = ? AND attempts >= ?", (email, max_attempts)
+        ).rowcount
+        return LOCKED if locked else INVALID
+
+    def hit(self, key, limit, window):
+        """Count a request against `key`. Returns None if allowed, else seconds until it will be."""
+        now = time.time()
+        connection = self._connection()
+        self._sweep(connection, now)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT count, expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self._check_room(connection, "rate_limits", "key", key, now)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, count, expires_at) VALUES (?, 1, ?)",
+                    (key, now + window)
+                )
+                retry_after = None
+            elif row[0] >= limit:
+                retry_after = row[1] - now
+            else:
+                connection.execute("UPDATE rate_limits SET count = count + 1 WHERE key = ?", (key,))
+                retry_after = None
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def stats(self):
+        connection = self._connection()
+        otps = connection.execute("SELECT COUNT(*) FROM otps").fetchone()[0]
+        counters = connection.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "otps": otps,
+                "rate_counters": counters,
+                "max_entries": self.max_entries,
+                "swept": self._swept,
+                "rejected": self._rejected,
+            }
+
+
+def ttl():
+    return float(os.getenv("OTP_TTL", "600"))
+
+
+def verify_attempts():
+    return int(os.getenv("OTP_VERIFY_ATTEMPTS", "5"))
+
+
+def _limit(store, key, limit, message):
+    retry_after = store.hit(key, limit, float(os.getenv("OTP_RATE_WINDOW", "900")))
+    if retry_after is not None:
+        raise RateLimitError(message, max(1, int(retry_after + 0.5)))
+
+
+def check_send(email, ip):
+    """Raise RateLimitError if `ip` or `email` has asked for too many OTPs."""
+    store = get_otp_store()
+    _limit(store, f"send-ip:{ip}", int(os.getenv("OTP_IP_LIMIT", "10")),
+           "Too many OTP requests, try again later")
+    _limit(store, f"send-email:{email}", int(os.getenv("OTP_EMAIL_LIMIT", "3")),
+           "Too many OTPs requested for this email, try again later")
+
+
+def check_verify(ip):
+    """Raise RateLimitError if `ip` has checked too many OTPs."""
+    _limit(get_otp_store(), f"verify-ip:{ip}", int(os.getenv("OTP_VERIFY_IP_LIMIT", "30")),
+           "Too many OTP attempts, try again later")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                max_entries = int(os.getenv("OTP_STORE_MAX_ENTRIES", "10000"))
+                if os.getenv("OTP_STORE", "sqlite") == "memory":
+                    _store = MemoryOTPStore(max_entries)
+                else:
+                    _store = SQLiteOTPStore(
+                        os.getenv("OTP_STORE_PATH", os.path.join("instance", "otp_store.sqlite3")),
+                        max_entries=max_entries
+                    )
+    return _store
@@ -0,0 +1,246 @@
+"""
+Outgoing email.
+
+Routes hand messages to the outbox and return straight away; a background
+sender thread delivers them over one persistent, authenticated SMTP
+connection, so a slow mail server delays the email rather than the request.
+Queued messages are sent in batches of up to OUTBOX_BATCH_SIZE on the same
+connection. A dropped connection is reopened and the message retried with
+backoff; permanent (5xx) rejections are not retried. The connection is
+closed after OUTBOX_IDLE_SECONDS without mail, since servers drop idle
+sessions anyway.
+
+    SMTP_HOST, SMTP_PORT      mail server (smtp.gmail.com, 587)
+    SMTP_USERNAME             login, also the From address unless SMTP_SENDER is set
+    SMTP_PASSWORD             login password; no login unless both are set
+    SMTP_STARTTLS             "0" to skip STARTTLS, e.g. for fake_smtp.py (1)
+    SMTP_TIMEOUT              socket timeout in seconds (30)
+    OUTBOX_SIZE               queued messages before send() raises OutboxFullError (1000)
+    OUTBOX_BATCH_SIZE         messages sent per batch (20)
+    OUTBOX_RETRIES            retries per message on transient errors (3)
+    OUTBOX_BACKOFF            first retry delay in seconds, doubled each time (1)
+    OUTBOX_IDLE_SECONDS       idle time before the connection is closed (60)
+"""
+import os
+import queue
+import threading
+import time
+
+MAX_BACKOFF = 30
+
+
+class OutboxFullError(Exception):
+    """The outbox already holds OUTBOX_SIZE unsent messages."""
+
+
+def is_retryable(error):
+    import smtplib
+
+    # SMTPException subclasses OSError, so the server's replies are checked first
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    # Dropped connections, timeouts and refused connects
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class Outbox:
+    def __init__(self, host, port, username=None, password=None, sender=None, starttls=True, timeout=30,
+                 max_size=1000, batch_size=20, retries=3, backoff=1.0, idle_seconds=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.starttls = starttls
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.idle_seconds = idle_seconds
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._connection = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._queued = 0
+        self._sent = 0
+        self._failed = 0
+        self._retried = 0
+        self._rejected = 0
+        self._connects = 0
+        self._batches = 0
+        self._send_total = 0.0
+        self._send_max = 0.0
+        self._delay_total = 0.0
+        self._last_error = None
+
+    def start(self):
+        """Start the sender thread once per process."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="outbox-sender", daemon=True)
+                self._thread.start()
+
+    def send(self, to, subject, body):
+        """Queue a plain-text email to `to`. Raises OutboxFullError when the outbox is full."""
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = to
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+
+        self.start()
+        try:
+            self._queue.put_nowait((to, msg.as_string(), time.time()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise OutboxFullError("Too many emails waiting to be sent, try again shortly")
+        with self._lock:
+            self._queued += 1
+
+    def _connect(self):
+        # Imported on first send: smtplib pulls in ssl, which the app doesn't otherwise need at start-up
+        import smtplib
+
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                connection.starttls()
+            if self.username and self.password:
+                connection.login(self.username, self.password)
+        except Exception:
+            connection.close()
+            raise
+        self._connection = connection
+        with self._lock:
+            self._connects += 1
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except Exception:
+                self._connection.close()
+            self._connection = None
+
+    def _deliver(self, to, payload, queued_at):
+        import smtplib
+
+        attempt = 1
+        while True:
+            try:
+                if self._connection is None:
+                    self._connect()
+                started = time.perf_counter()
+                self._connection.sendmail(self.sender, to, payload)
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._sent += 1
+                    self._send_total += elapsed
+                    self._send_max = max(self._send_max, elapsed)
+                    self._delay_total += time.time() - queued_at
+                return
+            except Exception as e:
+                # A rejected message leaves the session usable; anything else starts a new one
+                if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                    self._close()
+                if not is_retryable(e) or attempt > self.retries:
+                    print(f"❌ Email to {to} failed:", str(e))
+                    with self._lock:
+                        self._failed += 1
+                        self._last_error = str(e)
+                    return
+                with self._lock:
+                    self._retried += 1
+                time.sleep(min(MAX_BACKOFF, self.backoff * 2 ** (attempt - 1)))
+                attempt += 1
+
+    def _work(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.idle_seconds if self._connection else None)]
+            except queue.Empty:
+                self._disconnect()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                self._batches += 1
+            for to, payload, queued_at in batch:
+                try:
+                    self._deliver(to, payload, queued_at)
+                except Exception as e:
+                    print("Error in outbox sender:", str(e))
+                finally:
+                    self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been sent or given up on. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self):
+        with self._lock:
+            sent = self._sent
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_size": self._queue.maxsize,
+                "connected": self._connection is not None,
+                "connects": self._connects,
+                "queued": self._queued,
+                "sent": sent,
+                "failed": self._failed,
+                "retries": self._retried,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "avg_send_ms": round(self._send_total / sent * 1000, 3) if sent else None,
+                "max_send_ms": round(self._send_max * 1000, 3) if sent else None,
+                "avg_delay_ms": round(self._delay_total / sent * 1000, 3) if sent else None,
+                "last_error": self._last_error,
+            }
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox(
+                    host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+                    port=int(os.getenv("SMTP_PORT", "587")),
+                    username=os.getenv("SMTP_USERNAME"),
+                    password=os.getenv("SMTP_PASSWORD"),
+                    sender=os.getenv("SMTP_SENDER"),
+                    starttls=os.getenv("SMTP_STARTTLS", "1") != "0",
+                    timeout=float(os.getenv("SMTP_TIMEOUT", "30")),
+                    max_size=int(os.getenv("OUTBOX_SIZE", "1000")),
+                    batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "20")),
+                    retries=int(os.getenv("OUTBOX_RETRIES", "3")),
+                    backoff=float(os.getenv("OUTBOX_BACKOFF", "1")),
+                    idle_seconds=float(os.getenv("OUTBOX_IDLE_SECONDS", "60")),
+                )
+    return _outbox
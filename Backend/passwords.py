@@ -0,0 +1,188 @@
+"""
+Password hashing off the request threads.
+
+Hashing and checking passwords is deliberately slow, CPU-bound work that
+holds the GIL, so during a burst of sign-ins it would stall every other
+request the worker is serving. Here it runs in a separate pool of
+PASSWORD_HASH_WORKERS processes instead. At most PASSWORD_HASH_QUEUE
+operations may be waiting or running at once; past that, callers get
+HasherBusyError straight away rather than queueing behind the burst. An
+operation that times out keeps its place until its process finishes with
+it, and a pool broken by a crashed worker process is replaced.
+
+The hash method and work factor come from PASSWORD_HASH_METHOD, in
+werkzeug's format, e.g. "pbkdf2:sha256:1200000" or "scrypt" (default
+"pbkdf2:sha256", at werkzeug's current iteration count). Raising it doesn't
+invalidate existing passwords: a stored hash made with other settings is
+replaced with a fresh one the next time its owner signs in.
+
+    PASSWORD_HASH_WORKERS     hashing processes (2)
+    PASSWORD_HASH_QUEUE       operations waiting or running before HasherBusyError (64)
+    PASSWORD_HASH_TIMEOUT     seconds to wait for a result (30)
+"""
+import concurrent.futures
+import os
+from concurrent.futures.process import BrokenProcessPool
+import threading
+import time
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "pbkdf2:sha256"
+
+# Work factors werkzeug fills in when a method leaves them out
+IMPLIED_PARAMS = {
+    "pbkdf2": ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)],
+    "scrypt": ["32768", "8", "1"],
+}
+
+
+class HasherBusyError(Exception):
+    """PASSWORD_HASH_QUEUE operations are already waiting or running."""
+
+
+def normalize_method(method):
+    """Spell out a werkzeug hash method in full, the way it's written into stored hashes."""
+    name, *params = method.split(":")
+    implied = IMPLIED_PARAMS.get(name, [])
+    return ":".join([name] + params + implied[len(params):])
+
+
+def _hash(password, method):
+    started = time.time()
+    return generate_password_hash(password, method=method), started, time.time()
+
+
+def _verify(stored_hash, password, method):
+    """Check a password and, if it matches a hash made with other settings, rehash it."""
+    started = time.time()
+    valid = check_password_hash(stored_hash, password)
+    new_hash = None
+    if valid and stored_hash.split("$", 1)[0] != method:
+        new_hash = generate_password_hash(password, method=method)
+    return (valid, new_hash), started, time.time()
+
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_pending=64, method=DEFAULT_METHOD, timeout=30):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = normalize_method(method)
+        self.timeout = timeout
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._restarts = 0
+        self._queue_total = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    def _call(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HasherBusyError("Too many sign-ins in progress, try again shortly")
+            self._pending += 1
+            executor = self._executor
+
+        submitted = time.time()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._done()
+            self._restart(executor)
+            raise
+        except Exception:
+            self._done()
+            raise
+        # Held until the process is done with it, even if we stop waiting first
+        future.add_done_callback(self._done)
+
+        try:
+            result, started, finished = future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+
+        with self._lock:
+            self._completed += 1
+            self._queue_total += max(0.0, started - submitted)
+            self._run_total += finished - started
+            self._run_max = max(self._run_max, finished - started)
+        return result
+
+    def _done(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _restart(self, broken):
+        """Replace a pool whose worker process died; every later call would fail on it."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+            self._restarts += 1
+        print("Password hashing pool broke, started a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password):
+        return self._call(_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        """
+        Return (valid, new_hash). `new_hash` is set when the password is valid
+        but `stored_hash` uses an older method or work factor; the caller
+        should store it in place of the old one.
+        """
+        valid, new_hash = self._call(_verify, stored_hash, password, self.method)
+        if new_hash:
+            with self._lock:
+                self._rehashed += 1
+        return valid, new_hash
+
+    def warm_up(self):
+        """Start the worker processes now rather than on the first sign-in."""
+        for future in [self._executor.submit(time.time) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self):
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "method": self.method,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "restarts": self._restarts,
+                "avg_queue_ms": round(self._queue_total / completed * 1000, 3) if completed else None,
+                "avg_hash_ms": round(self._run_total / completed * 1000, 3) if completed else None,
+                "max_hash_ms": round(self._run_max * 1000, 3) if completed else None,
+            }
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher(
+                    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+                    max_pending=int(os.getenv("PASSWORD_HASH_QUEUE", "64")),
+                    method=os.getenv("PASSWORD_HASH_METHOD", DEFAULT_METHOD),
+                    timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT", "30")),
+                )
+    return _hasher
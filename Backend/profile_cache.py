@@ -0,0 +1,59 @@
+"""
+Per-user profile cache.
+
+Profiles are cached under their user id. Email-keyed lookups resolve the id
+through the identity cache first, so they can skip MySQL too. Writers must
+call `invalidate_profile` after committing any change to a user's profile.
+"""
+import threading
+
+from cache import make_cache
+from db import get_db_connection
+from identity import cached_user_id, remember_user_id
+from profile_loader import load_profile
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_profile_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = make_cache("profile", ttl=300, max_entries=1000)
+    return _cache
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+def get_profile(email=None, user_id=None):
+    """Return the user's profile dict, loading it from MySQL on a cache miss."""
+    cache = get_profile_cache()
+
+    if user_id is None:
+        user_id = cached_user_id(email)
+    if user_id is not None:
+        profile = cache.get(_user_key(user_id))
+        if profile is not None:
+            return profile
+
+    with get_db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        profile = load_profile(cursor, email=email, user_id=user_id)
+        cursor.close()
+
+    if profile:
+        cache.set(_user_key(profile["user_id"]), profile)
+        remember_user_id(profile["email"], profile["user_id"])
+    return profile
+
+
+def invalidate_profile(user_id=None, email=None):
+    """Drop a cached profile, by user id or by a known email."""
+    if user_id is None:
+        user_id = cached_user_id(email)
+    if user_id is not None:
+        get_profile_cache().delete(_user_key(user_id))
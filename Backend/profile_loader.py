@@ -0,0 +1,86 @@
+"""
+Profile loading shared by the profile and AI endpoints.
+
+The user row, work experience and education are fetched with one query
+each instead of a single users/profile/work_experience/education JOIN, so
+the row count is 1 + jobs + degrees rather than jobs x degrees and the
+profile dict is assembled in one linear pass.
+"""
+
+USER_QUERY = """
+    SELECT
+        u.id AS user_id, u.email, u.firstname, u.lastname, u.phone, u.linkedin, u.city,
+        p.skills, p.certifications
+    FROM users u
+    LEFT JOIN profile p ON p.id = u.id
+    WHERE {where}
+"""
+
+WORK_EXPERIENCE_QUERY = """
+    SELECT company_name, position, years_of_experience, job_description
+    FROM work_experience
+    WHERE profile_id = %s
+    ORDER BY experience_id
+"""
+
+EDUCATION_QUERY = """
+    SELECT degree, school, gpa, field_of_study, YEAR(graduation_date) AS graduation_year
+    FROM education
+    WHERE profile_id = %s
+    ORDER BY education_id
+"""
+
+
+def load_profile(cursor, email=None, user_id=None):
+    """
+    Load a user's full profile by email or user id.
+
+    `cursor` must be a dictionary cursor. Returns the same dict shape the
+    /getProfile endpoint has always returned, or None if the user does not exist.
+    """
+    if user_id is not None:
+        cursor.execute(USER_QUERY.format(where="u.id = %s"), (user_id,))
+    else:
+        cursor.execute(USER_QUERY.format(where="u.email = %s"), (email,))
+    user = cursor.fetchone()
+    if not user:
+        return None
+
+    user_id = user["user_id"]
+
+    cursor.execute(WORK_EXPERIENCE_QUERY, (user_id,))
+    work_rows = cursor.fetchall()
+
+    cursor.execute(EDUCATION_QUERY, (user_id,))
+    education_rows = cursor.fetchall()
+
+    return {
+        "user_id": user_id,
+        "email": user["email"],
+        "firstname": user["firstname"],
+        "lastname": user["lastname"],
+        "phone": user["phone"],
+        "linkedin": user["linkedin"],
+        "city": user["city"],
+        "skills": user["skills"].split(", ") if user["skills"] else [],
+        "certifications": user["certifications"].split(", ") if user["certifications"] else [],
+        "workExperience": [
+            {
+                "company": row["company_name"],
+                "position": row["position"],
+                "yearsOfExperience": row["years_of_experience"],
+                "responsibilities": row["job_description"]
+            }
+            for row in work_rows if row["company_name"]
+        ],
+        "education": [
+            {
+                "degree": row["degree"],
+                "institution": row["school"],
+                "gpa": row["gpa"],
+                "field": row["field_of_study"],
+                "endYear": row["graduation_year"]
+            }
+            for row in education_rows if row["degree"]
+        ]
+    }
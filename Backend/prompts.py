@@ -0,0 +1,174 @@
+"""
+Prompt construction for the generation endpoints.
+
+The profile is serialized as short labelled lines instead of a dict repr,
+and the job description is cut down to a token budget before it goes into
+the prompt, so input tokens (and with them latency and cost) stay bounded
+however long a posting is. Trimming is deterministic, which keeps the
+generation cache effective: the same posting always produces the same prompt.
+
+Tokens are counted with tiktoken when it is installed and its encoding
+loads (it is downloaded on first use), otherwise estimated at about four
+characters per token.
+
+    PROMPT_JOB_DESCRIPTION_TOKENS  most tokens of job description per prompt (1500)
+"""
+import os
+import re
+
+CHARS_PER_TOKEN = 4
+
+TRIM_MARKER = "[...]"
+
+# Lines that carry no signal for a resume or cover letter
+BOILERPLATE = re.compile(
+    r"equal (employment )?opportunity|without regard to|reasonable accommodation|"
+    r"e-verify|background check|privacy (notice|policy)|click apply|apply now|"
+    r"share this job|recruitment fraud|eoe\b",
+    re.IGNORECASE
+)
+
+SENTENCE_END = re.compile(r"[.!?;:](\s|$)")
+
+_encodings = {}
+_tiktoken = None
+_tiktoken_loaded = False
+
+
+def _tokenizer():
+    """The tiktoken module, or None if it isn't installed. Imported on first use, as it's slow to load."""
+    global _tiktoken, _tiktoken_loaded
+    if not _tiktoken_loaded:
+        try:
+            import tiktoken
+            _tiktoken = tiktoken
+        except ImportError:
+            pass
+        _tiktoken_loaded = True
+    return _tiktoken
+
+
+def _encoding(model):
+    """The tiktoken encoding for `model`, or None to fall back to the estimate."""
+    tiktoken = _tokenizer()
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Usually the encoding file couldn't be downloaded; don't retry on every prompt
+            print(f"tiktoken unavailable for {model}, estimating tokens instead:", str(e))
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model="gpt-4o"):
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _truncate(text, budget, model):
+    """The longest prefix of `text` within `budget` tokens, before the marker."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:budget])
+    return text[:budget * CHARS_PER_TOKEN]
+
+
+def job_description_budget():
+    return int(os.getenv("PROMPT_JOB_DESCRIPTION_TOKENS", "1500"))
+
+
+def fit_job_description(job_description, budget=None, model="gpt-4o"):
+    """
+    Return `job_description` cut down to at most `budget` tokens.
+
+    Whitespace is collapsed and repeated lines are dropped first. If that
+    isn't enough, equal-opportunity and application boilerplate goes next,
+    and finally the text is cut at the last sentence that fits, with a
+    marker so the model knows the posting continues.
+    """
+    budget = job_description_budget() if budget is None else budget
+
+    lines = []
+    seen = set()
+    for line in (job_description or "").splitlines():
+        line = " ".join(line.split())
+        if line and line.lower() not in seen:
+            seen.add(line.lower())
+            lines.append(line)
+    text = "\n".join(lines)
+    if count_tokens(text, model) <= budget:
+        return text
+
+    text = "\n".join(line for line in lines if not BOILERPLATE.search(line))
+    if count_tokens(text, model) <= budget:
+        return text
+
+    room = max(budget - count_tokens(TRIM_MARKER, model) - 1, 0)
+    head = _truncate(text, room, model)
+    ends = [m.end() for m in SENTENCE_END.finditer(head)]
+    # Keep the partial sentence when cutting back would lose most of the budget
+    if ends and ends[-1] >= len(head) // 2:
+        head = head[:ends[-1]]
+    return f"{head.rstrip()}\n{TRIM_MARKER}"
+
+
+def profile_text(profile):
+    """Serialize a load_profile() dict as compact labelled lines, skipping empty fields."""
+    name = " ".join(part for part in (profile.get("firstname"), profile.get("lastname")) if part)
+    contact = " | ".join(
+        str(profile[field]) for field in ("city", "phone", "email", "linkedin") if profile.get(field)
+    )
+
+    lines = []
+    if name:
+        lines.append(f"Name: {name}")
+    if contact:
+        lines.append(f"Contact: {contact}")
+    if profile.get("skills"):
+        lines.append(f"Skills: {', '.join(profile['skills'])}")
+    if profile.get("certifications"):
+        lines.append(f"Certifications: {', '.join(profile['certifications'])}")
+
+    if profile.get("workExperience"):
+        lines.append("Work experience:")
+        for job in profile["workExperience"]:
+            entry = ", ".join(part for part in (job.get("position"), job.get("company")) if part)
+            if job.get("yearsOfExperience"):
+                entry += f" ({job['yearsOfExperience']} yrs)"
+            if job.get("responsibilities"):
+                entry += f": {' '.join(str(job['responsibilities']).split())}"
+            lines.append(f"- {entry}")
+
+    if profile.get("education"):
+        lines.append("Education:")
+        for school in profile["education"]:
+            degree = " in ".join(str(part) for part in (school.get("degree"), school.get("field")) if part)
+            entry = ", ".join(str(part) for part in (degree, school.get("institution")) if part)
+            if school.get("endYear"):
+                entry += f" ({school['endYear']})"
+            if school.get("gpa"):
+                entry += f", GPA {school['gpa']}"
+            lines.append(f"- {entry}")
+
+    return "\n".join(lines)
+
+
+def log_usage(kind, messages, job_description, fitted, model="gpt-4o"):
+    """Print the prompt's token counts, and how much of the job description was trimmed."""
+    prompt_tokens = sum(count_tokens(message["content"], model) for message in messages)
+    original = count_tokens(job_description, model)
+    kept = count_tokens(fitted, model)
+    trimmed = f", trimmed from {original}" if kept < original else ""
+    counter = "tiktoken" if _encoding(model) is not None else "estimate"
+    print(f"📝 {kind} prompt: {prompt_tokens} tokens ({counter}), job description {kept}{trimmed}")
+    return prompt_tokens
@@ -0,0 +1,233 @@
+"""
+Per-user analytics rollups.
+
+`user_job_rollups` keeps one counter per (user, dimension, bucket) for the
+four breakdowns /analytics shows: status, job title, month applied and job
+type. Every write to `users_jobs` or `jobs` adjusts the counters of the
+user it affects in the same transaction, so /analytics is a single
+primary-key range read instead of four GROUP BY queries. Shared `jobs` rows
+are never edited in place (/updateJob moves the user's link to another row
+instead), so one user's edit never moves another user's counts.
+
+Fill or repair the table from the live data with
+
+    python rollups.py rebuild [--user-id ID]
+
+and compare it against the live GROUP BY results (exit status 1 on drift) with
+
+    python rollups.py verify [--user-id ID]
+
+Deploys run `verify` after the migrations and `rebuild` if it finds drift
+(see Cloud/ansible/deploy_containers.yaml).
+"""
+import argparse
+import sys
+from collections import Counter
+
+DIMENSIONS = ("status", "title", "month", "type")
+
+# Bucket columns are part of the primary key and can't be NULL. /analytics
+# reports this bucket as null, as the GROUP BY queries it replaced did.
+NULL_BUCKET = ""
+
+UPSERT_QUERY = """
+    INSERT INTO user_job_rollups (user_id, dimension, bucket, count)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+"""
+
+SNAPSHOT_QUERY = """
+    SELECT uj.status, DATE_FORMAT(uj.date_applied, '%Y-%m') AS month,
+        j.job_title, j.job_type, j.jobs_id
+    FROM users_jobs uj
+    LEFT JOIN jobs j ON uj.job_id = j.jobs_id
+    WHERE uj.user_id = %s AND uj.job_id = %s
+"""
+
+SNAPSHOT_MANY_QUERY = """
+    SELECT uj.status, DATE_FORMAT(uj.date_applied, '%Y-%m') AS month,
+        j.job_title, j.job_type, j.jobs_id
+    FROM users_jobs uj
+    LEFT JOIN jobs j ON uj.job_id = j.jobs_id
+    WHERE uj.user_id = %s AND uj.job_id IN ({placeholders})
+"""
+
+# Live aggregates and their user id column, used to rebuild and verify the rollups
+LIVE_QUERIES = {
+    "status": ("user_id", """
+        SELECT user_id, status AS bucket, COUNT(*) AS count
+        FROM users_jobs {where}
+        GROUP BY user_id, status
+    """),
+    "title": ("uj.user_id", """
+        SELECT uj.user_id, j.job_title AS bucket, COUNT(*) AS count
+        FROM users_jobs uj
+        JOIN jobs j ON uj.job_id = j.jobs_id {where}
+        GROUP BY uj.user_id, j.job_title
+    """),
+    "month": ("user_id", """
+        SELECT user_id, DATE_FORMAT(date_applied, '%Y-%m') AS bucket, COUNT(*) AS count
+        FROM users_jobs {where}
+        GROUP BY user_id, bucket
+    """),
+    "type": ("uj.user_id", """
+        SELECT uj.user_id, j.job_type AS bucket, COUNT(*) AS count
+        FROM users_jobs uj
+        JOIN jobs j ON uj.job_id = j.jobs_id {where}
+        GROUP BY uj.user_id, j.job_type
+    """),
+}
+
+
+def _values(row):
+    return tuple(row.values()) if isinstance(row, dict) else tuple(row)
+
+
+def _bucket(value):
+    return NULL_BUCKET if value is None else str(value)
+
+
+def _unbucket(bucket):
+    return None if bucket == NULL_BUCKET else bucket
+
+
+def snapshot(cursor, user_id, job_id):
+    """Count the buckets a user's link(s) to one job currently contribute."""
+    cursor.execute(SNAPSHOT_QUERY, (user_id, job_id))
+    return _count_links(cursor.fetchall())
+
+
+def snapshot_many(cursor, user_id, job_ids):
+    """Like snapshot(), summed over several jobs in one query."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return Counter()
+    placeholders = ", ".join(["%s"] * len(job_ids))
+    cursor.execute(SNAPSHOT_MANY_QUERY.format(placeholders=placeholders), [user_id] + job_ids)
+    return _count_links(cursor.fetchall())
+
+
+def _count_links(rows):
+    counts = Counter()
+    for row in rows:
+        status, month, job_title, job_type, jobs_id = _values(row)
+        counts[("status", _bucket(status))] += 1
+        counts[("month", _bucket(month))] += 1
+        if jobs_id is not None:
+            counts[("title", _bucket(job_title))] += 1
+            counts[("type", _bucket(job_type))] += 1
+    return counts
+
+
+def apply_changes(cursor, user_id, before, after):
+    """Move a user's counters from one snapshot to another."""
+    changes = []
+    for key in set(before) | set(after):
+        delta = after.get(key, 0) - before.get(key, 0)
+        if delta:
+            changes.append((user_id, key[0], key[1], delta))
+    if changes:
+        cursor.executemany(UPSERT_QUERY, changes)
+
+
+def read_analytics(cursor, user_id):
+    """Build the /analytics response body from the rollup table."""
+    cursor.execute("""
+        SELECT dimension, bucket, count
+        FROM user_job_rollups
+        WHERE user_id = %s AND count > 0
+    """, (user_id,))
+
+    grouped = {dimension: [] for dimension in DIMENSIONS}
+    for row in cursor.fetchall():
+        dimension, bucket, count = _values(row)
+        grouped[dimension].append((_unbucket(bucket), int(count)))
+
+    months = sorted(grouped["month"], key=lambda item: (item[0] is not None, item[0] or ""))
+    types = sorted(grouped["type"], key=lambda item: -item[1])
+
+    return {
+        "jobs": [{"status": b, "count": c} for b, c in grouped["status"]],
+        "job_titles": [{"job_title": b, "count": c} for b, c in grouped["title"]],
+        "applications_per_month": [{"month": b, "total_applications": c} for b, c in months],
+        "job_type_distribution": [{"job_type": b, "total_jobs": c} for b, c in types]
+    }
+
+
+def _live_counts(cursor, user_id=None):
+    counts = Counter()
+    for dimension, (column, query) in LIVE_QUERIES.items():
+        if user_id is None:
+            cursor.execute(query.format(where=f"WHERE {column} IS NOT NULL"))
+        else:
+            cursor.execute(query.format(where=f"WHERE {column} = %s"), (user_id,))
+        for row in cursor.fetchall():
+            row_user_id, bucket, count = _values(row)
+            counts[(row_user_id, dimension, _bucket(bucket))] += int(count)
+    return counts
+
+
+def rebuild(cursor, user_id=None):
+    """Recompute rollups from the live tables. Caller commits."""
+    if user_id is None:
+        cursor.execute("DELETE FROM user_job_rollups")
+    else:
+        cursor.execute("DELETE FROM user_job_rollups WHERE user_id = %s", (user_id,))
+
+    rows = [key + (count,) for key, count in _live_counts(cursor, user_id).items()]
+    if rows:
+        cursor.executemany(UPSERT_QUERY, rows)
+    return len(rows)
+
+
+def verify(cursor, user_id=None):
+    """Return the (user_id, dimension, bucket) keys whose stored count differs from the live one."""
+    live = _live_counts(cursor, user_id)
+
+    if user_id is None:
+        cursor.execute("SELECT user_id, dimension, bucket, count FROM user_job_rollups WHERE count <> 0")
+    else:
+        cursor.execute(
+            "SELECT user_id, dimension, bucket, count FROM user_job_rollups WHERE user_id = %s AND count <> 0",
+            (user_id,)
+        )
+    stored = Counter()
+    for row in cursor.fetchall():
+        row_user_id, dimension, bucket, count = _values(row)
+        stored[(row_user_id, dimension, bucket)] = int(count)
+
+    return {
+        key: {"stored": stored.get(key, 0), "live": live.get(key, 0)}
+        for key in set(live) | set(stored)
+        if stored.get(key, 0) != live.get(key, 0)
+    }
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from db import get_db_connection
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify per-user analytics rollups.")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args(argv)
+
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        if args.command == "rebuild":
+            count = rebuild(cursor, args.user_id)
+            connection.commit()
+            print(f"Rebuilt {count} rollup buckets")
+            return 0
+
+        drift = verify(cursor, args.user_id)
+        for (user_id, dimension, bucket), counts in sorted(drift.items()):
+            print(f"user {user_id} {dimension} {bucket!r}: stored {counts['stored']}, live {counts['live']}")
+        print("Rollups match live data" if not drift else f"{len(drift)} buckets drifted")
+        return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,33 @@
-import subprocess
+"""
+Start the backend.
+
+    python run.py          production server: gunicorn with gunicorn.conf.py
+    python run.py --dev    Flask's development server, with the debugger and reloader
+
+Any other arguments are passed on to gunicorn, e.g. `python run.py --workers 2`.
+"""
 import os
-from flask_cors import CORS
-from flask import Flask
-from dotenv import load_dotenv
+import sys
 
-# Load environment variables from the .env file
-load_dotenv()
+from dotenv import load_dotenv
 
-# Retrieve the backend path and frontend path from the .env file
-backend_path = os.getenv('BACKEND_PATH')
-frontend_path = os.getenv('FRONTEND_PATH')
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Ensure the paths are defined in the .env file
-if not backend_path or not frontend_path:
-    print("Error: BACKEND_PATH or FRONTEND_PATH not defined in .env file.")
-    exit(1)
 
-# Initialize Flask app and enable CORS
-app = Flask(__name__)
-CORS(app)
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    os.chdir(BACKEND_DIR)
+    load_dotenv()
 
-# Start Python backend process using the dynamic backend path
-python_process = subprocess.Popen("python app.py", shell=True, cwd=backend_path)
+    if "--dev" in argv:
+        from app import create_app
+        create_app().run(host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=True)
+        return 0
 
-# Start npm frontend process using the dynamic frontend path
-node_process = subprocess.Popen("npm start", shell=True, cwd=frontend_path)
+    from gunicorn.app.wsgiapp import run
+    sys.argv = ["gunicorn", "--config", "gunicorn.conf.py", *argv, "wsgi:app"]
+    return run()
 
-# Wait for both processes to finish
-python_process.wait()
-node_process.wait()
 
-if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import pytest
+
+import app as app_module
+import otp_store
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    store = otp_store.MemoryOTPStore()
+    monkeypatch.setattr(otp_store, "get_otp_store", lambda: store)
+    monkeypatch.setenv("OTP_VERIFY_IP_LIMIT", "2")
+
+    def make(trusted_proxies="0"):
+        monkeypatch.setenv("TRUSTED_PROXIES", trusted_proxies)
+        return app_module.create_app({"TESTING": True}).test_client()
+    return make
+
+
+def verify(client, forwarded_for):
+    return client.post("/verifyOTP", json={"email": "a@example.com", "otp": "1"},
+                       headers={"X-Forwarded-For": forwarded_for}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+
+
+def test_rate_limit_uses_forwarded_client_address_behind_proxy(client):
+    client = client(trusted_proxies="1")
+    assert verify(client, "203.0.113.1").status_code == 404
+    assert verify(client, "203.0.113.1").status_code == 404
+    assert verify(client, "203.0.113.1").status_code == 429
+    # Another client behind the same proxy has its own limit
+    assert verify(client, "203.0.113.2").status_code == 404
+
+
+def test_forwarded_header_ignored_without_trusted_proxies(client):
+    client = client()
+    assert verify(client, "203.0.113.1").status_code == 404
+    assert verify(client, "203.0.113.2").status_code == 404
+    assert verify(client, "203.0.113.3").status_code == 429
+
+
+def test_verify_otp_locks_after_wrong_codes(client, monkeypatch):
+    monkeypatch.setenv("OTP_VERIFY_ATTEMPTS", "2")
+    client = client()
+    otp_store.get_otp_store().issue("a@example.com", "123456", ttl=60)
+
+    assert verify(client, "-").status_code == 400
+    response = verify(client, "-")
+    assert response.status_code == 429
+    assert response.get_json() == {"message": "Too many incorrect attempts, request a new OTP"}
+
+
+def test_metrics_only_served_locally_without_a_token(client, monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    client = client()
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.1"}).status_code == 403
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+    client = client()
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "127.0.0.1"}).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
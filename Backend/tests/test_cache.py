@@ -0,0 +1,24 @@
+import cache
+
+
+def test_memory_cache_hands_out_copies():
+    profile_cache = cache.TTLCache("profile", 60, cache.MemoryBackend())
+    profile = {"user_id": 1, "skills": ["python"]}
+    profile_cache.set("user:1", profile)
+    profile["skills"].append("set after caching")
+
+    cached = profile_cache.get("user:1")
+    cached["skills"].append("changed by a caller")
+
+    assert profile_cache.get("user:1") == {"user_id": 1, "skills": ["python"]}
+
+
+def test_sqlite_cache_invalidation_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a = cache.TTLCache("profile", 60, cache.SQLiteBackend(path, table="profile_cache"))
+    worker_b = cache.TTLCache("profile", 60, cache.SQLiteBackend(path, table="profile_cache"))
+
+    worker_a.set("user:1", {"user_id": 1})
+    assert worker_b.get("user:1") == {"user_id": 1}
+    worker_b.delete("user:1")
+    assert worker_a.get("user:1") is None
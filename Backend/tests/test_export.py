@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+import db
+import export
+
+ROWS = [{"jobs_id": i} for i in range(10)]
+
+
+class InternalError(Exception):
+    pass
+
+
+class FakeCursor:
+    """Unbuffered cursor: rows stay on the connection until fetched."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=()):
+        self.connection.unread = list(ROWS)
+
+    def fetchmany(self, size):
+        rows = self.connection.unread[:size]
+        del self.connection.unread[:size]
+        return rows
+
+    def close(self):
+        if self.connection.unread:
+            raise InternalError("Unread result found")
+
+
+class FakeConnection:
+    in_transaction = False
+
+    def __init__(self):
+        self.unread = []
+        self.drained = 0
+        self.open = True
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def consume_results(self):
+        self.drained += len(self.unread)
+        self.unread = []
+
+    def is_connected(self):
+        return self.open
+
+    def close(self):
+        self.open = False
+
+    def shutdown(self):
+        self.open = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = db.ConnectionPool(size=1)
+    pool.connections = []
+
+    def connect(**kwargs):
+        pool.connections.append(FakeConnection())
+        return pool.connections[-1]
+
+    pool._mysql = SimpleNamespace(connect=connect, Error=InternalError)
+    monkeypatch.setattr(export, "get_db_connection", pool.connection)
+    return pool
+
+
+def test_full_read_returns_connection_to_pool(pool):
+    assert list(export.stream_rows("SELECT", batch_size=3)) == ROWS
+
+    connection, = pool.connections
+    assert connection.open
+    assert pool.stats()["open"] == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_closing_early_drops_connection_without_draining(pool):
+    rows = export.stream_rows("SELECT", batch_size=3)
+    assert [next(rows) for _ in range(4)] == ROWS[:4]
+    rows.close()
+
+    connection, = pool.connections
+    assert not connection.open
+    assert connection.drained == 0
+    assert pool.stats()["open"] == 0
+    assert pool.stats()["in_use"] == 0
+
+    # The next borrower gets a fresh connection
+    assert list(export.stream_rows("SELECT", batch_size=3)) == ROWS
+    assert len(pool.connections) == 2
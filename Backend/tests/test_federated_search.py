@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+import federated_search
+from federated_search import dedupe
+
+
+def job(source, title="Data Engineer", company="Acme", link=None):
+    return {"source": source, "title": title, "company": company, "link": link}
+
+
+def test_same_title_and_company_from_one_provider_kept():
+    jobs = [job("adzuna", link="https://a.example/1"), job("adzuna", link="https://a.example/2")]
+    assert dedupe(jobs) == jobs
+
+
+def test_same_title_and_company_across_providers_dropped():
+    jobs = [job("adzuna", link="https://a.example/1"), job("jooble", title="data engineer ", link="https://j.example/9")]
+    assert dedupe(jobs) == jobs[:1]
+
+
+def test_same_link_dropped_even_from_one_provider():
+    jobs = [job("adzuna", link="https://a.example/1"), job("adzuna", title="Other", link="https://a.example/1")]
+    assert dedupe(jobs) == jobs[:1]
+
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Swap in a fast Adzuna and a Jooble that hangs until the test ends."""
+    release = threading.Event()
+    calls = []
+
+    def hung(query):
+        calls.append(query)
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(federated_search, "PROVIDERS", {
+        "adzuna": lambda query: [job("adzuna", link=f"https://a.example/{query['keyword']}")],
+        "jooble": hung,
+    })
+    monkeypatch.setattr(federated_search, "_pools", {})
+    yield calls
+    release.set()
+
+
+def concurrent_searches(count, budget):
+    statuses = []
+
+    def one_search(i):
+        body, _ = federated_search.search({"keyword": str(i)}, budget=budget)
+        statuses.append(body["providers"])
+
+    searches = [threading.Thread(target=one_search, args=(i,)) for i in range(count)]
+    for thread in searches:
+        thread.start()
+    for thread in searches:
+        thread.join()
+    return statuses
+
+
+def test_slow_provider_does_not_starve_the_others(providers, monkeypatch):
+    monkeypatch.setenv("SEARCH_WORKERS", "4")
+
+    started = time.monotonic()
+    statuses = concurrent_searches(12, budget=0.5)
+    elapsed = time.monotonic() - started
+
+    assert len(statuses) == 12
+    assert [s["adzuna"]["status"] for s in statuses] == ["ok"] * 12
+    assert [s["jooble"]["status"] for s in statuses] == ["timeout"] * 12
+    assert elapsed < 2
+    # Calls still queued behind the hung ones were cancelled, not run
+    time.sleep(0.1)
+    assert len(providers) == 4
+
+
+def test_hung_provider_is_reported_busy_once_its_queue_is_full(providers, monkeypatch):
+    monkeypatch.setenv("SEARCH_WORKERS", "1")
+    monkeypatch.setenv("SEARCH_MAX_PENDING", "1")
+
+    first = concurrent_searches(1, budget=0.1)[0]
+    started = time.monotonic()
+    second = concurrent_searches(1, budget=1)[0]
+
+    assert first["jooble"]["status"] == "timeout"
+    assert second["jooble"]["status"] == "busy"
+    assert second["adzuna"]["status"] == "ok"
+    # A busy provider doesn't use up the budget
+    assert time.monotonic() - started < 0.5
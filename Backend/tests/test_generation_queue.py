@@ -0,0 +1,188 @@
+"""
+The generation queue against fake_openai.py, with OPENAI_BASE_URL pointed
+at a local fake server.
+"""
+import argparse
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+import batch_generation
+import fake_openai
+import generation
+import generation_queue as generation_queue_module
+from generation_cache import GenerationCache
+from generation_queue import GenerationQueue, QueueFullError, UserLimitError
+
+PROFILE = {
+    "user_id": 1, "firstname": "Ada", "lastname": "Lovelace", "city": "London",
+    "phone": "555-0100", "email": "ada@example.com",
+}
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    """Start fake_openai on a free port; call it again to change its options."""
+    servers = []
+
+    def start(**options):
+        server = fake_openai.serve(port=0, words=20, **options)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+        monkeypatch.setenv("OPENAI_API_KEY", "fake")
+        monkeypatch.setattr(generation, "_client", None)
+        return fake_openai.FakeOpenAIHandler
+
+    cache = GenerationCache(str(tmp_path / "generation_cache.sqlite3"))
+    monkeypatch.setattr(generation, "get_generation_cache", lambda: cache)
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def cover_letter(job_description):
+    return generation.cover_letter_request(PROFILE, job_description)
+
+
+def test_cache_miss_then_hit(fake_api):
+    api = fake_api()
+    generation_queue = GenerationQueue(workers=1, backoff=0.01)
+
+    first = generation_queue.submit(cover_letter("Data engineer at Acme"), 1)
+    assert first.wait(10)
+    assert (first.status, first.cached) == ("done", False)
+    assert api.requests == 1
+
+    second = generation_queue.submit(cover_letter("Data engineer at Acme"), 1)
+    assert second.finished
+    assert (second.status, second.text, second.cached) == ("done", first.text, True)
+    assert api.requests == 1
+
+    regenerated = generation_queue.submit(cover_letter("Data engineer at Acme"), 1, regenerate=True)
+    assert regenerated.wait(10)
+    assert regenerated.cached is False
+    assert api.requests == 2
+
+
+def test_queue_full(fake_api):
+    fake_api(latency=0.3)
+    generation_queue = GenerationQueue(workers=1, max_size=1, per_user=5)
+
+    running = generation_queue.submit(cover_letter("Analyst at Acme"), 1)
+    with pytest.raises(QueueFullError):
+        generation_queue.submit(cover_letter("Analyst at Initech"), 2)
+    assert generation_queue.stats()["rejected"] == {"queue_full": 1}
+
+    assert running.wait(10)
+    # The slot is free again once the job finishes
+    assert generation_queue.submit(cover_letter("Analyst at Initech"), 2).wait(10)
+
+
+def test_per_user_limit(fake_api):
+    fake_api(latency=0.3)
+    generation_queue = GenerationQueue(workers=2, max_size=10, per_user=1)
+
+    running = generation_queue.submit(cover_letter("Analyst at Acme"), 1)
+    with pytest.raises(UserLimitError):
+        generation_queue.submit(cover_letter("Analyst at Initech"), 1)
+    # Other users aren't held back by it
+    other = generation_queue.submit(cover_letter("Analyst at Initech"), 2)
+
+    assert running.wait(10) and other.wait(10)
+    assert generation_queue.stats()["rejected"] == {"user_limit": 1}
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_rate_limits_and_server_errors(fake_api, status):
+    api = fake_api(fail_every=2, fail_status=status)
+    generation_queue = GenerationQueue(workers=1, retries=3, backoff=0.01)
+
+    first = generation_queue.submit(cover_letter("Analyst at Acme"), 1)
+    assert first.wait(10) and first.attempts == 1
+
+    # Request 2 fails, its retry (request 3) succeeds
+    retried = generation_queue.submit(cover_letter("Analyst at Initech"), 1)
+    assert retried.wait(10)
+    assert (retried.status, retried.attempts) == ("done", 2)
+    assert api.requests == 3
+    assert generation_queue.stats()["retries"] == 1
+
+
+def test_gives_up_after_retries(fake_api):
+    api = fake_api(fail_every=1, fail_status=429)
+    generation_queue = GenerationQueue(workers=1, retries=2, backoff=0.01)
+
+    job = generation_queue.submit(cover_letter("Analyst at Acme"), 1)
+    assert job.wait(10)
+    assert job.status == "failed"
+    assert api.requests == 3
+
+
+def test_client_errors_are_not_retried(fake_api):
+    api = fake_api(fail_every=1, fail_status=400)
+    generation_queue = GenerationQueue(workers=1, retries=3, backoff=0.01)
+
+    job = generation_queue.submit(cover_letter("Analyst at Acme"), 1)
+    assert job.wait(10)
+    assert job.status == "failed"
+    assert api.requests == 1
+
+
+def test_batch_runs_items_side_by_side(fake_api, monkeypatch):
+    fake_api(latency=0.5)
+    generation_queue = GenerationQueue(workers=10, per_user=2, per_batch=10)
+    monkeypatch.setattr(batch_generation, "get_generation_queue", lambda: generation_queue)
+    monkeypatch.setattr(batch_generation, "_limiter", batch_generation.RateLimiter(rate=100, burst=100))
+
+    started = time.monotonic()
+    assert generation_queue.submit(cover_letter("Analyst at Acme"), 1).wait(10)
+    single = time.monotonic() - started
+
+    items = batch_generation.build_items(PROFILE, [f"Analyst at Company {i}" for i in range(10)])
+    started = time.monotonic()
+    results = list(batch_generation.run(items, 1))
+    elapsed = time.monotonic() - started
+
+    assert sorted(result["index"] for result in results) == list(range(10))
+    assert all(result["status"] == "done" for result in results)
+    # Ten letters take about as long as one, not five rounds of GENERATION_USER_LIMIT
+    assert elapsed < single * 2
+
+
+def test_batch_leaves_room_for_single_generations(fake_api):
+    fake_api(latency=0.3)
+    generation_queue = GenerationQueue(workers=4, per_user=1, per_batch=2)
+
+    batch = [generation_queue.submit(cover_letter(f"Analyst at Company {i}"), 1, batch=True) for i in range(2)]
+    with pytest.raises(UserLimitError):
+        generation_queue.submit(cover_letter("Analyst at Company 2"), 1, batch=True)
+    single = generation_queue.submit(cover_letter("Analyst at Initech"), 1)
+
+    assert all(job.wait(10) for job in batch + [single])
+
+
+def test_long_retry_after_is_capped(monkeypatch):
+    class RateLimited(Exception):
+        response = argparse.Namespace(headers={"retry-after": "3600"})
+
+    calls = []
+
+    def generate(generation_request, user_id, regenerate):
+        calls.append(generation_request)
+        if len(calls) == 1:
+            raise RateLimited()
+        return "Dear Acme", False
+
+    sleeps = []
+    monkeypatch.setattr(generation, "generate", generate)
+    monkeypatch.setattr(generation_queue_module, "is_retryable", lambda error: True)
+    monkeypatch.setattr(generation_queue_module.time, "sleep", sleeps.append)
+
+    assert generation_queue_module.generate_with_retries({"kind": "cover_letter"}, 1) == ("Dear Acme", False)
+    assert len(sleeps) == 1
+    assert sleeps[0] <= generation_queue_module.MAX_BACKOFF * 1.2
@@ -0,0 +1,123 @@
+"""
+The /generate*Stream routes against fake_openai.py: token events as the
+completion arrives, cache replays and clients that hang up mid-stream.
+"""
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("openai")
+
+import app as app_module
+import fake_openai
+import generation
+from generation_cache import GenerationCache
+from generation_queue import GenerationQueue
+
+PROFILE = {
+    "user_id": 1, "firstname": "Ada", "lastname": "Lovelace", "city": "London",
+    "phone": "555-0100", "email": "ada@example.com",
+}
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    """Start fake_openai on a free port with the given fake_openai.serve() options."""
+    servers = []
+
+    def start(**options):
+        server = fake_openai.serve(port=0, words=20, **options)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+        monkeypatch.setenv("OPENAI_API_KEY", "fake")
+        monkeypatch.setattr(generation, "_client", None)
+        return fake_openai.FakeOpenAIHandler
+
+    cache = GenerationCache(str(tmp_path / "generation_cache.sqlite3"))
+    monkeypatch.setattr(generation, "get_generation_cache", lambda: cache)
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def generation_queue(monkeypatch):
+    generation_queue = GenerationQueue(workers=1, per_user=1)
+    monkeypatch.setattr(app_module, "get_generation_queue", lambda: generation_queue)
+    return generation_queue
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "get_profile", lambda email=None, user_id=None: PROFILE)
+    monkeypatch.setattr(app_module, "user_id_from_token", lambda: None)
+    return app_module.create_app({"TESTING": True}).test_client()
+
+
+def stream(client, job_description="Data engineer at Acme"):
+    return client.post("/generateCoverLetterStream", json={
+        "email": PROFILE["email"], "job_description": job_description,
+    })
+
+
+def events(chunks):
+    """Parse server-sent events from an iterable of response chunks."""
+    body = b"".join(chunks).decode()
+    parsed = []
+    for block in body.split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_tokens_then_done(fake_api, generation_queue, client):
+    api = fake_api(delay=0)
+
+    response = stream(client)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    received = events(response.response)
+    response.close()
+
+    tokens = [data["text"] for event, data in received[:-1]]
+    assert [event for event, _ in received[:-1]] == ["token"] * 20
+    assert received[-1] == ("done", {"text": "".join(tokens).strip(), "cached": False})
+    assert api.requests == 1
+    assert generation_queue.stats()["streaming"] == 0
+
+
+def test_repeat_request_replays_from_the_cache(fake_api, generation_queue, client):
+    api = fake_api(delay=0)
+
+    first = stream(client)
+    text = events(first.response)[-1][1]["text"]
+    first.close()
+
+    second = stream(client)
+    assert events(second.response) == [("done", {"text": text, "cached": True})]
+    second.close()
+    assert api.requests == 1
+
+
+def test_hanging_up_mid_stream_frees_the_slot_and_caches_nothing(fake_api, generation_queue, client):
+    fake_api(delay=0.05)
+
+    response = stream(client)
+    chunks = iter(response.response)
+    first_event = events([next(chunks)])
+    assert first_event[0][0] == "token"
+    assert generation_queue.stats()["streaming"] == 1
+
+    response.close()
+
+    assert generation_queue.stats()["streaming"] == 0
+    request = generation.cover_letter_request(PROFILE, "Data engineer at Acme")
+    assert generation.get_generation_cache().get(generation.cache_key(request)) is None
+    # per_user=1, so this would be refused if the first stream still held its slot
+    retry = stream(client)
+    assert retry.status_code == 200
+    retry.close()
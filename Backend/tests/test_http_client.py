@@ -0,0 +1,50 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from http_client import UpstreamClient
+
+
+class BusyOnceHandler(BaseHTTPRequestHandler):
+    """Answers the first request with 503 and a long Retry-After, then 200."""
+    requests = 0
+
+    def do_GET(self):
+        BusyOnceHandler.requests += 1
+        if BusyOnceHandler.requests == 1:
+            self.send_response(503)
+            self.send_header("Retry-After", "30")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def busy_once():
+    BusyOnceHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BusyOnceHandler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_after_is_capped(busy_once):
+    client = UpstreamClient("test", busy_once, max_retry_after=0.2)
+
+    started = time.monotonic()
+    response = client.get("/search")
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    assert BusyOnceHandler.requests == 2
+    assert client.stats()["retries"] == 1
+    assert 0.2 <= elapsed < 2
@@ -0,0 +1,34 @@
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from identity import user_id_from_token
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret-key-that-is-long-enough-for-hs256"
+    JWTManager(app)
+    return app
+
+
+def request_with_subject(app, subject):
+    with app.app_context():
+        token = create_access_token(identity=subject)
+    return app.test_request_context(headers={"Authorization": f"Bearer {token}"})
+
+
+def test_numeric_subject():
+    app = make_app()
+    with request_with_subject(app, "42"):
+        assert user_id_from_token() == 42
+
+
+def test_malformed_subject_returns_none():
+    app = make_app()
+    with request_with_subject(app, "not-a-number"):
+        assert user_id_from_token() is None
+
+
+def test_no_token_returns_none():
+    with make_app().test_request_context():
+        assert user_id_from_token() is None
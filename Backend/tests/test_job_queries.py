@@ -0,0 +1,28 @@
+import pytest
+
+from job_queries import (
+    DEFAULT_PAGE_SIZE, QueryArgsError, build_all_jobs_query, page_response, parse_list_args
+)
+
+
+def test_lists_are_paged_by_default():
+    opts = parse_list_args({})
+    query, params = build_all_jobs_query(opts)
+
+    assert opts["limit"] == DEFAULT_PAGE_SIZE
+    assert query.endswith("LIMIT %s")
+    assert params[-1] == DEFAULT_PAGE_SIZE + 1
+
+
+def test_page_response_sets_next_cursor_from_look_ahead_row():
+    opts = parse_list_args({"limit": "2"})
+    rows = [{"jobs_id": 1}, {"jobs_id": 2}, {"jobs_id": 3}]
+
+    assert page_response(rows, opts) == {"jobs": rows[:2], "next_cursor": 2}
+    assert page_response(rows[:2], opts) == {"jobs": rows[:2], "next_cursor": None}
+
+
+@pytest.mark.parametrize("limit", ["0", "201", "ten"])
+def test_bad_limit(limit):
+    with pytest.raises(QueryArgsError):
+        parse_list_args({"limit": limit})
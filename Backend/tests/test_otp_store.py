@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+import otp_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return otp_store.MemoryOTPStore()
+    return otp_store.SQLiteOTPStore(str(tmp_path / "otp_store.sqlite3"))
+
+
+def test_correct_code_verifies_once(store):
+    store.issue("a@example.com", "123456", ttl=60)
+    assert store.verify("a@example.com", "123456") == otp_store.VERIFIED
+    assert store.verify("a@example.com", "123456") == otp_store.MISSING
+
+
+def test_wrong_codes_invalidate_the_otp(store):
+    store.issue("a@example.com", "123456", ttl=60)
+    assert [store.verify("a@example.com", "000000", max_attempts=3) for _ in range(3)] == [
+        otp_store.INVALID, otp_store.INVALID, otp_store.LOCKED
+    ]
+    # Even the right code is refused now; a new OTP has to be requested
+    assert store.verify("a@example.com", "123456", max_attempts=3) == otp_store.MISSING
+
+
+def test_new_otp_resets_attempts(store):
+    store.issue("a@example.com", "123456", ttl=60)
+    assert store.verify("a@example.com", "000000", max_attempts=2) == otp_store.INVALID
+    store.issue("a@example.com", "654321", ttl=60)
+    assert store.verify("a@example.com", "000000", max_attempts=2) == otp_store.INVALID
+    assert store.verify("a@example.com", "654321", max_attempts=2) == otp_store.VERIFIED
+
+
+def test_expired(store):
+    store.issue("a@example.com", "123456", ttl=-1)
+    assert store.verify("a@example.com", "123456") == otp_store.EXPIRED
+
+
+def test_sqlite_store_upgrades_files_without_attempts(tmp_path):
+    path = str(tmp_path / "otp_store.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE otps (email TEXT PRIMARY KEY, otp TEXT NOT NULL, expires_at REAL NOT NULL)")
+    connection.commit()
+    connection.close()
+
+    store = otp_store.SQLiteOTPStore(path)
+    store.issue("a@example.com", "123456", ttl=60)
+    assert store.verify("a@example.com", "000000", max_attempts=1) == otp_store.LOCKED
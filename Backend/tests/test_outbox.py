@@ -0,0 +1,105 @@
+"""
+The outbox against fake_smtp.py.
+"""
+import threading
+
+import pytest
+
+import fake_smtp
+from outbox import Outbox
+
+
+@pytest.fixture
+def smtp():
+    """Start fake_smtp on a free port; call it with fake_smtp.serve() options."""
+    servers = []
+
+    def start(**options):
+        server = fake_smtp.serve(port=0, **options)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        del fake_smtp.messages[:]
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_outbox(port, **options):
+    options.setdefault("backoff", 0.01)
+    return Outbox("127.0.0.1", port, sender="noreply@example.com", starttls=False, timeout=5, **options)
+
+
+def recipients():
+    return sorted(message["to"][0] for message in fake_smtp.messages)
+
+
+def test_queued_messages_go_out_in_batches_on_one_connection(smtp):
+    # The slow first reply lets the rest pile up behind it
+    outbox = make_outbox(smtp(delay=0.2), batch_size=3)
+    for i in range(7):
+        outbox.send(f"user{i}@example.com", "Your OTP", f"Code {i}")
+
+    assert outbox.flush(timeout=10)
+    assert recipients() == sorted(f"<user{i}@example.com>" for i in range(7))
+    stats = outbox.stats()
+    assert stats["sent"] == 7
+    assert stats["connects"] == 1
+    # One message alone, then the six queued behind it in batches of three
+    assert stats["batches"] == 3
+
+
+def test_temporary_failures_are_retried(smtp):
+    outbox = make_outbox(smtp(fail_every=2))
+    for i in range(3):
+        outbox.send(f"user{i}@example.com", "Your OTP", f"Code {i}")
+
+    assert outbox.flush(timeout=10)
+    assert len(fake_smtp.messages) == 3
+    stats = outbox.stats()
+    assert (stats["sent"], stats["failed"]) == (3, 0)
+    assert stats["retries"] >= 1
+
+
+def test_dropped_connection_is_reopened(smtp):
+    outbox = make_outbox(smtp(drop_every=2))
+    for i in range(3):
+        outbox.send(f"user{i}@example.com", "Your OTP", f"Code {i}")
+
+    assert outbox.flush(timeout=10)
+    assert len(fake_smtp.messages) == 3
+    stats = outbox.stats()
+    assert stats["failed"] == 0
+    assert stats["connects"] >= 2
+
+
+def test_gives_up_after_retries(smtp):
+    outbox = make_outbox(smtp(fail_every=1), retries=2)
+    outbox.send("user@example.com", "Your OTP", "Code")
+
+    assert outbox.flush(timeout=10)
+    stats = outbox.stats()
+    assert (stats["sent"], stats["failed"], stats["retries"]) == (0, 1, 2)
+    assert "451" in stats["last_error"]
+
+
+def test_flush_times_out_while_mail_is_still_queued(smtp):
+    outbox = make_outbox(smtp(delay=0.3))
+    outbox.send("first@example.com", "Your OTP", "Code")
+    outbox.send("second@example.com", "Your OTP", "Code")
+
+    assert not outbox.flush(timeout=0.1)
+    assert outbox.flush(timeout=10)
+    assert outbox.stats()["sent"] == 2
+
+
+def test_no_login_without_credentials(smtp):
+    # fake_smtp doesn't speak AUTH, so any login attempt would fail the send
+    outbox = make_outbox(smtp())
+    outbox.username = "noreply@example.com"
+    outbox.send("user@example.com", "Your OTP", "Code")
+
+    assert outbox.flush(timeout=10)
+    assert outbox.stats()["sent"] == 1
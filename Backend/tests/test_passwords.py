@@ -0,0 +1,61 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from passwords import HasherBusyError, PasswordHasher
+
+
+def slow(seconds):
+    started = time.time()
+    time.sleep(seconds)
+    return None, started, time.time()
+
+
+def wait_for_pending(hasher, pending, timeout=5):
+    deadline = time.monotonic() + timeout
+    while hasher.stats()["pending"] != pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return hasher.stats()["pending"]
+
+
+@pytest.fixture
+def hasher():
+    hashers = []
+
+    def make(**options):
+        hashers.append(PasswordHasher(method="pbkdf2:sha256:1000", **options))
+        return hashers[-1]
+
+    yield make
+    for h in hashers:
+        h._executor.shutdown(cancel_futures=True)
+
+
+def test_timed_out_work_keeps_its_slot_until_it_finishes(hasher):
+    hasher = hasher(workers=1, max_pending=1, timeout=0.05)
+    hasher.warm_up()
+
+    with pytest.raises(TimeoutError):
+        hasher._call(slow, 0.5)
+    # The process is still hashing, so there's no room for another operation yet
+    assert hasher.stats()["pending"] == 1
+    with pytest.raises(HasherBusyError):
+        hasher.hash("secret")
+
+    assert wait_for_pending(hasher, 0) == 0
+    hasher.timeout = 5
+    assert hasher.hash("secret").startswith("pbkdf2:sha256:1000$")
+
+
+def test_broken_pool_is_replaced(hasher):
+    hasher = hasher(workers=1, timeout=5)
+    stored_hash = hasher.hash("secret")
+
+    with pytest.raises(BrokenProcessPool):
+        hasher._call(os._exit, 1)
+
+    assert hasher.verify(stored_hash, "secret") == (True, None)
+    assert hasher.stats()["restarts"] == 1
+    assert wait_for_pending(hasher, 0) == 0
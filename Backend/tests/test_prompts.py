@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+import pytest
+
+import prompts
+
+
+@pytest.fixture
+def broken_tiktoken(monkeypatch):
+    """A tiktoken whose encoding files can't be downloaded."""
+    def fail(*args):
+        raise OSError("Could not fetch o200k_base.tiktoken")
+
+    monkeypatch.setattr(prompts, "_tiktoken", SimpleNamespace(encoding_for_model=fail, get_encoding=fail))
+    monkeypatch.setattr(prompts, "_tiktoken_loaded", True)
+    monkeypatch.setattr(prompts, "_encodings", {})
+
+
+def test_falls_back_to_estimate_when_encoding_fails(broken_tiktoken):
+    assert prompts.count_tokens("a" * 40) == 10
+    assert prompts.fit_job_description("word " * 10, budget=100) == ("word " * 10).strip()
+
+
+def test_trims_with_estimate_when_encoding_fails(broken_tiktoken):
+    fitted = prompts.fit_job_description("Build data pipelines. " * 200, budget=50)
+    assert prompts.count_tokens(fitted) <= 50 + len(prompts.TRIM_MARKER)
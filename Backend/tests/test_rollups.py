@@ -0,0 +1,237 @@
+"""
+Rollups kept up to date write by write must match a rebuild from the live
+tables. The MySQL queries run against a small in-memory model of `jobs`,
+`users_jobs` and `user_job_rollups`.
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+
+import app as app_module
+import rollups
+from job_identity import canonical_job_hash
+
+
+def normalize(query):
+    return " ".join(query.split())
+
+
+LIVE = {
+    normalize(query.format(where=where)): dimension
+    for dimension, (column, query) in rollups.LIVE_QUERIES.items()
+    for where in (f"WHERE {column} IS NOT NULL", f"WHERE {column} = %s")
+}
+
+
+class FakeDB:
+    def __init__(self):
+        self.jobs = {}        # jobs_id -> (job_title, job_type)
+        self.hashes = {}      # jobs_id -> canonical_hash
+        self.links = {}       # (user_id, job_id) -> (status, month)
+        self.rollups = Counter()
+        self.last_insert_id = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def add_job(self, job_id, job_title, job_type):
+        self.jobs[job_id] = (job_title, job_type)
+        self.hashes[job_id] = canonical_job_hash(None, job_title, "Acme", "London")
+
+    def live_rows(self, dimension, user_id=None):
+        counts = Counter()
+        for (link_user_id, job_id), (status, month) in self.links.items():
+            if user_id is not None and link_user_id != user_id:
+                continue
+            if dimension in ("title", "type"):
+                if job_id not in self.jobs:
+                    continue
+                bucket = self.jobs[job_id][0 if dimension == "title" else 1]
+            else:
+                bucket = status if dimension == "status" else month
+            counts[(link_user_id, bucket)] += 1
+        return [(link_user_id, bucket, count) for (link_user_id, bucket), count in counts.items()]
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def close(self):
+        pass
+
+    def executemany(self, query, rows):
+        assert normalize(query) == normalize(rollups.UPSERT_QUERY)
+        for user_id, dimension, bucket, count in rows:
+            self.db.rollups[(user_id, dimension, bucket)] += count
+
+    def execute(self, query, params=()):
+        query = normalize(query)
+        db = self.db
+        self.rows = []
+
+        if query in LIVE:
+            self.rows = db.live_rows(LIVE[query], *params)
+        elif query.startswith("SELECT uj.status"):
+            user_id, *job_ids = params
+            for (link_user_id, job_id), (status, month) in db.links.items():
+                if link_user_id == user_id and job_id in job_ids:
+                    title, job_type = db.jobs.get(job_id, (None, None))
+                    self.rows.append((status, month, title, job_type, job_id if job_id in db.jobs else None))
+        elif query.startswith("INSERT INTO user_job_rollups") and "FROM users_jobs" in query:
+            dimension, bucket, job_id, *exclude = params
+            sign = -1 if "-COUNT(*)" in query else 1
+            for (user_id, link_job_id) in db.links:
+                if link_job_id == job_id and user_id not in exclude:
+                    db.rollups[(user_id, dimension, bucket)] += sign
+        elif query.startswith("INSERT INTO jobs"):
+            job_title, _, _, job_type, _, _, canonical_hash = params
+            matches = [job_id for job_id, h in db.hashes.items() if h == canonical_hash]
+            if matches:
+                db.last_insert_id = matches[0]
+            else:
+                db.last_insert_id = max(db.jobs, default=0) + 1
+                db.jobs[db.last_insert_id] = (job_title, job_type)
+                db.hashes[db.last_insert_id] = canonical_hash
+        elif query == "SELECT LAST_INSERT_ID()":
+            self.rows = [(db.last_insert_id,)]
+        elif query.startswith("UPDATE jobs SET"):
+            job_title, _, _, job_type, _, _, job_id, _, user_id = params
+            if all(link_user_id == user_id for link_user_id, link_job_id in db.links if link_job_id == job_id):
+                db.jobs[job_id] = (job_title, job_type)
+        elif query.startswith("UPDATE users_jobs SET job_id"):
+            target_id, job_id, user_id = params
+            db.links[(user_id, target_id)] = db.links.pop((user_id, job_id))
+        elif query.startswith("UPDATE users_jobs SET status"):
+            status, date_applied, job_id, user_id = params
+            db.links[(user_id, job_id)] = (status, date_applied[:7])
+        elif query.startswith("DELETE FROM users_jobs"):
+            job_id, user_id = params
+            del db.links[(user_id, job_id)]
+        elif query.startswith("DELETE FROM user_job_rollups"):
+            for key in [key for key in db.rollups if not params or key[0] == params[0]]:
+                del db.rollups[key]
+        elif query.startswith("SELECT user_id, dimension, bucket, count FROM user_job_rollups"):
+            self.rows = [key + (count,) for key, count in db.rollups.items()
+                         if count and (not params or key[0] == params[0])]
+        elif query.startswith("SELECT dimension, bucket, count FROM user_job_rollups"):
+            self.rows = [key[1:] + (count,) for key, count in db.rollups.items()
+                         if count > 0 and key[0] == params[0]]
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+
+def link(db, user_id, job_id, status, month):
+    """Add or update a user's link to a job, the way /addJob does."""
+    cursor = db.cursor()
+    before = rollups.snapshot(cursor, user_id, job_id)
+    db.links[(user_id, job_id)] = (status, month)
+    rollups.apply_changes(cursor, user_id, before, rollups.snapshot(cursor, user_id, job_id))
+
+
+def unlink(db, user_id, job_id):
+    cursor = db.cursor()
+    before = rollups.snapshot(cursor, user_id, job_id)
+    del db.links[(user_id, job_id)]
+    rollups.apply_changes(cursor, user_id, before, Counter())
+
+
+@pytest.fixture
+def edit_job(monkeypatch):
+    """Call /editJob against a FakeDB; users are identified as "user<id>@example.com"."""
+    client = app_module.create_app({"TESTING": True}).test_client()
+    monkeypatch.setattr(app_module, "resolve_user_id", lambda cursor, email: int(email[4:email.index("@")]))
+
+    def edit(db, user_id, job_id, job_title, job_type, status="Interview", date_applied="2025-04-01"):
+        monkeypatch.setattr(app_module, "get_db_connection", contextmanager(lambda: (yield db)))
+        return client.post("/editJob", json={
+            "email": f"user{user_id}@example.com", "job_id": job_id, "job_title": job_title,
+            "company_name": "Acme", "job_location": "London", "job_type": job_type,
+            "job_status": status, "date_applied": date_applied,
+        })
+    return edit
+
+
+def nonzero(counts):
+    return {key: count for key, count in counts.items() if count}
+
+
+def test_incremental_rollups_match_rebuild(edit_job):
+    db = FakeDB()
+    db.add_job(1, "Engineer", "Full-time")
+    db.add_job(2, None, None)
+    db.add_job(3, "Analyst", "Contract")
+
+    link(db, 1, 1, "Applied", "2025-01")
+    link(db, 1, 2, None, None)
+    link(db, 1, 3, "Applied", "2025-02")
+    link(db, 2, 1, "Interview", "2025-01")
+    link(db, 1, 1, "Interview", "2025-03")
+    assert edit_job(db, 1, 1, "Senior Engineer", "Full-time").status_code == 200
+    assert edit_job(db, 1, 3, "Analyst", None).status_code == 200
+    # Editing job 2 to match the copy user 1 just made of job 1 merges the two links
+    assert edit_job(db, 1, 2, "Senior Engineer", "Full-time").status_code == 200
+    unlink(db, 1, 3)
+
+    cursor = db.cursor()
+    assert rollups.verify(cursor) == {}
+
+    incremental = nonzero(db.rollups)
+    rollups.rebuild(cursor)
+    assert nonzero(db.rollups) == incremental
+
+
+def test_null_buckets_read_back_as_null():
+    db = FakeDB()
+    db.jobs = {1: (None, None)}
+    link(db, 1, 1, None, None)
+
+    analytics = rollups.read_analytics(db.cursor(), 1)
+
+    assert analytics["jobs"] == [{"status": None, "count": 1}]
+    assert analytics["job_titles"] == [{"job_title": None, "count": 1}]
+    assert analytics["applications_per_month"] == [{"month": None, "total_applications": 1}]
+    assert analytics["job_type_distribution"] == [{"job_type": None, "total_jobs": 1}]
+
+
+def test_editing_a_shared_job_only_changes_the_editors_copy(edit_job):
+    db = FakeDB()
+    db.add_job(1, "Engineer", "Full-time")
+    link(db, 1, 1, "Applied", "2025-01")
+    link(db, 2, 1, "Applied", "2025-01")
+    other_user = {key: count for key, count in db.rollups.items() if key[0] == 2}
+
+    assert edit_job(db, 1, 1, "Senior Engineer", "Contract").status_code == 200
+
+    assert db.jobs[1] == ("Engineer", "Full-time")
+    new_id = next(job_id for (user_id, job_id) in db.links if user_id == 1)
+    assert new_id != 1 and db.jobs[new_id] == ("Senior Engineer", "Contract")
+    assert (2, 1) in db.links
+    assert {key: count for key, count in db.rollups.items() if key[0] == 2} == other_user
+    assert rollups.verify(db.cursor()) == {}
+
+    # The second user making the same edit lands on the first user's copy
+    assert edit_job(db, 2, 1, "Senior Engineer", "Contract").status_code == 200
+    assert set(db.links) == {(1, new_id), (2, new_id)}
+    assert rollups.verify(db.cursor()) == {}
+
+
+def test_editing_a_job_the_user_doesnt_track_is_refused(edit_job):
+    db = FakeDB()
+    db.add_job(1, "Engineer", "Full-time")
+    link(db, 2, 1, "Applied", "2025-01")
+
+    assert edit_job(db, 1, 1, "Senior Engineer", "Contract").status_code == 404
+    assert db.jobs == {1: ("Engineer", "Full-time")}
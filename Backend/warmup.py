@@ -0,0 +1,64 @@
+"""
+Start-up warm-up and readiness for production serving.
+
+gunicorn.conf.py calls warm_up() in each worker after it forks and before it
+takes requests, so the first users don't pay for opening database
+connections, starting the password hashing processes or computing the
+first analytics snapshot. A step that fails is logged and reported by
+/readyz rather than stopping the worker; the affected pool or cache then
+starts lazily on first use, as it does under the development server.
+"""
+import time
+
+import global_analytics
+from db import get_db_connection, get_pool
+from generation_cache import get_generation_cache
+from generation_queue import get_generation_queue
+from otp_store import get_otp_store
+from passwords import get_password_hasher
+
+STEPS = [
+    ("db_pool", lambda: get_pool().warm_up()),
+    ("password_hashing", lambda: get_password_hasher().warm_up()),
+    ("generation_queue", lambda: get_generation_queue().start()),
+    ("generation_cache", get_generation_cache),
+    ("otp_store", get_otp_store),
+    ("general_analytics", lambda: global_analytics.get_snapshot().get()),
+]
+
+_results = {}
+
+
+def warm_up():
+    """Run every warm-up step, returning {step: {"ok", "ms"[, "error"]}}."""
+    for name, step in STEPS:
+        start = time.monotonic()
+        try:
+            step()
+            _results[name] = {"ok": True}
+        except Exception as e:
+            print(f"Warm-up step {name} failed:", str(e))
+            _results[name] = {"ok": False, "error": str(e)}
+        _results[name]["ms"] = round((time.monotonic() - start) * 1000, 3)
+    return dict(_results)
+
+
+def readiness():
+    """
+    Return (ready, body). Ready means the database answers; warm-up results
+    are included for context but a failed step alone doesn't fail the check.
+    """
+    body = {"warm_up": dict(_results) or None}
+    try:
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        body["database"] = "ok"
+    except Exception as e:
+        body["database"] = str(e)
+        body["status"] = "unavailable"
+        return False, body
+    body["status"] = "ready"
+    return True, body
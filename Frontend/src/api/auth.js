@@ -0,0 +1,6 @@
+// Attach the JWT from sign-in so the backend can identify the user
+// without looking them up by email on every request.
+export const authHeaders = () => {
+  const token = localStorage.getItem("token");
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
@@ -0,0 +1,35 @@
+import { authHeaders } from "./auth";
+
+const POLL_INTERVAL_MS = 1500;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Queue a resume or cover letter on the backend and poll until it is ready.
+// Resolves with the generated text, or throws with the server's message.
+export const runGeneration = async (baseUrl, kind, body) => {
+  const response = await fetch(`${baseUrl}/generationJobs`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", ...authHeaders() },
+    body: JSON.stringify({ kind, ...body }),
+  });
+  let job = await response.json();
+  if (!response.ok && response.status !== 202) {
+    throw new Error(job.error || job.message || "Generation failed");
+  }
+
+  while (job.status === "queued" || job.status === "running") {
+    await sleep(POLL_INTERVAL_MS);
+    const poll = await fetch(`${baseUrl}/generationJobs/${job.job_id}`, {
+      headers: authHeaders(),
+    });
+    job = await poll.json();
+    if (!poll.ok) {
+      throw new Error(job.error || "Generation failed");
+    }
+  }
+
+  if (job.status === "failed") {
+    throw new Error(job.error || "Generation failed");
+  }
+  return job.text;
+};
@@ -16,6 +16,7 @@ import jsPDF from "jspdf";
 import html2canvas from "html2canvas";
 import { Document, Packer, Paragraph, TextRun } from "docx";
 import { saveAs } from "file-saver";
+import { runGeneration } from "../api/generation";
 
 const CoverLetterGenerator = () => {
   const [jobDescription, setJobDescription] = useState("");
@@ -36,25 +37,13 @@ const CoverLetterGenerator = () => {
     setCoverLetter("");
 
     try {
-      const response = await fetch("/generateCoverLetter", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          job_description: jobDescription,
-          email,
-        }),
+      const letter = await runGeneration("", "cover_letter", {
+        job_description: jobDescription,
+        email,
       });
-
-      const data = await response.json();
-      if (response.ok) {
-        setCoverLetter(data.cover_letter);
-      } else {
-        setError(data.error || "Failed to generate cover letter.");
-      }
+      setCoverLetter(letter);
     } catch (err) {
-      setError("An error occurred. Please try again.");
+      setError(err.message || "An error occurred. Please try again.");
     } finally {
       setLoading(false);
     }
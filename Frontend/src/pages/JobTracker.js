@@ -25,6 +25,22 @@ import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import { useNavigate, useLocation } from "react-router-dom";
 import React, { useState, useEffect } from "react";
+import { authHeaders } from "../api/auth";
+
+// Job lists come back a page at a time; follow next_cursor until the last page
+const fetchAllPages = async (url, options) => {
+  const jobs = [];
+  let cursor = null;
+  do {
+    const separator = url.includes("?") ? "&" : "?";
+    const response = await fetch(`${url}${separator}limit=200${cursor ? `&cursor=${cursor}` : ""}`, options);
+    if (!response.ok) return null;
+    const result = await response.json();
+    jobs.push(...result.jobs);
+    cursor = result.next_cursor;
+  } while (cursor);
+  return jobs;
+};
 
 const JobTracker = () => {
   //const [filterDate, setFilterDate] = useState("");
@@ -60,6 +76,7 @@ const JobTracker = () => {
           method: "GET",
           headers: {
             "Content-Type": "application/json",
+            ...authHeaders(),
           },
         });
   
@@ -101,25 +118,24 @@ const JobTracker = () => {
       if (!email) return; // Prevent fetching if email is missing
   
       try {
-        const response = await fetch(`http://127.0.0.1:5000/getuserJobs?email=${encodeURIComponent(email)}`, {
+        const userJobs = await fetchAllPages(`http://127.0.0.1:5000/getuserJobs?email=${encodeURIComponent(email)}`, {
           method: "GET",
           headers: {
             "Content-Type": "application/json",
+            ...authHeaders(),
           },
         });
   
-        if (response.ok) {
-          const result = await response.json();
-  
-          if (!result.jobs || result.jobs.length === 0) {
+        if (userJobs) {
+          if (userJobs.length === 0) {
             console.warn("No jobs found.");
             return;
           }
   
-          console.log("Fetched Jobs:", result.jobs); // Debugging
+          console.log("Fetched Jobs:", userJobs); // Debugging
   
           // Set jobs in state
-          setJobs(result.jobs.map(job => ({
+          setJobs(userJobs.map(job => ({
             id: job.jobs_id, // Use `jobs_id` from backend
             jobTitle: job.job_title,
             company: job.company_name,
@@ -144,7 +160,8 @@ const JobTracker = () => {
 
   const handleOpen = async () => {
     try {
-      const response = await fetch(`http://127.0.0.1:5000/getAllJobs`, {
+      // The newest page of the catalog; it can be far too large to list in full
+      const response = await fetch(`http://127.0.0.1:5000/getAllJobs?order=desc&limit=200`, {
         method: "GET",
         headers: { "Content-Type": "application/json" },
       });
@@ -230,6 +247,7 @@ const handleSubmit = async () => {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...authHeaders(),
       },
       body: JSON.stringify(jobData),
     });
@@ -276,6 +294,7 @@ const handleDelete = async (id) => {
           method: "POST",
           headers: {
               "Content-Type": "application/json",
+              ...authHeaders(),
           },
           body: JSON.stringify({ jobs_id: id, email: email })
       });
@@ -17,6 +17,7 @@ import jsPDF from "jspdf";
 import html2canvas from "html2canvas";
 import { Document, Packer, Paragraph, TextRun } from "docx";
 import { saveAs } from "file-saver";
+import { runGeneration } from "../api/generation";
 
 const ResumeGenerator = () => {
   const [jobDescription, setJobDescription] = useState("");
@@ -36,19 +37,11 @@ const ResumeGenerator = () => {
     setResume(null);
     setLoading(true);
     try {
-      const response = await fetch("http://127.0.0.1:5000/generateResume", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ job_description: jobDescription, email }),
+      const text = await runGeneration("http://127.0.0.1:5000", "resume", {
+        job_description: jobDescription,
+        email,
       });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.message || "Failed to generate resume");
-      }
-
-      const data = await response.json();
-      const cleaned = data.Resume.replace(/---/g, "").trim();
+      const cleaned = text.replace(/---/g, "").trim();
       setResume(cleaned);
     } catch (err) {
       setError(err.message);